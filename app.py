@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
 import bs4
+import cachetools
+import concurrent.futures
+import contextlib
 import decorator
 import flask
 from flask.typing import ResponseReturnValue as RRV
@@ -12,12 +15,19 @@ import random
 import requests
 import requests_oauthlib
 import string
+import threading
+import time
 import toolforge
-from typing import Optional, cast
+from typing import Iterator, Optional, cast
 import yaml
 
+import feed
+import httppool
 import ids
+import patrolqueue
+import prefetch
 import scripts
+import sessionstore
 import unicodescripts
 
 
@@ -38,6 +48,63 @@ else:
         app.secret_key = ''.join(random.choice(string.ascii_letters + string.digits) for _ in range(64))
 
 
+if 'SHARED_CACHE' in app.config:
+    ids.use_shared_caches(app.config['SHARED_CACHE'], app.config.get('PATROL_FOOTER_CACHE_TTL', 5 * 60))
+else:
+    ids.configure_caches({name.lower(): budget for name, budget in app.config.get('CACHE_BUDGETS', {}).items()},
+                         app.config.get('PATROL_FOOTER_CACHE_TTL', 5 * 60))
+
+if 'SESSION_STORE' in app.config:
+    app.session_interface = sessionstore.SQLiteSessionInterface(app.config['SESSION_STORE'])
+    id_limit_defaults = ids.server_side_id_limits
+else:
+    id_limit_defaults = ids.default_id_limits
+ids.configure_id_limits({name.lower(): limit for name, limit in app.config.get('ID_LIMITS', {}).items()},
+                        id_limit_defaults)
+
+httppool.configure(pool_connections=app.config.get('HTTP_POOL_CONNECTIONS', httppool.default_pool_connections),
+                   pool_maxsize=app.config.get('HTTP_POOL_MAXSIZE', httppool.default_pool_maxsize))
+# shared by all requests for public reads, which need no OAuth signature;
+# authenticated_session() is only for requests that depend on the user
+anonymous_session = httppool.mwapi_session('https://www.wikidata.org', user_agent)
+
+if app.config.get('DIFF_PREFETCH', 4) > 0:
+    prefetch_executor: Optional[concurrent.futures.Executor] = concurrent.futures.ThreadPoolExecutor(
+        max_workers=app.config.get('DIFF_PREFETCH', 4),
+        thread_name_prefix='prefetch',
+    )
+else:
+    prefetch_executor = None
+
+
+if app.config.get('PATROL_QUEUE_WORKERS', 2) > 0:
+    patrol_queue: Optional[patrolqueue.PatrolQueue] = patrolqueue.PatrolQueue(
+        max_workers=app.config.get('PATROL_QUEUE_WORKERS', 2),
+        retries=app.config.get('PATROL_QUEUE_RETRIES', 2),
+    )
+else:
+    patrol_queue = None
+
+
+# userinfo (including rights) of logged-in users, by access token key,
+# so that it is not requested again on every page view
+userinfo_cache: cachetools.TTLCache = cachetools.TTLCache(maxsize=10_000, ttl=app.config.get('USERINFO_CACHE_TTL', 5 * 60))
+userinfo_cache_lock = threading.Lock()
+# patrol and rollback tokens of logged-in users, by access token key and token type;
+# tokens stay valid for a long time, and are requested again if the API rejects them
+token_cache: cachetools.TTLCache = cachetools.TTLCache(maxsize=10_000, ttl=app.config.get('TOKEN_CACHE_TTL', 60 * 60))
+token_cache_lock = threading.Lock()
+
+if app.config.get('FEED_POLL_INTERVAL', 10) > 0:
+    unpatrolled_feed: Optional[feed.UnpatrolledFeed] = feed.UnpatrolledFeed(
+        anonymous_session,
+        poll_interval=app.config.get('FEED_POLL_INTERVAL', 10),
+        on_error=lambda error: log('FEED', 'polling failed: %r' % (error,)),
+    )
+else:
+    unpatrolled_feed = None
+
+
 def log(type: str, message: str) -> None:
     if app.config.get('DEBUG_' + type, False):
         print('[%s] %s' % (type, message))
@@ -89,6 +156,14 @@ def user_logged_in() -> bool:
     return 'oauth_access_token' in flask.session
 
 
+@app.template_global()
+def patrol_failures() -> list[patrolqueue.PatrolFailure]:
+    """The patrols of the logged-in user that failed in the background since the last page."""
+    if patrol_queue is None or 'oauth_access_token' not in flask.session:
+        return []
+    return patrol_queue.pop_failures(flask.session['oauth_access_token']['key'])
+
+
 @app.template_global()
 def authentication_area() -> Markup:
     if 'OAUTH' not in app.config:
@@ -111,14 +186,14 @@ def authenticated_session() -> Optional[mwapi.Session]:
         access_token = mwoauth.AccessToken(**flask.session['oauth_access_token'])
         auth = requests_oauthlib.OAuth1(client_key=consumer_token.key, client_secret=consumer_token.secret,
                                         resource_owner_key=access_token.key, resource_owner_secret=access_token.secret)
-        return mwapi.Session(host='https://www.wikidata.org', auth=auth, user_agent=user_agent)
+        return httppool.mwapi_session('https://www.wikidata.org', user_agent, auth=auth)
     else:
         return None
 
 
 @memoize
-def any_session() -> mwapi.Session:
-    return authenticated_session() or mwapi.Session(host='https://www.wikidata.org', user_agent=user_agent)
+def session_id_sets() -> ids.IdSets:
+    return ids.IdSets(flask.session)
 
 
 @memoize
@@ -126,9 +201,67 @@ def get_userinfo() -> Optional[dict]:
     session = authenticated_session()
     if session is None:
         return None
-    return session.get(action='query',
-                       meta='userinfo',
-                       uiprop=['rights'])['query']['userinfo']
+    access_token_key = flask.session['oauth_access_token']['key']
+    with userinfo_cache_lock:
+        userinfo = userinfo_cache.get(access_token_key)
+    if userinfo is None:
+        userinfo = session.get(action='query',
+                               meta='userinfo',
+                               uiprop=['rights'])['query']['userinfo']
+        with userinfo_cache_lock:
+            userinfo_cache[access_token_key] = userinfo
+    return userinfo
+
+
+def regenerate_session_id() -> None:
+    """Give the session a new ID when the user logs in or out, if it is stored on the server.
+
+    (Cookie sessions have no ID that someone else could know.)"""
+    if isinstance(flask.session, sessionstore.StoredSession):
+        flask.session.regenerate()
+
+
+def forget_user_caches() -> None:
+    """Remove the userinfo and tokens of the logged-in user (if any) from the caches.
+
+    Also stop the feed and the unpatrolled creations index from using their session."""
+    if 'oauth_access_token' in flask.session:
+        access_token_key = flask.session['oauth_access_token']['key']
+        with userinfo_cache_lock:
+            userinfo_cache.pop(access_token_key, None)
+        with token_cache_lock:
+            for token_type in ['patrol', 'rollback']:
+                token_cache.pop((access_token_key, token_type), None)
+        ids.unpatrolled_creations.forget_session(access_token_key)
+        if unpatrolled_feed is not None:
+            unpatrolled_feed.forget_session(access_token_key)
+
+
+def get_token(session: mwapi.Session, access_token_key: str, token_type: str, refresh: bool = False) -> str:
+    key = (access_token_key, token_type)
+    if not refresh:
+        with token_cache_lock:
+            token = token_cache.get(key)
+        if token is not None:
+            return token
+    token = session.get(action='query',
+                        meta='tokens',
+                        type=token_type)['query']['tokens'][token_type + 'token']
+    with token_cache_lock:
+        token_cache[key] = token
+    return token
+
+
+def post_with_token(session: mwapi.Session, access_token_key: str, token_type: str, **params) -> dict:
+    """POST to the API with a cached token, getting a new token and retrying once if it was rejected.
+
+    Does not use the Flask session, so that it can also be called outside of a request."""
+    try:
+        return session.post(token=get_token(session, access_token_key, token_type), **params)
+    except mwapi.errors.APIError as error:
+        if error.code != 'badtoken':
+            raise
+    return session.post(token=get_token(session, access_token_key, token_type, refresh=True), **params)
 
 
 def user_rights() -> list[str]:
@@ -138,6 +271,11 @@ def user_rights() -> list[str]:
     return userinfo['rights']
 
 
+def api_batch_size() -> int:
+    """How many revisions the logged-in user may look up in one API request."""
+    return 500 if 'apihighlimits' in user_rights() else 50
+
+
 @app.template_global()
 def user_can_patrol() -> bool:
     return 'patrol' in user_rights()
@@ -182,55 +320,161 @@ def settings() -> RRV:
 def any_diff() -> RRV:
     if not user_logged_in():
         return flask.redirect(flask.url_for('login'))
-    skipped_rev_ids = ids.get(flask.session, 'skipped_rev_ids')
-    ignored_page_ids = ids.get(flask.session, 'ignored_page_ids')
-    ignored_user_fake_ids = ids.get(flask.session, 'ignored_user_fake_ids')
+    skipped_rev_ids = session_id_sets()['skipped_rev_ids']
+    ignored_page_ids = session_id_sets()['ignored_page_ids']
+    ignored_user_fake_ids = session_id_sets()['ignored_user_fake_ids']
     supported_scripts = flask.session.get('supported_scripts')
-    try:
-        for rev_id in ids.unpatrolled_changes(authenticated_session()):
+    # the checks below may run in other threads, without access to flask.g
+    auth_session = authenticated_session()
+    # users without the patrol right get the API error from unpatrolled_changes()
+    use_feed = False
+    if user_can_patrol():
+        access_token_key = flask.session['oauth_access_token']['key']
+        ids.unpatrolled_creations.lend_session(access_token_key, auth_session)
+        if unpatrolled_feed is not None:
+            unpatrolled_feed.lend_session(access_token_key, auth_session)
+            # until the feed is loaded in the background, list the unpatrolled changes directly
+            use_feed = unpatrolled_feed.is_loaded()
+    group_limit = app.config.get('DIFF_GROUP_LIMIT', 0)
+
+    # timestamps of the changes listed without the feed, for the cursor
+    timestamps: dict[int, str] = {}
+
+    def unpatrolled_changes(before: Optional[int], before_timestamp: Optional[str]) -> Iterator[tuple[int, int, int]]:
+        """Yield the rev ID, page ID and user fake ID of each unpatrolled change older than before.
+
+        Without the feed, the API lists the changes from before_timestamp
+        (the timestamp of the before change, if known) on, so that the
+        newer changes are not listed again."""
+        if use_feed:
+            assert unpatrolled_feed is not None
+            for rev_id, metadata in unpatrolled_feed.changes_before(before):
+                yield rev_id, metadata.page_id, metadata.user_fake_id
+        else:
+            for rev_id, timestamp in ids.unpatrolled_changes(auth_session, start=before_timestamp):
+                # changes made in the same second as the before change are listed again
+                if before is not None and rev_id >= before:
+                    continue
+                timestamps[rev_id] = timestamp
+                yield rev_id, ids.rev_id_to_page_id(rev_id, anonymous_session), ids.rev_id_to_user_fake_id(rev_id, anonymous_session)
+
+    pending_rev_ids = patrol_queue.pending() if patrol_queue is not None else frozenset()
+
+    def unskipped_changes(before: Optional[int], before_timestamp: Optional[str]) -> Iterator[tuple[int, int, int]]:
+        for rev_id, page_id, user_fake_id in unpatrolled_changes(before, before_timestamp):
             if rev_id in skipped_rev_ids:
                 continue
-            if ids.rev_id_to_page_id(rev_id, any_session()) in ignored_page_ids:
+            if rev_id in pending_rev_ids:
                 continue
-            if ids.rev_id_to_user_fake_id(rev_id, any_session()) in ignored_user_fake_ids:
+            if page_id in ignored_page_ids:
                 continue
-            if ids.rev_id_to_show_patrol_footer(rev_id, authenticated_session()):
+            if user_fake_id in ignored_user_fake_ids:
                 continue
-            if supported_scripts is not None:
-                diff_body = any_session().get(action='compare',
-                                              fromrev=rev_id,
-                                              torelative='prev',
-                                              prop=['diff'],
-                                              uselang='en',
-                                              formatversion=2)['compare']['body']
-                script = scripts.primary_script_of_diff(diff_body)
-                if script is not None and script not in supported_scripts:
-                    continue
-            return flask.redirect(flask.url_for('diff', rev_id=rev_id))
-        return 'Nothing to do!'
+            yield rev_id, page_id, user_fake_id
+
+    def candidates(before: Optional[int], before_timestamp: Optional[str]) -> Iterator[int]:
+        changes = unskipped_changes(before, before_timestamp)
+        if group_limit > 1:
+            # diff() shows the older edits of the group together with the newest one
+            changes = ids.newest_of_groups(changes)
+        for rev_id, page_id, user_fake_id in changes:
+            yield rev_id
+
+    def candidate_acceptable(rev_id: int) -> bool:
+        if ids.rev_id_to_show_patrol_footer(rev_id, auth_session):
+            return False
+        if supported_scripts is not None:
+            script = ids.rev_id_to_primary_script(rev_id, anonymous_session)
+            if script is not None and script not in supported_scripts:
+                return False
+        return True
+
+    def first_acceptable(before: Optional[int], before_timestamp: Optional[str]) -> Optional[int]:
+        with contextlib.closing(prefetch.prefetch(candidate_acceptable,
+                                                  candidates(before, before_timestamp),
+                                                  prefetch_executor,
+                                                  app.config.get('DIFF_PREFETCH', 4))) as results:
+            for rev_id, acceptable in results:
+                if acceptable:
+                    return rev_id
+        return None
+
+    try:
+        # continue below the diff we last showed, instead of rechecking
+        # all the newer changes the user already passed over
+        now = time.time()
+        before, before_timestamp, since = diff_cursor_start(flask.session.get('diff_cursor'), now,
+                                                            app.config.get('DIFF_CURSOR_WRAP_INTERVAL', 120))
+        rev_id = first_acceptable(before, before_timestamp)
+        if rev_id is None and before is not None:
+            # reached the oldest change, wrap around to the newest
+            before, before_timestamp, since = None, None, now
+            rev_id = first_acceptable(before, before_timestamp)
+        if rev_id is None:
+            flask.session.pop('diff_cursor', None)
+            return 'Nothing to do!'
+        flask.session['diff_cursor'] = [rev_id, since, timestamps.get(rev_id)]
+        if app.config.get('DEBUG_CACHE', False):
+            # cache_usage() counts the entries of shared caches, so only call it when logging
+            log('CACHE', 'primary script cache: %(hits)d hits, %(misses)d misses' % ids.rev_id_to_primary_script_cache_stats)
+            log('CACHE', 'cache usage: %s' % ids.cache_usage())
+        return flask.redirect(flask.url_for('diff', rev_id=rev_id))
     except mwapi.errors.APIError as error:
         # TODO use errorformat='html' once mwapi supports it (mediawiki-utilities/python-mwapi#34)
-        info_html = any_session().get(action='parse',
-                                      text=error.info,
-                                      prop=['text'],
-                                      wrapoutputclass=None,
-                                      disablelimitreport=True,
-                                      contentmodel='wikitext',
-                                      formatversion=2)['parse']['text']
+        info_html = anonymous_session.get(action='parse',
+                                          text=error.info,
+                                          prop=['text'],
+                                          wrapoutputclass=None,
+                                          disablelimitreport=True,
+                                          contentmodel='wikitext',
+                                          formatversion=2)['parse']['text']
         return flask.render_template('permission-error.html',
                                      info=fix_markup(info_html))
 
 
+def diff_cursor_start(cursor: Optional[list], now: float, wrap_interval: float) -> tuple[Optional[int], Optional[str], float]:
+    """Determine where any_diff() should start looking for a diff.
+
+    The cursor is the rev ID of the last diff shown to the user,
+    the time when any_diff() last started from the newest change,
+    and the timestamp of that diff's change (None if it came from the
+    feed; older cursors lack it). Returns the rev ID below which to look
+    (None for the newest change), the timestamp of that change (if known)
+    and the time to store in the next cursor. Once wrap_interval seconds
+    have passed since the last start from the newest change, any_diff()
+    starts there again, so that the user also sees newer changes."""
+    if cursor is None:
+        return None, None, now
+    rev_id, since, *rest = cursor
+    if now - since >= wrap_interval:
+        return None, None, now
+    return rev_id, rest[0] if rest else None, since
+
+
 @app.route('/diff/<int:rev_id>/')
 def diff(rev_id: int) -> RRV:
-    session = any_session()
-    results = session.get(action='compare',
-                          fromrev=rev_id,
-                          torelative='prev',
-                          prop=['title', 'user', 'parsedcomment', 'diff'],
-                          formatversion=2)['compare']
+    group = None
+    group_limit = app.config.get('DIFF_GROUP_LIMIT', 0)
+    if group_limit > 1 and user_can_patrol():
+        group = ids.rev_id_to_group(rev_id, authenticated_session(), group_limit)
+        if len(group.rev_ids) < 2:
+            group = None
+    if group is not None:
+        # one diff for all the edits in the group
+        results = anonymous_session.get(action='compare',
+                                        fromrev=group.parent_rev_id,
+                                        torev=rev_id,
+                                        prop=['title', 'user', 'parsedcomment', 'diff'],
+                                        formatversion=2)['compare']
+    else:
+        results = anonymous_session.get(action='compare',
+                                        fromrev=rev_id,
+                                        torelative='prev',
+                                        prop=['title', 'user', 'parsedcomment', 'diff'],
+                                        formatversion=2)['compare']
     return flask.render_template('diff.html',
                                  rev_id=rev_id,
+                                 group=group,
                                  title=results['totitle'],
                                  had_csrf_error=getattr(flask.g, 'had_csrf_error', False),
                                  old_user=results['fromuser'],
@@ -240,24 +484,36 @@ def diff(rev_id: int) -> RRV:
                                  body=fix_markup(results['body']))
 
 
+def submitted_group_rev_ids(rev_id: int) -> list[int]:
+    """The rev IDs of the group submitted with a diff (see diff()), starting with the rev ID of the diff itself."""
+    rev_ids = [rev_id]
+    for value in flask.request.form.getlist('group_rev_id'):
+        if value.isdigit() and int(value) not in rev_ids:
+            rev_ids.append(int(value))
+    return rev_ids
+
+
 @app.route('/diff/<int:rev_id>/skip', methods=['POST'])
 def diff_skip(rev_id: int) -> RRV:
     if not submitted_request_valid():
         return flask.redirect(flask.url_for('any_diff'))
 
-    ids.append(flask.session, 'skipped_rev_ids', rev_id)
+    for skipped_rev_id in reversed(submitted_group_rev_ids(rev_id)):
+        ids.append(flask.session, 'skipped_rev_ids', skipped_rev_id)
+
+    user_fake_id = ids.rev_id_to_user_fake_id(rev_id, anonymous_session)
+    page_id = ids.rev_id_to_page_id(rev_id, anonymous_session)
 
-    user_fake_id = ids.rev_id_to_user_fake_id(rev_id, any_session())
-    page_id = ids.rev_id_to_page_id(rev_id, any_session())
+    id_sets = session_id_sets()
 
-    if user_fake_id in ids.get(flask.session, 'skipped_user_fake_ids'):
-        if user_fake_id not in ids.get(flask.session, 'acted_user_fake_ids'):
+    if user_fake_id in id_sets['skipped_user_fake_ids']:
+        if user_fake_id not in id_sets['acted_user_fake_ids']:
             ids.append(flask.session, 'ignored_user_fake_ids', user_fake_id)
 
-    if page_id in ids.get(flask.session, 'skipped_page_ids'):
-        if page_id not in ids.get(flask.session, 'acted_page_ids'):
+    if page_id in id_sets['skipped_page_ids']:
+        if page_id not in id_sets['acted_page_ids']:
             ids.append(flask.session, 'ignored_page_ids', page_id)
-            if user_fake_id not in ids.get(flask.session, 'skipped_user_fake_ids'):
+            if user_fake_id not in id_sets['skipped_user_fake_ids']:
                 ids.append(flask.session, 'skipped_user_fake_ids', user_fake_id)
     else:
         ids.append(flask.session, 'skipped_page_ids', page_id)
@@ -270,56 +526,98 @@ def diff_patrol(rev_id: int) -> RRV:
     if not submitted_request_valid():
         flask.g.had_csrf_error = True
         return diff(rev_id)
-    session = authenticated_session()
-    ids.append(flask.session, 'acted_page_ids', ids.rev_id_to_page_id(rev_id, session))
-    ids.append(flask.session, 'acted_user_fake_ids', ids.rev_id_to_user_fake_id(rev_id, session))
-    token = session.get(action='query',
-                        meta='tokens',
-                        type='patrol')['query']['tokens']['patroltoken']
-    session.post(action='patrol',
-                 revid=rev_id,
-                 token=token)
+    patrol_rev_ids([rev_id])
+    return flask.redirect(flask.url_for('any_diff'))
+
+
+@app.route('/diff/<int:rev_id>/patrol-group', methods=['POST'])
+def diff_patrol_group(rev_id: int) -> RRV:
+    if not submitted_request_valid():
+        flask.g.had_csrf_error = True
+        return diff(rev_id)
+    patrol_rev_ids(submitted_group_rev_ids(rev_id))
     return flask.redirect(flask.url_for('any_diff'))
 
 
+def patrol_rev_ids(rev_ids: list[int]) -> None:
+    """Patrol the revisions (all by one user to one page).
+
+    The other revisions of a group are submitted with the form, so only
+    those by the same user to the same page as the first one are patrolled."""
+    session = authenticated_session()
+    # look up all the revisions at once instead of one request per revision
+    ids.resolve_rev_ids(rev_ids, session, batch_size=api_batch_size())
+    page_id = ids.rev_id_to_page_id(rev_ids[0], session)
+    user_fake_id = ids.rev_id_to_user_fake_id(rev_ids[0], session)
+    ids.append(flask.session, 'acted_page_ids', page_id)
+    ids.append(flask.session, 'acted_user_fake_ids', user_fake_id)
+
+    def in_group(rev_id: int) -> bool:
+        try:
+            return ids.rev_id_to_page_id(rev_id, session) == page_id and ids.rev_id_to_user_fake_id(rev_id, session) == user_fake_id
+        except LookupError:  # no such revision, or user hidden
+            return False
+
+    rev_ids = rev_ids[:1] + [rev_id for rev_id in rev_ids[1:] if in_group(rev_id)]
+    access_token_key = flask.session['oauth_access_token']['key']
+    for rev_id in rev_ids:
+        def patrol(rev_id: int = rev_id) -> None:
+            post_with_token(session, access_token_key, 'patrol',
+                            action='patrol',
+                            revid=rev_id)
+
+        def on_success(rev_id: int = rev_id) -> None:
+            if unpatrolled_feed is not None:
+                unpatrolled_feed.discard(rev_id)
+
+        if patrol_queue is not None:
+            # don't keep the user waiting for the patrol; any_diff() skips pending patrols,
+            # and failures are shown on the next page; the patrols of a group run concurrently
+            patrol_queue.submit(access_token_key, rev_id, patrol, on_success)
+        else:
+            patrol()
+            on_success()
+
+
 @app.route('/diff/<int:rev_id>/rollback', methods=['POST'])
 def diff_rollback(rev_id: int) -> RRV:
     if not submitted_request_valid():
         flask.g.had_csrf_error = True
         return diff(rev_id)
     session = authenticated_session()
-    ids.append(flask.session, 'acted_page_ids', ids.rev_id_to_page_id(rev_id, session))
-    ids.append(flask.session, 'acted_user_fake_ids', ids.rev_id_to_user_fake_id(rev_id, session))
-    results = session.get(action='query',
-                          meta='tokens',
-                          type='rollback',
-                          revids=[str(rev_id)],
-                          prop='revisions',
-                          rvprop='user',
-                          formatversion='2')
-    token = results['query']['tokens']['rollbacktoken']
-    page = results['query']['pages'][0]
-    pageid = page['pageid']
-    user = page['revisions'][0]['user']
+    page_id = ids.rev_id_to_page_id(rev_id, anonymous_session)
+    ids.append(flask.session, 'acted_page_ids', page_id)
+    ids.append(flask.session, 'acted_user_fake_ids', ids.rev_id_to_user_fake_id(rev_id, anonymous_session))
+    # the diff page submits the user whose edit it showed; rollback fails if they did not make the latest edit
+    user = flask.request.form.get('rollback_user')
+    if not user:
+        user = anonymous_session.get(action='query',
+                                     revids=[rev_id],
+                                     prop='revisions',
+                                     rvprop='user',
+                                     formatversion='2')['query']['pages'][0]['revisions'][0]['user']
     try:
-        session.post(action='rollback',
-                     pageid=pageid,
-                     user=user,
-                     token=token)
+        post_with_token(session, flask.session['oauth_access_token']['key'], 'rollback',
+                        action='rollback',
+                        pageid=page_id,
+                        user=user)
     except mwapi.errors.APIError as error:
         # TODO use errorformat='html' once mwapi supports it (mediawiki-utilities/python-mwapi#34)
-        info_html = session.get(action='parse',
-                                text=error.info,
-                                prop=['text'],
-                                wrapoutputclass=None,
-                                disablelimitreport=True,
-                                contentmodel='wikitext',
-                                formatversion=2)['parse']['text']
+        info_html = anonymous_session.get(action='parse',
+                                          text=error.info,
+                                          prop=['text'],
+                                          wrapoutputclass=None,
+                                          disablelimitreport=True,
+                                          contentmodel='wikitext',
+                                          formatversion=2)['parse']['text']
         return flask.render_template('rollback-error.html',
                                      rev_id=rev_id,
                                      user=user,
                                      info=fix_markup(info_html))
     else:
+        # rollback marks the rolled back edits as patrolled
+        if unpatrolled_feed is not None:
+            unpatrolled_feed.discard(rev_id)
         return flask.redirect(flask.url_for('any_diff'))
 
 
@@ -340,6 +638,8 @@ def oauth_callback() -> RRV:
                                      query_string=flask.request.query_string.decode('utf8'))
     request_token = mwoauth.RequestToken(**oauth_request_token)
     access_token = mwoauth.complete('https://www.wikidata.org/w/index.php', consumer_token, request_token, flask.request.query_string, user_agent=user_agent)
+    forget_user_caches()  # of the previous login, if any
+    regenerate_session_id()
     flask.session['oauth_access_token'] = dict(zip(access_token._fields, access_token))
     flask.session.permanent = True
     flask.session.pop('csrf_token', None)
@@ -348,6 +648,8 @@ def oauth_callback() -> RRV:
 
 @app.route('/logout')
 def logout() -> RRV:
+    forget_user_caches()
+    regenerate_session_id()
     flask.session.clear()
     return flask.redirect(flask.url_for('index'))
 
@@ -367,29 +669,28 @@ def fix_markup(html: str) -> Markup:
 
 
 def user_scripts_from_babel() -> list[str]:
-    session = authenticated_session()
-    if not session:
+    userinfo = get_userinfo()
+    if userinfo is None:
         return ['Latin']
-    user_name = session.get(action='query',
-                            meta='userinfo')['query']['userinfo']['name']
-    languages = session.get(action='query',
-                            meta='babel',
-                            babuser=user_name)['query']['babel'].keys()
+    user_name = userinfo['name']
+    languages = anonymous_session.get(action='query',
+                                      meta='babel',
+                                      babuser=user_name)['query']['babel'].keys()
     autonyms = language_autonyms(languages)
-    return scripts.scripts_of_text(char for autonym in autonyms.values() for char in autonym)
+    return scripts.scripts_of_texts(autonyms.values())
 
 
 def language_autonyms(language_codes: list[str]) -> dict[str, str]:
     wikitext = ''
     for language_code in language_codes:
         wikitext += '<span><dt>' + language_code + '</dt><dd>{{#language:' + language_code + '|' + language_code + '}}</dd></span>'
-    html = any_session().get(action='parse',
-                             text=wikitext,
-                             contentmodel='wikitext',
-                             prop=['text'],
-                             wrapoutputclass='',
-                             disablelimitreport=True,
-                             formatversion=2)['parse']['text']
+    html = anonymous_session.get(action='parse',
+                                 text=wikitext,
+                                 contentmodel='wikitext',
+                                 prop=['text'],
+                                 wrapoutputclass='',
+                                 disablelimitreport=True,
+                                 formatversion=2)['parse']['text']
     soup = bs4.BeautifulSoup(html.strip(), 'html.parser')
     autonyms = {}
     for span in soup.find_all('span'):
@@ -0,0 +1,309 @@
+#!/usr/bin/python3
+"""Microbenchmarks for performance-sensitive parts of the tool.
+
+Run all benchmarks with `python3 benchmarks.py`,
+or only some of them by passing their names as arguments."""
+
+import bs4
+import http.server
+import json
+import mwapi  # type: ignore
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from typing import Callable, Collection, MutableMapping, Optional
+
+import compactcache
+import httppool
+import ids
+import scripts
+import unicodescripts
+
+
+benchmarks: dict[str, Callable[[], None]] = {}
+
+
+def benchmark(func: Callable[[], None]) -> Callable[[], None]:
+    benchmarks[func.__name__] = func
+    return func
+
+
+def report(name: str, func: Callable[[], object], per: int = 1, unit: str = 'call') -> float:
+    """Time func and print the best time per unit, returning it in seconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number)) / number / per
+    print(f'  {name}: {best * 1e9:,.0f} ns per {unit}')
+    return best
+
+
+sample_text = (
+    'The resistance must not exceed 10 kΩ. '
+    'Гражданская война в России. '
+    '安徽省合肥市下辖县 '
+    'Սեմույել Լիթլ '
+    '𐐔𐐯𐑅𐐨𐑉𐐯𐐻 '
+)
+
+
+# labels and descriptions as they might appear in a batch of term edits,
+# repeated to a few kilobytes of text
+term_texts = [
+    'Douglas Adams', 'English writer and humorist',
+    'Дуглас Адамс', 'английский писатель, драматург и сценарист',
+    '道格拉斯·亚当斯', '英国作家',
+    'ダグラス・アダムズ', 'イギリスの作家',
+    'דאגלס אדמס', 'סופר ותסריטאי בריטי',
+    'دوجلاس آدمز', 'كاتب إنجليزي',
+    'Ντάγκλας Άνταμς', 'Άγγλος συγγραφέας',
+] * 25
+
+
+@benchmark
+def script() -> None:
+    data = unicodescripts._load()
+
+    def range_script() -> None:
+        for char in sample_text:
+            data.scripts[data.script_indices[unicodescripts.bisect_right(data.starts, ord(char)) - 1]]
+
+    def table_script() -> None:
+        for char in sample_text:
+            unicodescripts.script(char)
+
+    old = report('bisect', range_script, per=len(sample_text), unit='char')
+    new = report('BMP table', table_script, per=len(sample_text), unit='char')
+    print(f'  speedup: {old / new:.1f}x')
+
+
+@benchmark
+def scripts_of_texts() -> None:
+    length = sum(len(text) for text in term_texts)
+    print(f'  {len(term_texts)} texts, {length} characters')
+
+    def per_char() -> None:
+        # the previous implementation of scripts_of_text()
+        script_counts: dict[str, int] = {}
+        for char in (char for text in term_texts for char in text):
+            script = unicodescripts.script(char)
+            if script not in {'Common', 'Inherited', 'Unknown'}:
+                script_counts[script] = script_counts.get(script, 0) + 1
+        sorted(script_counts.items(), key=lambda item: item[1], reverse=True)
+
+    def per_text() -> None:
+        scripts.scripts_of_texts(term_texts)
+
+    assert scripts.scripts_of_text(char for text in term_texts for char in text) == scripts.scripts_of_texts(term_texts)
+    old = report('per character', per_char, per=length, unit='char')
+    new = report('whole strings', per_text, per=length, unit='char')
+    print(f'  speedup: {old / new:.1f}x')
+
+
+@benchmark
+def import_unicodescripts() -> None:
+    import importlib
+    report('import', lambda: importlib.reload(unicodescripts))
+    report('first lookup', lambda: unicodescripts._load())
+
+
+def label_diff(language_code: str, label: str) -> str:
+    return f'<tr><td colspan="2" class="diff-lineno">label / {language_code}</td><td colspan="2" class="diff-lineno">label / {language_code}</td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline">{label}</ins></div></td></tr>'
+
+
+def statement_diff(value: str) -> str:
+    return f'<tr><td colspan="2" class="diff-lineno"></td><td colspan="2" class="diff-lineno">Property / <a title="Property:P31" href="/wiki/Property:P31">instance of</a></td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline"><span><a title="{value}" href="/wiki/{value}">{value}</a></span></ins></div></td></tr>'
+
+
+# a bulk edit adding labels in many languages
+bulk_label_diff = ''.join(label_diff(language_code, label)
+                          for language_code, label in [('en', 'Douglas Adams'), ('de', 'Douglas Adams'), ('fr', 'Douglas Adams'), ('nl', 'Douglas Adams')] * 100)
+# a bulk edit adding statements
+bulk_statement_diff = ''.join(statement_diff(f'Q{item_id}') for item_id in range(400))
+
+
+def bs4_texts_of_diff(html: str) -> list[str]:
+    """The previous, BeautifulSoup-based implementation of scripts.texts_of_diff()."""
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    elements = [content for content in soup.contents if type(content) is bs4.Tag]
+    texts: list[str] = []
+    for i in range(0, len(elements), 2):
+        lineno = elements[i].get_text()
+        if (lineno.startswith('label / ') or
+                lineno.startswith('description /') or
+                lineno.startswith('aliases /') or
+                lineno.startswith('links /')):
+            texts += (element.get_text() for element in elements[i + 1].select('.diff-addedline, .diff-deletedline'))
+        elif lineno.startswith('Property /'):
+            texts += (element.get_text() for element in elements[i + 1].select('.wb-monolingualtext-value'))
+            texts += (element.get_text() for element in elements[i + 1].select('a.extiw[href^="//commons.wikimedia.org/"]'))
+    return texts
+
+
+def full_primary_script_of_diff(html: str) -> Optional[str]:
+    """The original implementation of scripts.primary_script_of_diff()."""
+    primary_scripts = scripts.scripts_of_texts(bs4_texts_of_diff(html))
+    return primary_scripts[0] if primary_scripts else None
+
+
+@benchmark
+def primary_script_of_diff() -> None:
+    for name, html in [('labels', bulk_label_diff), ('statements', bulk_statement_diff)]:
+        print(f'  {name}: {len(html)} characters')
+        assert full_primary_script_of_diff(html) == scripts.primary_script_of_diff(html)
+        old = report('full parse', lambda: full_primary_script_of_diff(html))
+        new = report('early exit', lambda: scripts.primary_script_of_diff(html))
+        print(f'  speedup: {old / new:.1f}x')
+
+
+@benchmark
+def texts_of_diff() -> None:
+    html = bulk_label_diff
+    print(f'  {len(html)} characters')
+    assert bs4_texts_of_diff(html) == scripts.texts_of_diff(html)
+    old = report('BeautifulSoup', lambda: bs4_texts_of_diff(html))
+    new = report('HTMLParser', lambda: scripts.texts_of_diff(html))
+    print(f'  speedup: {old / new:.1f}x')
+
+
+def report_memory(name: str, make_cache: Callable[[], MutableMapping], fill: Callable[[MutableMapping], None]) -> int:
+    """Create and fill a cache and print the memory allocated for it, returning it in bytes."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    cache = make_cache()
+    fill(cache)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    size = after - before
+    print(f'  {name}: {size / 2**20:,.1f} MiB, {size / len(cache):.0f} bytes per entry')
+    return size
+
+
+@benchmark
+def cache_memory() -> None:
+    entries = 1024 * 1024
+    first_rev_id = 2_000_000_000
+
+    def fill_page_id_and_title(cache: MutableMapping) -> None:
+        for rev_id in range(first_rev_id, first_rev_id + entries):
+            page_id = rev_id // 10 - 100_000_000  # ten revisions per page
+            cache[rev_id] = (page_id, f'Q{page_id}')
+
+    def fill_user_fake_id(cache: MutableMapping) -> None:
+        for rev_id in range(first_rev_id, first_rev_id + entries):
+            cache[rev_id] = ids.user_fake_id(f'User {rev_id % 10000}')
+
+    for name, fill, compact_cache in [
+            ('page ID and title', fill_page_id_and_title, compactcache.PageIdAndTitleCache),
+            ('user fake ID', fill_user_fake_id, compactcache.IntCache),
+    ]:
+        print(f'  {name}, {entries:,} entries')
+        old = report_memory('MyLRUCache', lambda: ids.MyLRUCache(maxsize=entries), fill)
+        new = report_memory('compact', lambda: compact_cache(maxsize=entries), fill)
+        print(f'  saving: {old / new:.1f}x')
+        tracemalloc.start()
+        empty = compact_cache(maxsize=entries)
+        print(f'  compact, empty: {tracemalloc.get_traced_memory()[0] / 2**10:,.1f} KiB')
+        tracemalloc.stop()
+        del empty
+
+
+@benchmark
+def scan_loop() -> None:
+    # session lists filled up to their limits, and a full page of recent changes
+    # (rclimit=max) none of which are filtered out, so every check has to run
+    session: dict[str, list[int]] = {}
+    for name, first_id in [('skipped_rev_ids', 2_000_000_000),
+                           ('ignored_page_ids', 100_000_000),
+                           ('ignored_user_fake_ids', 1_000_000)]:
+        for id in range(first_id, first_id + ids.id_limit(name) + 1):
+            ids.append(session, name, id)
+    changes = [(rev_id, rev_id // 10, rev_id % 1000) for rev_id in range(1_000_000_000, 1_000_000_500)]
+
+    def scan(skipped_rev_ids: Collection[int], ignored_page_ids: Collection[int], ignored_user_fake_ids: Collection[int]) -> None:
+        for rev_id, page_id, user_fake_id in changes:
+            if rev_id in skipped_rev_ids:
+                continue
+            if page_id in ignored_page_ids:
+                continue
+            if user_fake_id in ignored_user_fake_ids:
+                continue
+
+    def scan_lists() -> None:
+        scan(ids.get(session, 'skipped_rev_ids'),
+             ids.get(session, 'ignored_page_ids'),
+             ids.get(session, 'ignored_user_fake_ids'))
+
+    def scan_sets() -> None:
+        id_sets = ids.IdSets(session)  # built once per request
+        scan(id_sets['skipped_rev_ids'],
+             id_sets['ignored_page_ids'],
+             id_sets['ignored_user_fake_ids'])
+
+    print(f'  {len(changes)} changes')
+    old = report('lists', scan_lists, per=len(changes), unit='change')
+    new = report('sets (including building them)', scan_sets, per=len(changes), unit='change')
+    print(f'  speedup: {old / new:.1f}x')
+
+
+@benchmark
+def api_connections() -> None:
+    # a local HTTPS server standing in for the API, with a self-signed certificate;
+    # real requests to www.wikidata.org also pay for the network round trips of each handshake
+    with tempfile.TemporaryDirectory() as directory:
+        cert = os.path.join(directory, 'cert.pem')
+        key = os.path.join(directory, 'key.pem')
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=localhost', '-addext', 'subjectAltName=IP:127.0.0.1',
+                        '-keyout', key, '-out', cert],
+                       check=True, capture_output=True)
+        os.environ['REQUESTS_CA_BUNDLE'] = cert  # mwapi always verifies certificates
+
+        body = json.dumps({'batchcomplete': True, 'query': {}}).encode('utf8')
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # otherwise, delayed ACKs dominate the timings
+
+            def do_GET(self) -> None:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = 'https://127.0.0.1:%d' % server.server_port
+
+        def page_view(session: mwapi.Session) -> None:
+            # a few API requests, like a typical page view
+            for _ in range(3):
+                session.get(action='query')
+
+        try:
+            old = report('new session per page view', lambda: page_view(mwapi.Session(host=host, user_agent='benchmarks')),
+                         unit='page view')
+            new = report('pooled session per page view', lambda: page_view(httppool.mwapi_session(host, 'benchmarks')),
+                         unit='page view')
+            print(f'  speedup: {old / new:.1f}x')
+        finally:
+            server.shutdown()
+            server.server_close()
+            del os.environ['REQUESTS_CA_BUNDLE']
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or benchmarks:
+        print(name)
+        benchmarks[name]()
@@ -0,0 +1,326 @@
+"""Memory-efficient caches for mappings from revision IDs.
+
+A cachetools cache with a million entries stores a Python int key
+and a value object for every entry, plus a dict slot and (for LRU
+caches) a linked list node. The caches in this module instead store
+keys and values in arrays, in an open addressing hash table with
+linear probing. Titles are interned, so that revisions of the same
+page share one string.
+
+When full, the caches evict entries with the CLOCK algorithm,
+an approximation of LRU: each entry has a reference bit, which
+is set when the entry is read (but, like in ids.MyLRUCache, not when
+it is assigned); the clock hand sweeps over a ring of all keys,
+clearing set reference bits and evicting the first entry whose bit
+was clear, whose place in the ring the new entry then takes.
+(Sweeping over the ring rather than the hash table spreads evictions
+evenly over the table, instead of emptying the slots behind the hand
+and crowding the others into long probe runs.)
+
+The arrays start small and double (rehashing all entries) whenever
+they are full, up to the size needed for maxsize entries, so that an
+empty cache takes almost no memory.
+"""
+
+import abc
+from array import array
+from collections.abc import MutableMapping, MutableSequence
+import sys
+from typing import Iterator, Optional
+
+
+class _ArrayCache(MutableMapping, abc.ABC):
+    """Base class for caches with non-negative int keys below 2**63.
+
+    Subclasses store the values in their own arrays,
+    indexed by the slot of the key."""
+
+    __slots__ = ('maxsize', 'maxbytes', '_capacity', '_keys', '_referenced', '_ring_positions', '_ring',
+                 '_size', '_value_bytes', '_hand')
+
+    _EMPTY = -1
+    _initial_entries = 64
+    # bytes per slot in the hash table arrays, per entry in the ring,
+    # and the estimated size of what a value references outside the arrays
+    _slot_bytes = 8 + 1 + 4
+    _ring_bytes = 8
+    _value_bytes_estimate = 0
+
+    def __init__(self, maxsize: Optional[int] = None, maxbytes: Optional[int] = None) -> None:
+        """Create a cache holding at most maxsize entries or using at most about maxbytes bytes.
+
+        With maxbytes, maxsize is derived from the estimated size of an entry,
+        and entries are also evicted when their actual size exceeds the budget."""
+        if (maxsize is None) == (maxbytes is None):
+            raise TypeError('exactly one of maxsize and maxbytes must be given')
+        if maxbytes is not None:
+            # the hash table has 4/3 slots per entry, keeping the load factor at or below 3/4
+            maxsize = maxbytes // (self._slot_bytes * 4 // 3 + self._ring_bytes + self._value_bytes_estimate)
+        assert maxsize is not None
+        if maxsize < 1:
+            raise ValueError('maxsize must be positive')
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._clear()
+
+    def _clear(self) -> None:
+        self._size = 0
+        self._value_bytes = 0
+        self._hand = 0
+        self._allocate(min(self.maxsize, self._initial_entries))
+
+    def _allocate(self, entries: int) -> None:
+        """Create empty arrays with room for the given number of entries."""
+        # the hash table has 4/3 slots per entry, keeping the load factor at or below 3/4
+        self._capacity = entries * 4 // 3 + 1
+        self._keys = array('q', [self._EMPTY]) * self._capacity
+        self._referenced = bytearray(self._capacity)
+        self._ring_positions = array('I', [0]) * self._capacity
+        # the first _size elements of the ring are the keys of all entries
+        self._ring = array('q', [self._EMPTY]) * entries
+        self._clear_values()
+
+    def _grow(self) -> None:
+        """Double the room for entries (up to maxsize), moving all entries to new arrays."""
+        keys, referenced, ring_positions, ring = self._keys, self._referenced, self._ring_positions, self._ring
+        values = self._value_arrays()
+        self._allocate(min(self.maxsize, len(ring) * 2))
+        self._ring[:len(ring)] = ring
+        new_values = self._value_arrays()
+        for old_slot, key in enumerate(keys):
+            if key == self._EMPTY:
+                continue
+            slot = self._find(key)
+            self._keys[slot] = key
+            self._referenced[slot] = referenced[old_slot]
+            self._ring_positions[slot] = ring_positions[old_slot]
+            for old_array, new_array in zip(values, new_values):
+                new_array[slot] = old_array[old_slot]
+
+    @abc.abstractmethod
+    def _clear_values(self) -> None:
+        """Create the value arrays, with one (empty) element per slot."""
+
+    @abc.abstractmethod
+    def _value_arrays(self) -> tuple[MutableSequence, ...]:
+        """Return the value arrays (see _clear_values())."""
+
+    @abc.abstractmethod
+    def _move_value(self, source: int, target: int) -> None:
+        """Move the value in the source slot to the target slot."""
+
+    def _release_value(self, slot: int) -> None:
+        pass
+
+    @property
+    def currbytes(self) -> int:
+        """The estimated memory used by the cache, in bytes."""
+        return self._capacity * self._slot_bytes + len(self._ring) * self._ring_bytes + self._value_bytes
+
+    def _home(self, key: int) -> int:
+        # Fibonacci hashing, so that consecutive revision IDs do not end up in one long run,
+        # scaled to the capacity with a multiplication instead of a modulo
+        return (((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) * self._capacity) >> 64
+
+    def _next(self, slot: int) -> int:
+        slot += 1
+        return 0 if slot == self._capacity else slot
+
+    def _find(self, key: int) -> int:
+        """Return the slot of the key, or the empty slot where it would be inserted."""
+        if not isinstance(key, int) or key < 0:
+            raise KeyError(key)
+        keys = self._keys
+        slot = self._home(key)
+        while True:
+            found = keys[slot]
+            if found == key or found == self._EMPTY:
+                return slot
+            slot = self._next(slot)
+
+    def _lookup(self, key: int) -> int:
+        """Return the slot of the key, marking it as referenced, or raise KeyError."""
+        slot = self._find(key)
+        if self._keys[slot] != key:
+            raise KeyError(key)
+        self._referenced[slot] = 1
+        return slot
+
+    def _slot_for_insert(self, key: int) -> int:
+        """Return the slot of the key, first making room for it if it is new.
+
+        Making room may replace the key and value arrays."""
+        slot = self._find(key)
+        if self._keys[slot] == key:
+            return slot
+        if self._size >= self.maxsize:
+            position = self._evict()
+            slot = self._find(key)  # the eviction may have moved entries
+        else:
+            if self._size >= len(self._ring):
+                self._grow()
+                slot = self._find(key)
+            position = self._size
+        self._keys[slot] = key
+        self._referenced[slot] = 0
+        self._ring[position] = key
+        self._ring_positions[slot] = position
+        self._size += 1
+        return slot
+
+    def _evict(self, keep: int = _EMPTY) -> int:
+        """Evict an entry other than the given key and return its position in the ring.
+
+        The caller must fill that position with a new key or _close_ring_gap() it."""
+        ring = self._ring
+        referenced = self._referenced
+        while True:
+            position = self._hand
+            self._hand = position + 1 if position + 1 < self._size else 0
+            key = ring[position]
+            if key == keep:
+                continue
+            slot = self._find(key)
+            if referenced[slot]:
+                referenced[slot] = 0
+                continue
+            self._remove(slot)
+            return position
+
+    def _evict_over_budget(self, keep: int) -> None:
+        """Evict entries other than the given key until the cache is within its byte budget."""
+        if self.maxbytes is None:
+            return
+        while self.currbytes > self.maxbytes and self._size > 1:
+            self._close_ring_gap(self._evict(keep))
+
+    def _close_ring_gap(self, position: int) -> None:
+        # move the last key of the ring into the gap left by a removed entry
+        last = self._size
+        if position != last:
+            key = self._ring[last]
+            self._ring[position] = key
+            self._ring_positions[self._find(key)] = position
+        self._ring[last] = self._EMPTY
+        if self._hand >= self._size:
+            self._hand = 0
+
+    def _remove(self, slot: int) -> None:
+        """Remove the entry in the slot from the hash table (but not from the ring)."""
+        self._release_value(slot)
+        # backward shift deletion: move later entries of the same run into the gap,
+        # unless that would move them before their home slot
+        keys = self._keys
+        gap = slot
+        while True:
+            keys[gap] = self._EMPTY
+            slot = gap
+            while True:
+                slot = self._next(slot)
+                key = keys[slot]
+                if key == self._EMPTY:
+                    self._size -= 1
+                    return
+                home = self._home(key)
+                if gap <= slot:
+                    stays = gap < home <= slot
+                else:
+                    stays = gap < home or home <= slot
+                if not stays:
+                    break
+            keys[gap] = key
+            self._referenced[gap] = self._referenced[slot]
+            self._ring_positions[gap] = self._ring_positions[slot]
+            self._move_value(slot, gap)
+            gap = slot
+
+    def __delitem__(self, key: int) -> None:
+        slot = self._find(key)
+        if self._keys[slot] != key:
+            raise KeyError(key)
+        position = self._ring_positions[slot]
+        self._remove(slot)
+        self._close_ring_gap(position)
+
+    def __contains__(self, key: object) -> bool:
+        # unlike a lookup, this does not count as use
+        return isinstance(key, int) and key >= 0 and self._keys[self._find(key)] == key
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ring[:self._size].tolist())
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._clear()
+
+
+class IntCache(_ArrayCache):
+    """A cache from int keys to unsigned 32-bit int values."""
+
+    __slots__ = ('_values',)
+
+    _slot_bytes = _ArrayCache._slot_bytes + 4
+
+    def _clear_values(self) -> None:
+        self._values = array('I', [0]) * self._capacity
+
+    def _value_arrays(self) -> tuple[MutableSequence, ...]:
+        return (self._values,)
+
+    def _move_value(self, source: int, target: int) -> None:
+        self._values[target] = self._values[source]
+
+    def __getitem__(self, key: int) -> int:
+        return self._values[self._lookup(key)]
+
+    def __setitem__(self, key: int, value: int) -> None:
+        if not 0 <= value < 2**32:
+            raise ValueError(f'value out of range: {value}')
+        slot = self._slot_for_insert(key)  # before reading self._values, which may be replaced
+        self._values[slot] = value
+
+
+class PageIdAndTitleCache(_ArrayCache):
+    """A cache from int keys to (page ID, title) tuples.
+
+    Page IDs must be unsigned 32-bit ints; titles are interned."""
+
+    __slots__ = ('_page_ids', '_titles')
+
+    _slot_bytes = _ArrayCache._slot_bytes + 4 + 8
+    _value_bytes_estimate = sys.getsizeof('Q123456789')
+
+    def _clear_values(self) -> None:
+        self._page_ids = array('I', [0]) * self._capacity
+        self._titles: list[str] = [''] * self._capacity
+
+    def _value_arrays(self) -> tuple[MutableSequence, ...]:
+        return (self._page_ids, self._titles)
+
+    def _move_value(self, source: int, target: int) -> None:
+        self._page_ids[target] = self._page_ids[source]
+        self._titles[target] = self._titles[source]
+        self._titles[source] = ''
+
+    def _release_value(self, slot: int) -> None:
+        # interned titles shared by several entries are counted for each of them
+        self._value_bytes -= sys.getsizeof(self._titles[slot])
+        self._titles[slot] = ''
+
+    def __getitem__(self, key: int) -> tuple[int, str]:
+        slot = self._lookup(key)
+        return (self._page_ids[slot], self._titles[slot])
+
+    def __setitem__(self, key: int, value: tuple[int, str]) -> None:
+        page_id, title = value
+        if not 0 <= page_id < 2**32:
+            raise ValueError(f'page ID out of range: {page_id}')
+        slot = self._slot_for_insert(key)
+        self._page_ids[slot] = page_id
+        if self._titles[slot]:
+            self._value_bytes -= sys.getsizeof(self._titles[slot])
+        self._titles[slot] = sys.intern(title)
+        self._value_bytes += sys.getsizeof(title)
+        self._evict_over_budget(keep=key)
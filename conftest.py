@@ -0,0 +1,69 @@
+import http.server
+import json
+import mwapi  # type: ignore
+import pytest
+import threading
+from typing import Any, NamedTuple
+import urllib.parse
+
+
+class FakeApiRequest(NamedTuple):
+    method: str
+    params: dict[str, str]  # from the query string and the (form-encoded) body
+    client_address: tuple[str, int]
+    headers: Any
+
+
+class FakeApi:
+    """A local HTTP server standing in for the MediaWiki API.
+
+    Every request is recorded in requests and answered with the JSON
+    that respond(request) returns; tests replace respond to describe
+    the responses they need. Connections are kept alive, like the API's."""
+
+    def __init__(self):
+        self.requests = []
+        self.respond = lambda request: {}
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self.handle_request('')
+
+            def do_POST(self):
+                self.handle_request(self.rfile.read(int(self.headers['Content-Length'])).decode('utf8'))
+
+            def handle_request(self, body):
+                params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+                params.update(urllib.parse.parse_qsl(body))
+                request = FakeApiRequest(self.command, params, self.client_address, self.headers)
+                api.requests.append(request)
+                response = json.dumps(api.respond(request)).encode('utf8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.host = 'http://127.0.0.1:%d' % self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def session(self, user_agent='test'):
+        return mwapi.Session(host=self.host, user_agent=user_agent)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_api():
+    api = FakeApi()
+    yield api
+    api.close()
@@ -0,0 +1,222 @@
+from bisect import bisect_left, insort
+import datetime
+import mwapi  # type: ignore
+import threading
+import time
+from typing import Any, Callable, Iterator, Mapping, Optional
+
+import ids
+
+
+class UnpatrolledFeed:
+    """A shared feed of unpatrolled changes, kept up to date by a background thread.
+
+    Instead of every request paging through all unpatrolled changes,
+    the background thread lists them once and then polls every poll_interval seconds
+    for unpatrolled changes since the last poll (rcdir=newer) and for
+    patrol log entries since the last poll, which remove changes from
+    the feed. Every full_refresh_interval seconds, the feed is listed
+    from scratch, dropping changes that were patrolled without a log
+    entry or that expired from the recent changes.
+
+    Listing unpatrolled changes requires the patrol right, and the tool
+    has no credentials of its own, so the feed lists them with the
+    session of the latest user who lent it one (see lend_session()),
+    until that user logs out (see forget_session()); callers must check
+    that the user may see unpatrolled changes. Everything else, i.e. the
+    public patrol log, is read with the given anonymous session. The first call to
+    lend_session() starts the background thread; until its first poll
+    has finished, is_loaded() is False, and callers should list the
+    unpatrolled changes themselves.
+
+    If a poll fails, on_error is called with the exception, and the
+    feed keeps serving the changes it has until the next poll. If no poll
+    has succeeded for max_age seconds (by default, five poll intervals),
+    e.g. because polls keep failing or because no user has lent a
+    session since the last one logged out, is_loaded() is False again,
+    and the next successful poll lists the feed from scratch.
+
+    Each poll starts overlap seconds before the previous one ended,
+    so that changes and patrols that reach the API's database replica
+    late, with an earlier timestamp, are not missed."""
+
+    overlap = 60  # seconds
+
+    def __init__(self, anonymous_session: mwapi.Session, poll_interval: float = 10, full_refresh_interval: float = 30 * 60,
+                 max_age: Optional[float] = None,
+                 on_error: Callable[[Exception], object] = lambda error: None) -> None:
+        self.anonymous_session = anonymous_session
+        self.poll_interval = poll_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.max_age = max_age if max_age is not None else 5 * poll_interval
+        self.on_error = on_error
+        # the key identifying the user who lent the session, and the session
+        self._lent_session: Optional[tuple[str, mwapi.Session]] = None
+        self._poll_lock = threading.Lock()  # held during a poll
+        self._lock = threading.Lock()  # held while reading or modifying the changes
+        # metadata of the unpatrolled changes by revision ID,
+        # and the same revision IDs in ascending order
+        self._changes: dict[int, ids.RevisionMetadata] = {}
+        self._rev_ids: list[int] = []
+        self._timestamp: Optional[str] = None  # server time of the last poll
+        self._loaded = False
+        self._polled = float('-inf')  # when the last successful poll ended
+        self._next_full_refresh = float('-inf')
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def lend_session(self, key: str, session: mwapi.Session) -> None:
+        """Let the background thread list unpatrolled changes with the session, starting the thread if needed.
+
+        The key identifies the user (see forget_session())."""
+        self._lent_session = (key, session)
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='unpatrolled-feed', daemon=True)
+                    self._thread.start()
+
+    def forget_session(self, key: str) -> None:
+        """Stop using the session lent by the user with the key, if it is still in use.
+
+        Until another user lends a session, the feed is not polled."""
+        with self._lock:
+            if self._lent_session is not None and self._lent_session[0] == key:
+                self._lent_session = None
+
+    def is_loaded(self) -> bool:
+        """Whether the feed has been listed and is up to date (and can be used)."""
+        return self._loaded and not self._is_stale(time.monotonic())
+
+    def _is_stale(self, now: float) -> bool:
+        return now - self._polled > self.max_age
+
+    def changes(self) -> Mapping[int, ids.RevisionMetadata]:
+        """Return a copy of the unpatrolled changes, newest first."""
+        with self._lock:
+            return {rev_id: self._changes[rev_id] for rev_id in reversed(self._rev_ids)}
+
+    def changes_before(self, rev_id: Optional[int]) -> Iterator[tuple[int, ids.RevisionMetadata]]:
+        """Yield the unpatrolled changes older than the given revision, newest first.
+
+        With rev_id=None, yield all changes. Finding each change takes
+        logarithmic time, regardless of the given revision; changes
+        added to or removed from the feed meanwhile are taken into account."""
+        while True:
+            with self._lock:
+                index = len(self._rev_ids) if rev_id is None else bisect_left(self._rev_ids, rev_id)
+                if index == 0:
+                    return
+                rev_id = self._rev_ids[index - 1]
+                metadata = self._changes[rev_id]
+            yield rev_id, metadata
+
+    def discard(self, rev_id: int) -> None:
+        """Remove a change from the feed, e.g. because it was just patrolled."""
+        with self._lock:
+            self._remove(rev_id)
+
+    def _remove(self, rev_id: int) -> None:
+        # called with _lock held
+        if self._changes.pop(rev_id, None) is not None:
+            del self._rev_ids[bisect_left(self._rev_ids, rev_id)]
+
+    def stop(self) -> None:
+        """Stop the background thread (mainly for tests)."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def poll(self, session: mwapi.Session) -> None:
+        """Update the feed once, listing unpatrolled changes with the given session."""
+        with self._poll_lock:
+            self._poll(session)
+
+    def _run(self) -> None:
+        while True:
+            lent_session = self._lent_session
+            if lent_session is not None:
+                try:
+                    self.poll(lent_session[1])
+                except Exception as error:
+                    self.on_error(error)
+            if self._stopped.wait(self.poll_interval):
+                return
+
+    def _poll(self, session: mwapi.Session) -> None:
+        start = time.monotonic()
+        if self._loaded and start < self._next_full_refresh and not self._is_stale(start):
+            self._update(session)
+        else:
+            self._refresh(session)
+            self._loaded = True
+            self._next_full_refresh = start + self.full_refresh_interval
+        self._polled = time.monotonic()
+
+    def _list_changes(self, session: mwapi.Session, **params: Any) -> tuple[dict[int, ids.RevisionMetadata], str]:
+        """List unpatrolled changes, also returning the current server time."""
+        changes = {}
+        timestamp = None
+        for result in session.get(action='query',
+                                  list='recentchanges',
+                                  rcprop=['ids', 'title', 'user'],
+                                  rcshow='unpatrolled',
+                                  rctype=['edit'],
+                                  rcnamespace=ids.patrolled_namespaces,
+                                  rclimit='max',
+                                  curtimestamp=True,
+                                  continuation=True,
+                                  **params):
+            if timestamp is None:
+                timestamp = result['curtimestamp']
+            for change in result['query']['recentchanges']:
+                if 'user' not in change:
+                    continue  # user hidden
+                metadata = ids.RevisionMetadata(change['pageid'], change['title'], ids.user_fake_id(change['user']))
+                with ids.rev_id_to_page_id_and_title_cache_lock:
+                    ids.rev_id_to_page_id_and_title_cache[change['revid']] = (metadata.page_id, metadata.title)
+                with ids.rev_id_to_user_fake_id_cache_lock:
+                    ids.rev_id_to_user_fake_id_cache[change['revid']] = metadata.user_fake_id
+                changes[change['revid']] = metadata
+        assert timestamp is not None
+        return changes, timestamp
+
+    def _refresh(self, session: mwapi.Session) -> None:
+        changes, timestamp = self._list_changes(session)
+        rev_ids = sorted(changes)
+        with self._lock:
+            self._changes = changes
+            self._rev_ids = rev_ids
+            self._timestamp = timestamp
+
+    def _update(self, session: mwapi.Session) -> None:
+        assert self._timestamp is not None
+        start = _seconds_before(self._timestamp, self.overlap)
+        # changes made since the last poll (and in the overlap before it, again)
+        new_changes, timestamp = self._list_changes(session, rcdir='newer', rcstart=start)
+        # changes patrolled since the last poll (and in the overlap), including any of the new changes
+        patrolled = set()
+        for result in self.anonymous_session.get(action='query',
+                                                 list='logevents',
+                                                 letype='patrol',
+                                                 leprop=['details'],
+                                                 ledir='newer',
+                                                 lestart=start,
+                                                 lelimit='max',
+                                                 continuation=True):
+            for event in result['query']['logevents']:
+                patrolled.add(event['params']['curid'])
+        with self._lock:
+            for rev_id, metadata in new_changes.items():
+                if rev_id not in self._changes:
+                    insort(self._rev_ids, rev_id)
+                self._changes[rev_id] = metadata
+            for rev_id in patrolled:
+                self._remove(rev_id)
+            self._timestamp = timestamp
+
+
+def _seconds_before(timestamp: str, seconds: float) -> str:
+    """Subtract seconds from an API timestamp."""
+    parsed = datetime.datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ')
+    return (parsed - datetime.timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%SZ')
@@ -0,0 +1,50 @@
+"""A process-wide pool of keep-alive HTTP connections.
+
+Each requests.Session has its own connection pool, so a new session
+per Flask request means a new TCP connection and TLS handshake for
+the first API request of every page view. Sessions created here
+instead share one transport adapter, and therefore one pool of
+connections, between all requests (and threads) of the process,
+while auth and cookies stay separate for each session."""
+
+import mwapi  # type: ignore
+import requests
+import requests.adapters
+from typing import Any
+
+
+def _make_adapter(pool_connections: int, pool_maxsize: int) -> requests.adapters.HTTPAdapter:
+    return requests.adapters.HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+
+# how many hosts to keep connections to, and how many connections to keep per host
+# (more than pool_maxsize connections may be opened concurrently, but only that many are kept)
+default_pool_connections = 10
+default_pool_maxsize = 16
+adapter = _make_adapter(default_pool_connections, default_pool_maxsize)
+
+
+def configure(pool_connections: int = default_pool_connections, pool_maxsize: int = default_pool_maxsize) -> None:
+    """(Re)create the shared pool, closing any connections in the old one."""
+    global adapter
+    old_adapter = adapter
+    adapter = _make_adapter(pool_connections, pool_maxsize)
+    old_adapter.close()
+
+
+def requests_session() -> requests.Session:
+    """Create a requests session that uses the shared pool.
+
+    The session must not be closed, since that would close the shared pool."""
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def mwapi_session(host: str, user_agent: str, **session_params: Any) -> mwapi.Session:
+    """Create an mwapi session that uses the shared pool.
+
+    session_params (e.g. auth) are set on the underlying requests session,
+    so they only apply to this session."""
+    return mwapi.Session(host=host, user_agent=user_agent, session=requests_session(), **session_params)
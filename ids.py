@@ -1,69 +1,390 @@
+import base64
 import cachetools
+from collections import Counter, OrderedDict
 from collections.abc import Mapping, MutableMapping
 import hashlib
 import mwapi  # type: ignore
 import threading
-from typing import Generator
+import time
+from typing import Any, Generator, Iterable, Iterator, NamedTuple, Optional
 
+import compactcache
+import scripts
+import sharedcache
 
-class MyLRUCache(cachetools.LRUCache):
-    """An LRU cache that does not consider item assignment as use."""
+
+class MyLRUCache(cachetools.Cache):
+    """An LRU cache that does not consider item assignment as use.
+
+    Built on the public methods of cachetools.Cache rather than
+    subclassing cachetools.LRUCache, whose private order bookkeeping
+    assignment would have to bypass."""
+
+    def __init__(self, maxsize, getsizeof=None):
+        super().__init__(maxsize, getsizeof)
+        # keys from least to most recently used; new keys are added as most recently used
+        self.__order: OrderedDict = OrderedDict()
+
+    def __getitem__(self, key, cache_getitem=cachetools.Cache.__getitem__):
+        value = cache_getitem(self, key)
+        if key in self.__order:  # not if the value came from __missing__
+            self.__order.move_to_end(key)
+        return value
 
     def __setitem__(self, key, value, cache_setitem=cachetools.Cache.__setitem__):
         cache_setitem(self, key, value)
-        # no self.__update(key)
+        self.__order.setdefault(key)
+
+    def __delitem__(self, key, cache_delitem=cachetools.Cache.__delitem__):
+        cache_delitem(self, key)
+        del self.__order[key]
+
+    def popitem(self):
+        """Remove and return the least recently used (key, value) pair."""
+        try:
+            key = next(iter(self.__order))
+        except StopIteration:
+            raise KeyError('%s is empty' % type(self).__name__) from None
+        return (key, self.pop(key))
 
 
-rev_id_to_page_id_and_title_cache = MyLRUCache(maxsize=1024 * 1024)
+# memory budgets of the in-process caches in bytes, configurable via configure_caches()
+default_cache_budgets = {
+    'page_id_and_title': 64 * 1024 * 1024,
+    'user_fake_id': 16 * 1024 * 1024,
+    'show_patrol_footer': 16 * 1024 * 1024,
+    'primary_script': 32 * 1024 * 1024,
+}
+# budgets of the caches created on import, for tests and scripts;
+# the app replaces them once, with configure_caches() or use_shared_caches()
+import_cache_budgets = {name: 1024 * 1024 for name in default_cache_budgets}
+# estimated memory per entry of the cachetools caches, including the key (measured with tracemalloc)
+title_to_show_patrol_footer_entry_bytes = 320
+rev_id_to_primary_script_entry_bytes = 150
+title_to_show_patrol_footer_ttl: float = 5 * 60  # time-to-live is in seconds
+shared_cache_maxsize = 1024 * 1024
+
+
+def _make_caches(budgets: Mapping[str, int], show_patrol_footer_ttl: float) -> tuple[
+        MutableMapping[int, tuple[int, str]],
+        MutableMapping[int, int],
+        MutableMapping[str, bool],
+        MutableMapping[int, Optional[str]],
+]:
+    unknown = budgets.keys() - default_cache_budgets.keys()
+    if unknown:
+        raise ValueError(f'unknown cache names: {", ".join(sorted(unknown))}')
+    budgets = {**default_cache_budgets, **budgets}
+    return (
+        compactcache.PageIdAndTitleCache(maxbytes=budgets['page_id_and_title']),
+        compactcache.IntCache(maxbytes=budgets['user_fake_id']),
+        cachetools.TTLCache(
+            maxsize=budgets['show_patrol_footer'],
+            ttl=show_patrol_footer_ttl,
+            getsizeof=lambda value: title_to_show_patrol_footer_entry_bytes,
+        ),
+        MyLRUCache(
+            maxsize=budgets['primary_script'],
+            getsizeof=lambda value: rev_id_to_primary_script_entry_bytes,
+        ),
+    )
+
+
+(rev_id_to_page_id_and_title_cache,
+ rev_id_to_user_fake_id_cache,
+ title_to_show_patrol_footer_cache,
+ rev_id_to_primary_script_cache) = _make_caches(import_cache_budgets, title_to_show_patrol_footer_ttl)
 rev_id_to_page_id_and_title_cache_lock = threading.RLock()
-rev_id_to_user_fake_id_cache = MyLRUCache(maxsize=1024 * 1024)
 rev_id_to_user_fake_id_cache_lock = threading.RLock()
-title_to_show_patrol_footer_cache = cachetools.TTLCache(  # type: ignore
-    maxsize=1024 * 1024,
-    ttl=5 * 60,  # time-to-live is in seconds
-)
 title_to_show_patrol_footer_cache_lock = threading.RLock()
+rev_id_to_primary_script_cache_lock = threading.RLock()
+# hits (saved compare requests) and misses of rev_id_to_primary_script_cache
+rev_id_to_primary_script_cache_stats: Counter[str] = Counter()
+
+
+def configure_caches(budgets: Mapping[str, int] = {}, show_patrol_footer_ttl: float = 5 * 60) -> None:
+    """(Re)create the in-process caches, emptying them.
+
+    budgets maps cache names (see default_cache_budgets) to the memory
+    in bytes that the cache may use; caches not in budgets get their
+    default budget. Each cache evicts entries to stay within its budget,
+    based on an estimate of the size of its entries."""
+    global rev_id_to_page_id_and_title_cache, rev_id_to_user_fake_id_cache
+    global title_to_show_patrol_footer_cache, rev_id_to_primary_script_cache
+    global title_to_show_patrol_footer_ttl
+    (rev_id_to_page_id_and_title_cache,
+     rev_id_to_user_fake_id_cache,
+     title_to_show_patrol_footer_cache,
+     rev_id_to_primary_script_cache) = _make_caches(budgets, show_patrol_footer_ttl)
+    title_to_show_patrol_footer_ttl = show_patrol_footer_ttl
+
+
+def use_shared_caches(path: str, show_patrol_footer_ttl: float = 5 * 60) -> None:
+    """Replace the in-process caches with caches in an SQLite database.
+
+    All processes configured with the same path (e.g. all gunicorn
+    workers of the tool) then share the caches, so that a revision
+    looked up by one worker is a cache hit in all the others.
+    The shared caches are limited by number of entries, not bytes."""
+    global rev_id_to_page_id_and_title_cache, rev_id_to_user_fake_id_cache
+    global title_to_show_patrol_footer_cache, rev_id_to_primary_script_cache
+    global title_to_show_patrol_footer_ttl
+    title_to_show_patrol_footer_ttl = show_patrol_footer_ttl
+    rev_id_to_page_id_and_title_cache = sharedcache.SQLiteCache(path, 'rev_id_to_page_id_and_title', maxsize=shared_cache_maxsize)
+    rev_id_to_user_fake_id_cache = sharedcache.SQLiteCache(path, 'rev_id_to_user_fake_id', maxsize=shared_cache_maxsize)
+    title_to_show_patrol_footer_cache = sharedcache.SQLiteCache(path, 'title_to_show_patrol_footer', maxsize=shared_cache_maxsize,
+                                                                ttl=title_to_show_patrol_footer_ttl)
+    rev_id_to_primary_script_cache = sharedcache.SQLiteCache(path, 'rev_id_to_primary_script', maxsize=shared_cache_maxsize)
+
+
+class CacheUsage(NamedTuple):
+    entries: int
+    bytes: Optional[int]  # estimated; None for shared caches, which are not in memory
+
+
+def cache_usage() -> dict[str, CacheUsage]:
+    """Report the number of entries and memory use of each cache."""
+    caches: dict[str, MutableMapping] = {
+        'page_id_and_title': rev_id_to_page_id_and_title_cache,
+        'user_fake_id': rev_id_to_user_fake_id_cache,
+        'show_patrol_footer': title_to_show_patrol_footer_cache,
+        'primary_script': rev_id_to_primary_script_cache,
+    }
+    usage = {}
+    for name, cache in caches.items():
+        size: Optional[int]
+        if isinstance(cache, compactcache.PageIdAndTitleCache | compactcache.IntCache):
+            size = cache.currbytes
+        elif isinstance(cache, cachetools.Cache):
+            size = int(cache.currsize)  # sum of getsizeof()
+        else:
+            size = None
+        usage[name] = CacheUsage(len(cache), size)
+    return usage
+
+
+patrolled_namespaces = [
+    0,  # Main (Item)
+    120,  # Property
+    146,  # Lexeme
+]
+
+
+# how many IDs of each type to remember in the session (see append);
+# user fake IDs and page IDs are spread out, so each takes 4-5 bytes even when encoded,
+# while skipped rev IDs are close to each other, so they take 2 bytes each
+default_id_limits = {
+    'rev_ids': 500,
+    'page_ids': 100,
+    'user_fake_ids': 25,
+}
+# limits for sessions stored on the server, where they are not limited by the cookie size
+server_side_id_limits = {
+    'rev_ids': 5000,
+    'page_ids': 2000,
+    'user_fake_ids': 500,
+}
+id_limits = default_id_limits
+
+
+def configure_id_limits(limits: Mapping[str, int] = {}, defaults: Mapping[str, int] = default_id_limits) -> None:
+    """Set how many IDs of each type (see default_id_limits) to remember.
+
+    ID types not in limits get their limit from defaults."""
+    global id_limits
+    for name in limits:
+        if name not in default_id_limits:
+            raise ValueError('unknown ID type: ' + name)
+    id_limits = {**defaults, **limits}
 
 
 def id_limit(name: str) -> int:
     if name.endswith('_user_fake_ids'):
-        return 25
+        return id_limits['user_fake_ids']
     elif name.endswith('_page_ids'):
-        return 100
+        return id_limits['page_ids']
     else:
-        return 250
+        return id_limits['rev_ids']
+
+
+# bytes of a variable-length integer that are followed by more bytes of the same integer
+_continuation_bytes = bytes(range(0x80, 0x100))
+
+
+def _encode_delta(delta: int) -> bytes:
+    zigzag = delta * 2 if delta >= 0 else -delta * 2 - 1
+    encoded = bytearray()
+    while zigzag >= 0x80:
+        encoded.append(zigzag & 0x7f | 0x80)
+        zigzag >>= 7
+    encoded.append(zigzag)
+    return bytes(encoded)
+
+
+def _decode_delta(encoded: bytes, offset: int) -> tuple[int, int]:
+    """Decode the delta at the offset, returning it and the offset after it."""
+    zigzag = 0
+    shift = 0
+    while True:
+        byte = encoded[offset]
+        offset += 1
+        zigzag |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return (zigzag >> 1 if not zigzag & 1 else -(zigzag >> 1) - 1), offset
+        shift += 7
 
 
-def get(dict: Mapping[str, list[int]], name: str) -> list[int]:
+def _base64_encode(encoded: bytes) -> str:
+    return base64.urlsafe_b64encode(encoded).decode('ascii').rstrip('=')
+
+
+def _base64_decode(encoded: str) -> bytes:
+    return base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+
+
+def encode(ids: list[int]) -> str:
+    """Encode a list of IDs compactly, for storage in the session cookie.
+
+    Each ID is stored as the difference to the previous one (so that
+    the list keeps its order, most recent first, and nearby IDs take up
+    little space), zigzag-encoded (0, -1, 1, -2, … → 0, 1, 2, 3, …)
+    as a variable-length integer with 7 bits per byte, and the bytes
+    are encoded as URL-safe base64 without padding."""
+    encoded = bytearray()
+    previous = 0
+    for id in ids:
+        encoded += _encode_delta(id - previous)
+        previous = id
+    return _base64_encode(encoded)
+
+
+def decode(encoded: str) -> list[int]:
+    """Decode a list of IDs encoded with encode()."""
+    data = _base64_decode(encoded)
+    ids = []
+    previous = 0
+    offset = 0
+    while offset < len(data):
+        delta, offset = _decode_delta(data, offset)
+        previous += delta
+        ids.append(previous)
+    return ids
+
+
+def get(dict: Mapping[str, Any], name: str) -> list[int]:
     """Get a list of IDs by name from a container."""
     ids = dict.get(name, [])
-    return ids
+    if isinstance(ids, str):
+        return decode(ids)
+    return ids  # not encoded yet (stored by an older version)
 
 
-def append(dict: MutableMapping[str, list[int]], name: str, id: int) -> None:
+def append(dict: MutableMapping[str, Any], name: str, id: int) -> None:
     """Append an ID to a list of IDs by that name in a container.
 
     The list is automatically limited to the most recent IDs,
-    with the limit depending on the ID type (see id_limit).
+    with the limit depending on the ID type (see id_limit),
+    and stored in encoded form (see encode).
     """
-    ids = dict.get(name, [])
-    ids = [id] + ids[:id_limit(name)]
-    dict[name] = ids
+    stored = dict.get(name)
+    if not isinstance(stored, str) or not stored:
+        ids = get(dict, name)
+        dict[name] = encode([id] + ids[:id_limit(name)])
+        return
+    # prepend the new ID without decoding the whole list:
+    # only the first ID, stored relative to 0, changes to be relative to the new ID
+    data = _base64_decode(stored)
+    first, offset = _decode_delta(data, 0)
+    data = _encode_delta(id) + _encode_delta(first - id) + data[offset:]
+    count = len(data.translate(None, _continuation_bytes))  # one byte per ID is not a continuation byte
+    while count > id_limit(name) + 1:
+        # drop the last ID
+        end = len(data) - 1
+        while end > 0 and data[end - 1] & 0x80:
+            end -= 1
+        data = data[:end]
+        count -= 1
+    dict[name] = _base64_encode(data)
+
+
+class IdSets:
+    """A read-optimized view of the lists of IDs in a container.
+
+    view[name] returns the list of that name as a frozenset, for fast
+    membership tests. The set is built on first use and reused as long
+    as the container holds the same (encoded) list object; append()
+    replaces the list with a new one, which invalidates the set.
+    Create one view per request (the container may be replaced
+    between requests)."""
+
+    def __init__(self, container: Mapping[str, Any]) -> None:
+        self._container = container
+        self._sets: dict[str, tuple[Any, frozenset[int]]] = {}
+
+    def __getitem__(self, name: str) -> frozenset[int]:
+        stored = self._container.get(name)
+        cached = self._sets.get(name)
+        if cached is not None and cached[0] is stored:
+            return cached[1]
+        id_set = frozenset(get(self._container, name))
+        self._sets[name] = (stored, id_set)  # keep the stored value alive so its identity stays unique
+        return id_set
 
 
 def user_fake_id(user_name: str) -> int:
     return int.from_bytes(hashlib.sha256(user_name.encode('utf8')).digest()[:4], 'big')
 
 
-@cachetools.cached(cache=rev_id_to_page_id_and_title_cache,
-                   key=lambda rev_id, session: rev_id,
-                   lock=rev_id_to_page_id_and_title_cache_lock)
+class RevisionMetadata(NamedTuple):
+    page_id: int
+    title: str
+    user_fake_id: int
+
+
+def resolve_rev_ids(rev_ids: Iterable[int], session: mwapi.Session, batch_size: int = 50) -> dict[int, RevisionMetadata]:
+    """Look up the page and user of several revisions at once.
+
+    Revisions that are not yet in both the page ID and title cache
+    and the user fake ID cache are looked up with as few API requests
+    as possible (batch_size revisions per request – the API allows 50,
+    or 500 with the apihighlimits right), and both caches are filled;
+    revisions whose user is hidden only get a page ID and title.
+    Returns the metadata of the revisions that were looked up
+    (except for those with a hidden user)."""
+    missing = []
+    for rev_id in rev_ids:
+        with rev_id_to_page_id_and_title_cache_lock, rev_id_to_user_fake_id_cache_lock:
+            if rev_id not in rev_id_to_page_id_and_title_cache or rev_id not in rev_id_to_user_fake_id_cache:
+                missing.append(rev_id)
+    results = {}
+    for i in range(0, len(missing), batch_size):
+        response = session.get(action='query',
+                               revids=missing[i:i + batch_size],
+                               prop=['revisions'],
+                               rvprop=['ids', 'user'],
+                               formatversion=2)
+        for page in response['query'].get('pages', []):
+            for revision in page.get('revisions', []):
+                with rev_id_to_page_id_and_title_cache_lock:
+                    rev_id_to_page_id_and_title_cache[revision['revid']] = (page['pageid'], page['title'])
+                if 'user' not in revision:
+                    continue  # user hidden
+                metadata = RevisionMetadata(page['pageid'], page['title'], user_fake_id(revision['user']))
+                with rev_id_to_user_fake_id_cache_lock:
+                    rev_id_to_user_fake_id_cache[revision['revid']] = metadata.user_fake_id
+                results[revision['revid']] = metadata
+    return results
+
+
 def rev_id_to_page_id_and_title(rev_id: int, session: mwapi.Session) -> tuple[int, str]:
-    response = session.get(action='query',
-                           revids=[rev_id],
-                           formatversion=2)
-    page = response['query']['pages'][0]
-    return (page['pageid'], page['title'])
+    with rev_id_to_page_id_and_title_cache_lock:
+        try:
+            return rev_id_to_page_id_and_title_cache[rev_id]
+        except KeyError:
+            pass
+    resolve_rev_ids([rev_id], session)
+    with rev_id_to_page_id_and_title_cache_lock:
+        return rev_id_to_page_id_and_title_cache[rev_id]  # KeyError if there is no such revision
 
 
 def rev_id_to_page_id(rev_id: int, session: mwapi.Session) -> int:
@@ -74,53 +395,281 @@ def rev_id_to_title(rev_id: int, session: mwapi.Session) -> str:
     return rev_id_to_page_id_and_title(rev_id, session)[1]
 
 
-@cachetools.cached(cache=rev_id_to_user_fake_id_cache,
-                   key=lambda rev_id, session: rev_id,
-                   lock=rev_id_to_user_fake_id_cache_lock)
+class UserHiddenError(LookupError):
+    """The user of a revision is hidden (revision deleted), so it has no user fake ID."""
+
+
 def rev_id_to_user_fake_id(rev_id: int, session: mwapi.Session) -> int:
-    return user_fake_id(session.get(action='query',
-                                    revids=[rev_id],
-                                    prop=['revisions'],
-                                    rvprop=['user'],
-                                    formatversion=2)['query']['pages'][0]['revisions'][0]['user'])
+    with rev_id_to_user_fake_id_cache_lock:
+        try:
+            return rev_id_to_user_fake_id_cache[rev_id]
+        except KeyError:
+            pass
+    results = resolve_rev_ids([rev_id], session)
+    if rev_id not in results:
+        with rev_id_to_page_id_and_title_cache_lock:
+            if rev_id in rev_id_to_page_id_and_title_cache:
+                raise UserHiddenError(f'the user of revision {rev_id} is hidden')
+        raise KeyError(rev_id)
+    return results[rev_id].user_fake_id
+
 
+def unpatrolled_changes(session: mwapi.Session, start: Optional[str] = None) -> Generator[tuple[int, str], None, None]:
+    """Yield the rev ID and timestamp of each unpatrolled change, newest first.
 
-def unpatrolled_changes(session: mwapi.Session) -> Generator[int, None, None]:
+    With a start timestamp, begin with the changes made at that time
+    (which the caller may have seen already) instead of the newest ones."""
+    params = {}
+    if start is not None:
+        params['rcstart'] = start
     for result in session.get(action='query',
                               list='recentchanges',
-                              rcprop=['ids', 'title', 'user'],
+                              rcprop=['ids', 'title', 'user', 'timestamp'],
                               rcshow='unpatrolled',
                               rctype=['edit'],  # TODO consider including 'new' as well
-                              rcnamespace=[
-                                  0,  # Main (Item)
-                                  120,  # Property
-                                  146,  # Lexeme
-                              ],
+                              rcnamespace=patrolled_namespaces,
                               rclimit='max',
-                              continuation=True):
+                              continuation=True,
+                              **params):
         for change in result['query']['recentchanges']:
             with rev_id_to_page_id_and_title_cache_lock:
                 rev_id_to_page_id_and_title_cache[change['revid']] = (change['pageid'], change['title'])
             with rev_id_to_user_fake_id_cache_lock:
                 rev_id_to_user_fake_id_cache[change['revid']] = user_fake_id(change['user'])
-            yield change['revid']
+            yield change['revid'], change['timestamp']
+
+
+def newest_of_groups(changes: Iterable[tuple[int, int, int]]) -> Iterator[tuple[int, int, int]]:
+    """Filter (rev ID, page ID, user fake ID) tuples, newest first, to the newest change of each group.
+
+    A group is all the changes by one user to one page, which can often
+    be reviewed together (see rev_id_to_group)."""
+    seen = set()
+    for rev_id, page_id, user_fake_id in changes:
+        if (page_id, user_fake_id) in seen:
+            continue
+        seen.add((page_id, user_fake_id))
+        yield rev_id, page_id, user_fake_id
+
+
+class RevisionGroup(NamedTuple):
+    rev_ids: list[int]  # consecutive edits by one user to one page, newest first
+    unpatrolled_rev_ids: list[int]
+    parent_rev_id: int  # the revision before the oldest edit in the group
+
+
+def rev_id_to_group(rev_id: int, session: mwapi.Session, limit: int = 50) -> RevisionGroup:
+    """Find the run of consecutive edits by the same user that ends with the given revision.
+
+    The group contains the given revision and up to limit - 1 edits
+    directly before it (without edits by other users in between),
+    as far as they are still in the recent changes.
+    The session must have the patrol right, to see which edits are patrolled."""
+    changes = (change
+               for result in session.get(action='query',
+                                         list='recentchanges',
+                                         rctitle=rev_id_to_title(rev_id, session),
+                                         rcprop=['ids', 'user', 'patrolled'],
+                                         rctype=['edit'],
+                                         rclimit='max',
+                                         formatversion=2,
+                                         continuation=True)
+               for change in result['query']['recentchanges'])
+    for change in changes:  # newest first
+        if change['revid'] == rev_id:
+            break
+    else:
+        return RevisionGroup([rev_id], [rev_id], 0)  # not in the recent changes (anymore)
+    user = change.get('user')
+    if user is None:
+        return RevisionGroup([rev_id], [rev_id], 0)  # user hidden
+    rev_ids: list[int] = []
+    unpatrolled_rev_ids: list[int] = []
+    while True:
+        rev_ids.append(change['revid'])
+        if not change['patrolled']:
+            unpatrolled_rev_ids.append(change['revid'])
+        parent_rev_id = change['old_revid']
+        if len(rev_ids) >= limit:
+            break
+        change = next(changes, None)
+        if change is None or change.get('user') != user or change['revid'] != parent_rev_id:
+            break
+    return RevisionGroup(rev_ids, unpatrolled_rev_ids, parent_rev_id)
 
 
-@cachetools.cached(cache=title_to_show_patrol_footer_cache,
-                   key=lambda title, session: title,
-                   lock=title_to_show_patrol_footer_cache_lock)
 def title_to_show_patrol_footer(title: str, session: mwapi.Session) -> bool:
+    with title_to_show_patrol_footer_cache_lock:
+        try:
+            return title_to_show_patrol_footer_cache[title]
+        except KeyError:
+            pass
     # roughly equivalent to Article::showPatrolFooter() –
     # if that returns true, iframe embedding is disabled to prevent clickjacking,
     # so we don’t want to show such pages to the user
-    return bool(session.get(action='query',
-                            list='recentchanges',
-                            rctitle=title,
-                            rctype=['new'],
-                            rclimit=1,
-                            rcshow=['!patrolled'],
-                            rcprop=[])['query']['recentchanges'])
+    show_patrol_footer = bool(session.get(action='query',
+                                          list='recentchanges',
+                                          rctitle=title,
+                                          rctype=['new'],
+                                          rclimit=1,
+                                          rcshow=['!patrolled'],
+                                          rcprop=[])['query']['recentchanges'])
+    with title_to_show_patrol_footer_cache_lock:
+        title_to_show_patrol_footer_cache[title] = show_patrol_footer
+    return show_patrol_footer
+
+
+class UnpatrolledCreations:
+    """An in-memory index of pages whose creation is not patrolled yet.
+
+    The index is built from a paginated list of all unpatrolled page
+    creations in the namespaces we patrol, which is fully rebuilt
+    every full_refresh_interval seconds, and extended with any newer
+    unpatrolled creations every refresh_interval seconds.
+
+    may_contain() can rule out most pages without any API request:
+    if a page is not in the index and was created before the last
+    refresh (page IDs are assigned in ascending order), its creation
+    is not unpatrolled. Pages in the index may have been patrolled
+    since the last refresh, and newer pages are unknown to the index,
+    so for those the caller has to check with the API.
+
+    Listing unpatrolled creations requires the patrol right, so the
+    index is refreshed with the session of the latest user who lent it
+    one (see lend_session()), until that user logs out (see
+    forget_session()); without a session, no refresh is started.
+    Refreshes run in a background thread, started by the first
+    may_contain() call after they are due; until the first one
+    finishes, may_contain() rules out nothing, and afterwards it answers
+    from the last refresh in the meantime. If a refresh fails, the next
+    one is only started refresh_interval seconds later."""
+
+    def __init__(self, refresh_interval: float = 60, full_refresh_interval: float = 30 * 60) -> None:
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self._lock = threading.Lock()  # held while starting or finishing a refresh
+        # the key identifying the user who lent the session, and the session
+        self._lent_session: Optional[tuple[str, mwapi.Session]] = None
+        # page IDs of unpatrolled creations, the highest page ID of any creation,
+        # and the timestamp of the latest creation (all as of the last refresh)
+        self._page_ids: frozenset[int] = frozenset()
+        self._max_page_id = 0
+        self._timestamp: Optional[str] = None
+        self._loaded = False
+        self._next_refresh = float('-inf')
+        self._next_full_refresh = float('-inf')
+        self._thread: Optional[threading.Thread] = None  # of the running refresh
+
+    def lend_session(self, key: str, session: mwapi.Session) -> None:
+        """Let the background thread refresh the index with the session.
+
+        The key identifies the user (see forget_session())."""
+        self._lent_session = (key, session)
+
+    def forget_session(self, key: str) -> None:
+        """Stop using the session lent by the user with the key, if it is still in use.
+
+        Until another user lends a session, the index is not refreshed."""
+        with self._lock:
+            if self._lent_session is not None and self._lent_session[0] == key:
+                self._lent_session = None
+
+    def may_contain(self, page_id: int) -> bool:
+        """Whether the page may have an unpatrolled creation.
+
+        If this returns False, the page definitely has no unpatrolled creation."""
+        self._refresh_if_due()
+        if not self._loaded:
+            return True
+        return page_id in self._page_ids or page_id > self._max_page_id
+
+    def _refresh_if_due(self) -> None:
+        if time.monotonic() < self._next_refresh:
+            return
+        with self._lock:
+            if self._thread is not None or time.monotonic() < self._next_refresh:
+                return  # another thread started a refresh already
+            if self._lent_session is None:
+                return
+            self._thread = threading.Thread(target=self._run, args=(self._lent_session[1],),
+                                            name='unpatrolled-creations', daemon=True)
+            self._thread.start()
+
+    def _run(self, session: mwapi.Session) -> None:
+        # if the refresh fails, the exception is reported by threading.excepthook,
+        # and the next refresh is due refresh_interval seconds later, as after a success
+        start = time.monotonic()
+        try:
+            self._refresh(session, full=start >= self._next_full_refresh)
+        finally:
+            with self._lock:
+                self._next_refresh = start + self.refresh_interval
+                self._thread = None
+
+    def join(self) -> None:
+        """Wait for the running refresh, if any, to finish (mainly for tests)."""
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _refresh(self, session: mwapi.Session, full: bool) -> None:
+        start = time.monotonic()
+        # get the latest creation first, so that all unpatrolled creations
+        # up to that one are included in the list below
+        latest_creations = session.get(action='query',
+                                       list='recentchanges',
+                                       rctype=['new'],
+                                       rcnamespace=patrolled_namespaces,
+                                       rcprop=['ids', 'timestamp'],
+                                       rclimit=1)['query']['recentchanges']
+        params = {}
+        if not full and self._timestamp:
+            params = {'rcdir': 'newer', 'rcstart': self._timestamp}
+        page_ids = set() if full else set(self._page_ids)
+        for result in session.get(action='query',
+                                  list='recentchanges',
+                                  rctype=['new'],
+                                  rcshow=['!patrolled'],
+                                  rcnamespace=patrolled_namespaces,
+                                  rcprop=['ids'],
+                                  rclimit='max',
+                                  continuation=True,
+                                  **params):
+            page_ids.update(change['pageid'] for change in result['query']['recentchanges'])
+        self._page_ids = frozenset(page_ids)
+        if latest_creations:
+            self._max_page_id = max(self._max_page_id, latest_creations[0]['pageid'])
+            self._timestamp = latest_creations[0]['timestamp']
+        self._loaded = True
+        if full:
+            self._next_full_refresh = start + self.full_refresh_interval
+
+
+unpatrolled_creations = UnpatrolledCreations()
 
 
 def rev_id_to_show_patrol_footer(rev_id: int, session: mwapi.Session) -> bool:
+    if not unpatrolled_creations.may_contain(rev_id_to_page_id(rev_id, session)):
+        return False
     return title_to_show_patrol_footer(rev_id_to_title(rev_id, session), session)
+
+
+def rev_id_to_primary_script(rev_id: int, session: mwapi.Session) -> Optional[str]:
+    # a revision’s diff never changes, so this is shared by all users
+    with rev_id_to_primary_script_cache_lock:
+        try:
+            primary_script = rev_id_to_primary_script_cache[rev_id]
+            rev_id_to_primary_script_cache_stats['hits'] += 1
+            return primary_script
+        except KeyError:
+            rev_id_to_primary_script_cache_stats['misses'] += 1
+    diff_body = session.get(action='compare',
+                            fromrev=rev_id,
+                            torelative='prev',
+                            prop=['diff'],
+                            uselang='en',
+                            formatversion=2)['compare']['body']
+    primary_script = scripts.primary_script_of_diff(diff_body)
+    with rev_id_to_primary_script_cache_lock:
+        rev_id_to_primary_script_cache[rev_id] = primary_script
+    return primary_script
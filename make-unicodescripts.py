@@ -1,23 +1,48 @@
 #!/usr/bin/python3
+"""Generate unicodescripts.dat from the Unicode Scripts.txt file.
 
+Usage: ./make-unicodescripts.py [Scripts.txt] > unicodescripts.dat
+
+If no path to a local Scripts.txt file is given,
+the latest version is downloaded from unicode.org.
+See unicodescripts.py for the format of the generated file."""
+
+import contextlib
+import hashlib
+import re
+import struct
+import sys
+from typing import IO, Iterator
 import urllib.request
 
 
-print("""#!/usr/bin/python3
+# keep in sync with unicodescripts.py
+MAGIC = b'USCR'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHBBBxHII32s')
+FIXED_SCRIPTS = ['Unknown', 'Common', 'Inherited']
+
 
-import intervaltree  # type: ignore
-from typing import Iterable, cast
+@contextlib.contextmanager
+def open_scripts_txt() -> Iterator[IO[bytes]]:
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as f:
+            yield f
+    else:
+        with urllib.request.urlopen('https://www.unicode.org/Public/UNIDATA/Scripts.txt') as r:
+            yield r
 
 
-_tree = intervaltree.IntervalTree()
-""")
+unicode_version = None
+ranges = []  # list of (begin, end, script) tuples, end exclusive
 
-with urllib.request.urlopen('https://www.unicode.org/Public/UNIDATA/Scripts.txt') as r:
-    prior_begin = None
-    prior_end = None
-    prior_script = None
-    for line in r:
-        line = line.decode('utf-8')
+with open_scripts_txt() as r:
+    for raw_line in r:
+        line = raw_line.decode('utf-8')
+        if unicode_version is None:
+            match = re.match(r'# Scripts-(\d+)\.(\d+)\.(\d+)\.txt', line)
+            if match:
+                unicode_version = tuple(int(part) for part in match.groups())
         line = line.split('#', 1)[0]
         line = line.strip()
         if not line:
@@ -30,38 +55,58 @@ with urllib.request.urlopen('https://www.unicode.org/Public/UNIDATA/Scripts.txt'
             last = first
         begin = int(first, base=16)
         end = int(last, base=16) + 1
-        if begin == prior_end:
-            # merge adjacent ranges (only differ in comment)
-            prior_end = end
-        else:
-            # new range, print the prior one (unless this is the first one)
-            if prior_begin is not None and prior_end is not None and prior_script is not None:
-                print("_tree[%d:%d] = %s" % (prior_begin, prior_end, repr(prior_script)))
-            prior_begin, prior_end, prior_script = begin, end, script
-
-# print the final range
-if prior_begin and prior_end and prior_script:
-    print("_tree[%d:%d] = %s" % (prior_begin, prior_end, repr(prior_script)))
-
-print('''
-
-def script(chr: str) -> str:
-    """Return the script of the given character.
-
-    If the script for the character is not known,
-    'Unknown' is returned."""
-    intervals = _tree[ord(chr)]
-    if len(intervals) == 1:
-        return cast(str, intervals.pop().data)
-    elif not intervals:
-        return 'Unknown'
-    else:
-        # this should never happen
-        raise ValueError('more than one script for character ' + chr)
+        ranges.append((begin, end, script))
+
+if unicode_version is None:
+    sys.exit('Could not determine the Unicode version (missing "# Scripts-X.Y.Z.txt" header)')
+
+# scripts in order of first appearance, after the ones with fixed indices
+scripts = list(FIXED_SCRIPTS)
+for begin, end, script in ranges:
+    if script not in scripts:
+        scripts.append(script)
+
+# turn the ranges into a table of range starts covering all code points,
+# filling any gaps with the 'Unknown' script and merging adjacent ranges
+starts: list[int] = []
+script_indices: list[int] = []
+
+
+def add_range(begin: int, script_index: int) -> None:
+    if script_indices and script_indices[-1] == script_index:
+        return  # merge with the prior range
+    starts.append(begin)
+    script_indices.append(script_index)
+
 
+prior_end = 0
+for begin, end, script in sorted(ranges):
+    if begin > prior_end:
+        add_range(prior_end, 0)
+    add_range(begin, scripts.index(script))
+    prior_end = end
+if prior_end < 0x110000:
+    add_range(prior_end, 0)
 
-def all_scripts() -> Iterable[str]:
-    """Return a set of all scripts known to this module.
+# direct lookup table from code point to script index for the BMP
+bmp = bytearray(0x10000)
+for start, end, script_index in zip(starts, starts[1:] + [0x110000], script_indices):
+    if start >= 0x10000:
+        break
+    end = min(end, 0x10000)
+    bmp[start:end] = bytes((script_index,)) * (end - start)
 
-    This does not include the 'Unknown' default script."""
-    return set(i.data for i in _tree)''')
+names = '\0'.join(scripts).encode('ascii')
+names += b'\0' * (-len(names) % 4)  # keep the following tables aligned
+payload = (names +
+           bytes(bmp) +
+           struct.pack('<%dI' % len(starts), *starts) +
+           bytes(script_indices))
+header = HEADER.pack(MAGIC,
+                     FORMAT_VERSION,
+                     *unicode_version,
+                     len(scripts),
+                     len(names),
+                     len(starts),
+                     hashlib.sha256(payload).digest())
+sys.stdout.buffer.write(header + payload)
@@ -0,0 +1,86 @@
+import concurrent.futures
+import mwapi  # type: ignore
+import threading
+import time
+from typing import Callable, NamedTuple
+
+
+class PatrolFailure(NamedTuple):
+    rev_id: int
+    error: str
+
+
+class PatrolQueue:
+    """A queue of patrol actions, executed in the background.
+
+    Instead of waiting for the patrol request before redirecting the user
+    to the next diff, the patrol endpoint submits it to the queue, which
+    runs up to max_workers of them concurrently. Requests that fail with
+    a temporary error (network errors, or API errors with a code in
+    retry_codes) are retried up to retries times, waiting retry_delay
+    seconds (doubled after each attempt) in between; other errors are
+    not retried. Failures are recorded per user, so that they can be
+    shown to the user on the next page.
+
+    Until a patrol has succeeded or failed, its revision is pending,
+    and should not be shown to anyone for patrolling."""
+
+    retry_codes = frozenset(['ratelimited', 'readonly', 'maxlag'])
+
+    def __init__(self, max_workers: int = 2, retries: int = 2, retry_delay: float = 1) -> None:
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='patrol')
+        self._lock = threading.Lock()
+        self._pending: frozenset[int] = frozenset()  # replaced, never modified, so it can be read without the lock
+        self._failures: dict[str, list[PatrolFailure]] = {}
+
+    def submit(self, user: str, rev_id: int, patrol: Callable[[], object],
+               on_success: Callable[[], object] = lambda: None) -> concurrent.futures.Future:
+        """Patrol a revision in the background, calling patrol() until it succeeds.
+
+        user identifies the user whose failures the failure is recorded for;
+        on_success is called after a successful patrol."""
+        with self._lock:
+            self._pending = self._pending | {rev_id}
+        return self._executor.submit(self._run, user, rev_id, patrol, on_success)
+
+    def _run(self, user: str, rev_id: int, patrol: Callable[[], object], on_success: Callable[[], object]) -> None:
+        try:
+            delay = self.retry_delay
+            for attempt in range(self.retries + 1):
+                try:
+                    patrol()
+                    break
+                except Exception as error:
+                    if attempt == self.retries or not self._is_temporary(error):
+                        self._record_failure(user, PatrolFailure(rev_id, str(error)))
+                        return
+                time.sleep(delay)
+                delay *= 2
+            on_success()
+        finally:
+            with self._lock:
+                self._pending = self._pending - {rev_id}
+
+    def _is_temporary(self, error: Exception) -> bool:
+        if isinstance(error, mwapi.errors.APIError):
+            return error.code in self.retry_codes
+        return isinstance(error, (mwapi.errors.ConnectionError, mwapi.errors.TimeoutError, mwapi.errors.HTTPError))
+
+    def _record_failure(self, user: str, failure: PatrolFailure) -> None:
+        with self._lock:
+            self._failures.setdefault(user, []).append(failure)
+
+    def pending(self) -> frozenset[int]:
+        """The revisions submitted for patrolling that are not done yet."""
+        return self._pending
+
+    def pop_failures(self, user: str) -> list[PatrolFailure]:
+        """Return and forget the failed patrols of the user."""
+        with self._lock:
+            return self._failures.pop(user, [])
+
+    def join(self) -> None:
+        """Wait for all submitted patrols and stop the workers (mainly for tests)."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,43 @@
+import collections
+from concurrent.futures import Executor, Future
+from typing import Callable, Generator, Iterable, Optional, TypeVar
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def prefetch(func: Callable[[T], R],
+             items: Iterable[T],
+             executor: Optional[Executor],
+             ahead: int) -> Generator[tuple[T, R], None, None]:
+    """Map func over items, computing up to ahead results in advance.
+
+    The (item, result) pairs are yielded in the order of the items,
+    just like a sequential loop would produce them, but while the
+    consumer looks at one result, the executor already computes the
+    results for the next items. If func raises an exception for an
+    item, it is raised when that item's result would be yielded.
+
+    Once the generator is closed (e.g. because the consumer found
+    what it was looking for), calls that have not started yet are
+    cancelled. Without an executor, or with ahead <= 0, func is
+    simply called sequentially."""
+    if executor is None or ahead <= 0:
+        for item in items:
+            yield item, func(item)
+        return
+
+    futures: collections.deque[tuple[T, Future[R]]] = collections.deque()
+    try:
+        for item in items:
+            futures.append((item, executor.submit(func, item)))
+            if len(futures) >= ahead:
+                item, future = futures.popleft()
+                yield item, future.result()
+        while futures:
+            item, future = futures.popleft()
+            yield item, future.result()
+    finally:
+        for item, future in futures:
+            future.cancel()
@@ -1,20 +1,101 @@
-import bs4
-from typing import Iterable, Optional
+from collections import Counter
+from html.parser import HTMLParser
+import re
+from typing import Iterable, Iterator, Optional
 
 import unicodescripts
 
 
+_ignored_script_indices = [unicodescripts.COMMON, unicodescripts.INHERITED, unicodescripts.UNKNOWN]
+
+
 def scripts_of_text(text: Iterable[str]) -> list[str]:
     """Determine the scripts used in a snippet of text.
 
     The 'Common', 'Inherited' and 'Unknown' scripts are ignored."""
-    scripts: dict[str, int] = {}
-    for char in text:
-        script = unicodescripts.script(char)
-        if script not in {'Common', 'Inherited', 'Unknown'}:
-            scripts[script] = scripts.get(script, 0) + 1
+    return _scripts_of_char_counts(Counter(text))
+
+
+def scripts_of_texts(texts: Iterable[str]) -> list[str]:
+    """Determine the scripts used in several snippets of text.
+
+    The result is the same as for scripts_of_text() on all the
+    characters of all the texts, but the texts are counted as whole
+    strings rather than one character at a time."""
+    return _scripts_of_char_counts(Counter(''.join(texts)))
+
+
+def _scripts_of_char_counts(char_counts: Counter[str]) -> list[str]:
+    scripts: dict[int, int] = {}
+    _add_script_counts(scripts, char_counts)
     common_scripts = sorted(scripts.items(), key=lambda item: item[1], reverse=True)
-    return [script for script, count in common_scripts]
+    return [unicodescripts.script_name(script_index) for script_index, count in common_scripts]
+
+
+def _add_script_counts(scripts: dict[int, int], char_counts: Counter[str]) -> None:
+    # char_counts is ordered by first appearance of each character,
+    # so scripts stays ordered by first appearance of each script
+    for char, count in char_counts.items():
+        script_index = unicodescripts.script_index(char)
+        scripts[script_index] = scripts.get(script_index, 0) + count
+    for script_index in _ignored_script_indices:
+        scripts.pop(script_index, None)
+
+
+class PrimaryScriptDetector:
+    """Incrementally determine the primary script of some text.
+
+    Text is fed in piece by piece, and primary_script() returns the same
+    script as the first result of scripts_of_text() on all the text fed
+    so far. decided() tells whether that script can still change."""
+
+    def __init__(self) -> None:
+        self._scripts: dict[int, int] = {}
+
+    def feed(self, text: Iterable[str]) -> None:
+        _add_script_counts(self._scripts, Counter(text))
+
+    def feed_texts(self, texts: Iterable[str]) -> None:
+        self.feed(''.join(texts))
+
+    def decided(self, remaining: int) -> bool:
+        """Whether the primary script is certain to stay the same
+        if at most the given number of characters is fed in the future.
+
+        This is the case if the leading script is ahead of every other
+        script by more than that many characters."""
+        if remaining <= 0:
+            return True
+        leader_count = 0
+        runner_up_count = 0
+        for count in self._scripts.values():
+            if count > leader_count:
+                leader_count, runner_up_count = count, leader_count
+            elif count > runner_up_count:
+                runner_up_count = count
+        return leader_count - runner_up_count > remaining
+
+    def primary_script(self) -> Optional[str]:
+        if not self._scripts:
+            return None
+        # max() returns the first of several maximal items,
+        # i.e. the script that appeared first, like scripts_of_text()
+        script_index = max(self._scripts, key=lambda script_index: self._scripts[script_index])
+        return unicodescripts.script_name(script_index)
+
+
+def diff_has_script_sections(html: str) -> bool:
+    """Cheaply check whether a Wikidata diff may contain any text
+    that primary_script_of_diff() considers.
+
+    If this returns False, primary_script_of_diff() returns None."""
+    return ('label / ' in html or
+            'description /' in html or
+            'aliases /' in html or
+            'links /' in html or
+            ('Property /' in html and
+             ('wb-monolingualtext-value' in html or
+              '//commons.wikimedia.org/' in html)))
 
 
 def primary_script_of_diff(html: str) -> Optional[str]:
@@ -22,22 +103,161 @@ def primary_script_of_diff(html: str) -> Optional[str]:
 
     Only the scripts of terms, sitelinks, monolingual text values and
     Commons media are considered. For this to work, the diff UI
-    (specifically, the headers) must be in English."""
-    soup = bs4.BeautifulSoup(html, 'html.parser')
-    elements = [content for content in soup.contents if type(content) is bs4.Tag]
-    texts: list[str] = []
-    for i in range(0, len(elements), 2):
-        lineno = elements[i].get_text()
+    (specifically, the headers) must be in English.
+
+    The diff is parsed and counted incrementally, and this stops as
+    soon as the rest of the diff is too short to change the result."""
+    if not diff_has_script_sections(html):
+        return None
+    detector = PrimaryScriptDetector()
+    # upper bound for the length of the text that has not been fed yet
+    remaining = _text_length(html)
+    parsed = 0
+    for texts, end in _diff_sections(html):
+        detector.feed_texts(texts)
+        remaining -= _text_length(html[parsed:end])
+        parsed = end
+        if detector.decided(remaining=remaining):
+            break
+    return detector.primary_script()
+
+
+def texts_of_diff(html: str) -> list[str]:
+    """Extract the texts of a Wikidata diff that primary_script_of_diff() considers."""
+    return [text for texts, end in _diff_sections(html) for text in texts]
+
+
+_tag_pattern = re.compile(r'<[^>]*>')
+
+
+def _text_length(html: str) -> int:
+    """An upper bound for the length of the text in the given HTML."""
+    return len(_tag_pattern.sub('', html))
+
+
+def _diff_sections(html: str) -> Iterator[tuple[list[str], int]]:
+    """Lazily extract the texts of each section of a diff.
+
+    The HTML is fed to the parser one table row at a time, and the
+    texts of each section (pair of top-level elements) are yielded
+    together with the offset in the HTML up to which it was parsed."""
+    parser = _DiffTextParser()
+    begin = 0
+    while begin < len(html):
+        end = html.find('<tr', begin + 1)
+        if end == -1:
+            end = len(html)
+        parser.feed(html[begin:end])
+        for texts in parser.sections:
+            yield texts, end
+        parser.sections.clear()
+        begin = end
+    parser.close()
+    for texts in parser.sections:
+        yield texts, len(html)
+
+
+class _DiffTextParser(HTMLParser):
+    """Extract texts from a diff without building a document tree.
+
+    The top-level elements of a diff come in pairs of a header row
+    ("diff-lineno") and a content row. For each pair, a list of texts
+    is appended to self.sections: for term and sitelink sections, the
+    texts of all .diff-addedline and .diff-deletedline elements in the
+    content row; for statement sections, the texts of all
+    .wb-monolingualtext-value elements, followed by the texts of all
+    a.extiw[href^="//commons.wikimedia.org/"] elements. For other
+    sections, the list is empty.
+
+    The result is the same as with BeautifulSoup (get_text() of the
+    matching descendants of the top-level elements, in document order)."""
+
+    # elements that never have an end tag
+    void_elements = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                     'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.sections: list[list[str]] = []
+        self._open_tags: list[str] = []
+        self._top_level_elements = 0
+        self._section: Optional[str] = None  # 'terms', 'property' or None
+        # texts being collected, and the depth of the element each one belongs to
+        self._captures: list[tuple[int, list[str]]] = []
+        self._lineno: list[str] = []
+        self._texts: list[list[str]] = []
+        self._commons_texts: list[list[str]] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]) -> None:
+        depth = len(self._open_tags)
+        if depth == 0:
+            self._start_top_level_element()
+        elif self._top_level_elements % 2 == 0 and self._section is not None:
+            self._start_content_element(tag, dict(attrs), depth)
+        if tag in self.void_elements:
+            self._end_elements(depth)
+        else:
+            self._open_tags.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        # like BeautifulSoup, close any unclosed elements inside this one,
+        # and ignore end tags without a matching start tag
+        for depth in range(len(self._open_tags) - 1, -1, -1):
+            if self._open_tags[depth] == tag:
+                del self._open_tags[depth:]
+                self._end_elements(depth)
+                return
+
+    def handle_data(self, data: str) -> None:
+        for depth, texts in self._captures:
+            texts.append(data)
+
+    def _start_top_level_element(self) -> None:
+        self._top_level_elements += 1
+        if self._top_level_elements % 2 == 1:
+            self._lineno = []
+            self._captures.append((0, self._lineno))
+
+    def _start_content_element(self, tag: str, attrs: dict[str, Optional[str]], depth: int) -> None:
+        classes = (attrs.get('class') or '').split()
+        if self._section == 'terms':
+            if 'diff-addedline' in classes or 'diff-deletedline' in classes:
+                self._capture(depth, self._texts)
+        else:
+            if 'wb-monolingualtext-value' in classes:
+                self._capture(depth, self._texts)
+            if tag == 'a' and 'extiw' in classes and (attrs.get('href') or '').startswith('//commons.wikimedia.org/'):
+                self._capture(depth, self._commons_texts)
+
+    def _capture(self, depth: int, texts: list[list[str]]) -> None:
+        text: list[str] = []
+        texts.append(text)
+        self._captures.append((depth, text))
+
+    def _end_elements(self, depth: int) -> None:
+        """Handle the end of all elements at the given depth or deeper."""
+        while self._captures and self._captures[-1][0] >= depth:
+            self._captures.pop()
+        if depth == 0:
+            if self._top_level_elements % 2 == 1:
+                self._end_lineno_element()
+            else:
+                self._end_content_element()
+
+    def _end_lineno_element(self) -> None:
+        lineno = ''.join(self._lineno)
         if (lineno.startswith('label / ') or
                 lineno.startswith('description /') or
                 lineno.startswith('aliases /') or
                 lineno.startswith('links /')):
-            texts += (element.get_text() for element in elements[i + 1].select('.diff-addedline, .diff-deletedline'))
+            self._section = 'terms'
         elif lineno.startswith('Property /'):
-            texts += (element.get_text() for element in elements[i + 1].select('.wb-monolingualtext-value'))
-            texts += (element.get_text() for element in elements[i + 1].select('a.extiw[href^="//commons.wikimedia.org/"]'))
-    scripts = scripts_of_text(char for text in texts for char in text)
-    if scripts:
-        return scripts[0]
-    else:
-        return None
+            self._section = 'property'
+        else:
+            self._section = None
+
+    def _end_content_element(self) -> None:
+        self.sections.append([''.join(text) for text in self._texts + self._commons_texts])
+        self._section = None
+        self._texts = []
+        self._commons_texts = []
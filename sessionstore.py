@@ -0,0 +1,106 @@
+import datetime
+import flask
+from flask.sessions import SecureCookieSession, SessionInterface, SessionMixin, session_json_serializer
+import secrets
+import sqlite3
+import time
+from typing import Any, Optional
+
+import sharedcache
+
+
+class StoredSession(SecureCookieSession):
+    """A session whose data is stored on the server, identified by sid."""
+
+    def __init__(self, sid: str, initial: Any = None, new: bool = True, expires: Optional[float] = None) -> None:
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        self.expires = expires  # of the stored data, as a Unix timestamp
+        self.old_sid: Optional[str] = None  # stored ID replaced by regenerate(), deleted on save
+
+    def regenerate(self) -> None:
+        """Give the session a new ID, keeping its data.
+
+        Call this whenever the user logs in or out, so that a session ID
+        that someone else planted in the browser (session fixation) or
+        obtained earlier does not give access to the logged-in session."""
+        if not self.new:
+            self.old_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class SQLiteSessionInterface(sharedcache.SQLiteStore, SessionInterface):
+    """A session interface that stores the session data in an SQLite database.
+
+    The cookie only holds a random session ID, instead of all the
+    session data, so it stays small regardless of the size of the session.
+    The data is serialized like in Flask's default cookie sessions, and
+    stored for PERMANENT_SESSION_LIFETIME after it was last saved;
+    a session that is used but not modified is saved again (to extend
+    its lifetime) once less than half of that lifetime is left.
+
+    Session IDs sent by the client that are not in the database are
+    not reused: a new session always gets a new ID. The application
+    should also call regenerate() on the session when the user logs
+    in or out."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._connection().execute('CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)')
+
+    def open_session(self, app: flask.Flask, request: flask.Request) -> StoredSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self._connection().execute('SELECT data, expires FROM sessions WHERE sid = ?', (sid,)).fetchone()
+            if row is not None:
+                data, expires = row
+                if expires > time.time():
+                    return StoredSession(sid, session_json_serializer.loads(data), new=False, expires=expires)
+        return StoredSession(secrets.token_urlsafe(32))
+
+    def save_session(self, app: flask.Flask, session: SessionMixin, response: flask.Response) -> None:
+        assert isinstance(session, StoredSession)
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        partitioned = self.get_cookie_partitioned(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if session.old_sid is not None:
+            self._connection().execute('DELETE FROM sessions WHERE sid = ?', (session.old_sid,))
+            session.old_sid = None
+
+        if not session:
+            if session.modified:
+                # the session was emptied (e.g. on logout), forget it
+                if not session.new:
+                    self._connection().execute('DELETE FROM sessions WHERE sid = ?', (session.sid,))
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       partitioned=partitioned, samesite=samesite, httponly=httponly)
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        if session.modified or session.expires is None or session.expires - now < lifetime / 2:
+            self._save(session.sid, session_json_serializer.dumps(dict(session)), now + lifetime)
+
+        if session.new or self.should_set_cookie(app, session):
+            expires: Optional[datetime.datetime] = self.get_expiration_time(app, session)
+            response.set_cookie(name, session.sid, expires=expires, httponly=httponly, domain=domain, path=path,
+                                secure=secure, partitioned=partitioned, samesite=samesite)
+
+    def _save(self, sid: str, data: str, expires: float) -> None:
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)', (sid, data, expires))
+        self._wrote(connection)
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        connection.execute('DELETE FROM sessions WHERE expires <= ?', (time.time(),))
@@ -0,0 +1,101 @@
+import abc
+from collections.abc import MutableMapping
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+
+class SQLiteStore(abc.ABC):
+    """Base class for data stored in an SQLite database file, shared by all processes using it.
+
+    Each thread gets its own connection (SQLite connections must not be
+    shared between threads). The database uses write-ahead logging, so
+    that readers in one process do not block writers in another.
+    Subclasses call _wrote() after each write, which calls _prune() once
+    every prune_every writes, to delete old data."""
+
+    prune_every = 1000  # writes
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _wrote(self, connection: sqlite3.Connection) -> None:
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune(connection)
+
+    @abc.abstractmethod
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        """Delete the data that is no longer needed."""
+
+
+class SQLiteCache(SQLiteStore, MutableMapping):
+    """A cache stored in an SQLite database, shared by all processes using the same file.
+
+    Each cache is a table in the database. Values must be JSON-serializable;
+    lists (including tuples, which JSON turns into lists) are returned as tuples.
+    The cache holds roughly at most maxsize entries: once in a while,
+    the entries that were stored longest ago are evicted. If ttl is given,
+    entries expire that many seconds after they were stored."""
+
+    def __init__(self, path: str, name: str, maxsize: int, ttl: Optional[float] = None) -> None:
+        if not name.isidentifier():
+            raise ValueError('invalid cache name: ' + name)
+        super().__init__(path)
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._connection().execute(f'CREATE TABLE IF NOT EXISTS {name} (key PRIMARY KEY, value TEXT NOT NULL, expires REAL)')
+
+    def __getitem__(self, key: Any) -> Any:
+        row = self._connection().execute(f'SELECT value, expires FROM {self.name} WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        value, expires = row
+        if expires is not None and expires <= time.time():
+            raise KeyError(key)
+        value = json.loads(value)
+        if isinstance(value, list):
+            value = tuple(value)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        connection = self._connection()
+        connection.execute(f'INSERT OR REPLACE INTO {self.name} (key, value, expires) VALUES (?, ?, ?)',
+                           (key, json.dumps(value), expires))
+        self._wrote(connection)
+
+    def _prune(self, connection: sqlite3.Connection) -> None:
+        # INSERT OR REPLACE assigns a new rowid, so low rowids were stored longest ago
+        connection.execute(f'DELETE FROM {self.name} WHERE rowid <= (SELECT MAX(rowid) FROM {self.name}) - ?', (self.maxsize,))
+        if self.ttl is not None:
+            connection.execute(f'DELETE FROM {self.name} WHERE expires <= ?', (time.time(),))
+
+    def __delitem__(self, key: Any) -> None:
+        cursor = self._connection().execute(f'DELETE FROM {self.name} WHERE key = ?', (key,))
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[Any]:
+        rows = self._connection().execute(f'SELECT key FROM {self.name}').fetchall()
+        return (key for key, in rows)
+
+    def __len__(self) -> int:
+        return self._connection().execute(f'SELECT COUNT(*) FROM {self.name}').fetchone()[0]
+
+    def clear(self) -> None:
+        self._connection().execute(f'DELETE FROM {self.name}')
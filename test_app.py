@@ -39,6 +39,30 @@ def test_session_fits_in_cookie():
         assert len(cookie_header) <= 4093
 
 
+def test_session_with_realistic_ids_fits_in_cookie():
+    # unlike above, IDs are not consecutive, so they compress less well
+    rng = random.Random(0)
+    with speedpatrolling.app.test_client() as client:
+        with client.session_transaction() as session:
+            rev_id = 2_300_000_000
+            for _ in range(speedpatrolling.ids.id_limit('skipped_rev_ids') + 1):
+                rev_id -= rng.randint(1, 1000)  # skipping through the unpatrolled changes
+                speedpatrolling.ids.append(session, 'skipped_rev_ids', rev_id)
+            for name in ['acted_page_ids', 'skipped_page_ids', 'ignored_page_ids']:
+                for _ in range(speedpatrolling.ids.id_limit(name) + 1):
+                    speedpatrolling.ids.append(session, name, rng.randint(1, 130_000_000))
+            for name in ['acted_user_fake_ids', 'skipped_user_fake_ids', 'ignored_user_fake_ids']:
+                for _ in range(speedpatrolling.ids.id_limit(name) + 1):
+                    speedpatrolling.ids.append(session, name, rng.getrandbits(32))
+            session['csrf_token'] = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(64))
+            access_token = mwoauth.AccessToken('%x' % rng.getrandbits(128), '%x' % rng.getrandbits(128))
+            session['oauth_access_token'] = dict(zip(access_token._fields, access_token))
+            session['supported_scripts'] = ['Latin', 'Cyrillic', 'Greek', 'Arabic', 'Han']
+        cookie_name = speedpatrolling.app.config['SESSION_COOKIE_NAME']
+        cookie_header = f'{cookie_name}={client.get_cookie(cookie_name).value}'
+        assert len(cookie_header) <= 4093
+
+
 @pytest.mark.parametrize('val, expected', [
     ('Lucas Werkmeister', False),
     ('127.0.0.1', True),
@@ -62,3 +86,148 @@ def test_settings_anonymous():
     with speedpatrolling.app.test_request_context():
         speedpatrolling.settings()
     # did not throw
+
+
+class UserinfoSession:
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+
+    def get(self, **params):
+        assert params['meta'] == 'userinfo'
+        self.requests += 1
+        return {'query': {'userinfo': {'name': self.name, 'rights': ['read', 'patrol']}}}
+
+
+def test_userinfo_cached_across_requests(monkeypatch):
+    monkeypatch.setattr(speedpatrolling, 'userinfo_cache', speedpatrolling.cachetools.TTLCache(maxsize=10, ttl=60))
+    session = UserinfoSession('Alice')
+    monkeypatch.setattr(speedpatrolling, 'authenticated_session', lambda: session)
+    for _ in range(3):
+        with speedpatrolling.app.test_request_context():
+            speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+            assert speedpatrolling.user_can_patrol()
+            assert not speedpatrolling.user_can_rollback()
+            assert speedpatrolling.get_userinfo()['name'] == 'Alice'
+    assert session.requests == 1
+
+    with speedpatrolling.app.test_request_context():
+        speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+        speedpatrolling.logout()
+    with speedpatrolling.app.test_request_context():
+        speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+        speedpatrolling.get_userinfo()
+    assert session.requests == 2
+
+
+class TokenSession:
+    def __init__(self, valid_token):
+        self.valid_token = valid_token
+        self.token_requests = 0
+        self.posts = []
+
+    def get(self, **params):
+        assert params['meta'] == 'tokens'
+        self.token_requests += 1
+        return {'query': {'tokens': {params['type'] + 'token': self.valid_token}}}
+
+    def post(self, **params):
+        self.posts.append(params)
+        if params['token'] != self.valid_token:
+            raise speedpatrolling.mwapi.errors.APIError('badtoken', 'Invalid CSRF token.', None)
+        return {params['action']: {}}
+
+
+def test_post_with_token(monkeypatch):
+    monkeypatch.setattr(speedpatrolling, 'token_cache', speedpatrolling.cachetools.TTLCache(maxsize=10, ttl=60))
+    session = TokenSession('token1+\\')
+    with speedpatrolling.app.test_request_context():
+        speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+        for rev_id in range(3):
+            speedpatrolling.post_with_token(session, 'alice', 'patrol', action='patrol', revid=rev_id)
+        assert session.token_requests == 1
+
+        session.valid_token = 'token2+\\'  # e.g. the session on the wiki expired
+        speedpatrolling.post_with_token(session, 'alice', 'patrol', action='patrol', revid=3)
+        assert session.token_requests == 2
+        assert [post['token'] for post in session.posts] == ['token1+\\'] * 4 + ['token2+\\']
+
+        speedpatrolling.logout()
+        speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+        speedpatrolling.post_with_token(session, 'alice', 'patrol', action='patrol', revid=4)
+        assert session.token_requests == 3
+        assert len(session.posts) == 6
+
+
+def test_post_with_token_other_error(monkeypatch):
+    monkeypatch.setattr(speedpatrolling, 'token_cache', speedpatrolling.cachetools.TTLCache(maxsize=10, ttl=60))
+    session = TokenSession('token1+\\')
+
+    def post(**params):
+        raise speedpatrolling.mwapi.errors.APIError('permissiondenied', 'No.', None)
+
+    session.post = post
+    with speedpatrolling.app.test_request_context():
+        speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+        with pytest.raises(speedpatrolling.mwapi.errors.APIError, match='permissiondenied'):
+            speedpatrolling.post_with_token(session, 'alice', 'patrol', action='patrol', revid=1)
+    assert session.token_requests == 1
+
+
+def test_submitted_group_rev_ids():
+    with speedpatrolling.app.test_request_context(method='POST', data={'group_rev_id': ['12', '11', 'x', '12', '9']}):
+        assert speedpatrolling.submitted_group_rev_ids(12) == [12, 11, 9]
+
+
+class GroupSession:
+    revisions = {9001: (1, 'A'), 9002: (1, 'A'), 9003: (2, 'A'), 9004: (1, 'B')}
+
+    def __init__(self):
+        self.revids_requests = []
+
+    def get(self, **params):
+        if params.get('meta') == 'userinfo':
+            return {'query': {'userinfo': {'name': 'Alice', 'rights': ['read', 'patrol', 'apihighlimits']}}}
+        self.revids_requests.append(params['revids'])
+        pages = [{'pageid': page_id, 'title': 'Q%d' % page_id, 'revisions': [{'revid': rev_id, 'user': user}]}
+                 for rev_id, (page_id, user) in self.revisions.items() if rev_id in params['revids']]
+        return {'query': {'pages': pages}}
+
+
+def test_patrol_rev_ids_group(monkeypatch):
+    monkeypatch.setattr(speedpatrolling, 'userinfo_cache', speedpatrolling.cachetools.TTLCache(maxsize=10, ttl=60))
+    monkeypatch.setattr(speedpatrolling, 'patrol_queue', None)
+    monkeypatch.setattr(speedpatrolling, 'unpatrolled_feed', None)
+    session = GroupSession()
+    monkeypatch.setattr(speedpatrolling, 'authenticated_session', lambda: session)
+    patrolled = []
+    monkeypatch.setattr(speedpatrolling, 'post_with_token', lambda session, key, token_type, **params: patrolled.append(params['revid']))
+    with speedpatrolling.app.test_request_context():
+        speedpatrolling.flask.session['oauth_access_token'] = {'key': 'alice', 'secret': ''}
+        assert speedpatrolling.api_batch_size() == 500
+        # 9003 is on another page, 9004 by another user, 9005 does not exist
+        speedpatrolling.patrol_rev_ids([9001, 9002, 9003, 9004, 9005])
+    assert patrolled == [9001, 9002]
+    assert session.revids_requests[0] == [9001, 9002, 9003, 9004, 9005]  # one request for the whole group
+
+
+def test_diff_template_with_group():
+    group = speedpatrolling.ids.RevisionGroup([12, 11, 10], [12, 10], 9)
+    with speedpatrolling.app.test_request_context():
+        html = speedpatrolling.flask.render_template('diff.html', rev_id=12, group=group, title='Q42',
+                                                     old_user='A', new_user='B', old_comment='', new_comment='', body='')
+    assert '3 consecutive edits' in html
+    assert 'formaction="patrol-group"' in html
+    assert html.count('name="group_rev_id"') == 2
+
+
+@pytest.mark.parametrize('cursor, now, expected', [
+    (None, 1000.0, (None, None, 1000.0)),
+    ([123, 950.0], 1000.0, (123, None, 950.0)),
+    ([123, 950.0, None], 1000.0, (123, None, 950.0)),
+    ([123, 950.0, '2024-01-01T00:00:00Z'], 1000.0, (123, '2024-01-01T00:00:00Z', 950.0)),
+    ([123, 880.0, '2024-01-01T00:00:00Z'], 1000.0, (None, None, 1000.0)),
+])
+def test_diff_cursor_start(cursor, now, expected):
+    actual = speedpatrolling.diff_cursor_start(cursor, now, wrap_interval=120)
+    assert expected == actual
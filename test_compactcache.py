@@ -0,0 +1,170 @@
+import random
+
+import pytest
+
+import compactcache
+
+
+def test_int_cache():
+    cache = compactcache.IntCache(maxsize=10)
+    cache[1] = 2
+    cache[3] = 2**32 - 1
+    assert cache[1] == 2
+    assert cache[3] == 2**32 - 1
+    assert 2 not in cache
+    with pytest.raises(KeyError):
+        cache[2]
+    cache[1] = 5
+    assert cache[1] == 5
+    assert len(cache) == 2
+    del cache[1]
+    assert list(cache) == [3]
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_int_cache_value_out_of_range():
+    cache = compactcache.IntCache(maxsize=10)
+    with pytest.raises(ValueError):
+        cache[1] = 2**32
+    assert 1 not in cache
+
+
+def test_page_id_and_title_cache():
+    cache = compactcache.PageIdAndTitleCache(maxsize=10)
+    cache[10] = (1, ''.join(['Q', '1']))
+    cache[11] = (1, ''.join(['Q', '1']))
+    assert cache[10] == (1, 'Q1')
+    assert cache[10][1] is cache[11][1]  # interned
+
+
+def test_eviction_keeps_referenced_entries():
+    cache = compactcache.IntCache(maxsize=4)
+    for key in range(4):
+        cache[key] = key
+    cache[0]
+    cache[2]
+    cache[4] = 4  # evicts 1 or 3
+    cache[0]
+    cache[2]
+    cache[4]
+    cache[5] = 5  # evicts the other one
+    assert set(cache) == {0, 2, 4, 5}
+
+
+def test_eviction_assignment_is_not_use():
+    cache = compactcache.IntCache(maxsize=2)
+    cache[0] = 0
+    cache[1] = 1
+    cache[1] = 1
+    cache[0]
+    cache[2] = 2
+    assert set(cache) == {0, 2}
+
+
+@pytest.mark.parametrize('cache_class, value', [
+    (compactcache.IntCache, lambda i: i % 1000),
+    (compactcache.PageIdAndTitleCache, lambda i: (i % 1000, f'Q{i % 1000}')),
+])
+def test_random_operations(cache_class, value):
+    # compare against a dict, with a maxsize large enough that nothing is evicted
+    rng = random.Random(0)
+    cache = cache_class(maxsize=500)
+    expected = {}
+    for _ in range(20000):
+        key = rng.randrange(1000)
+        operation = rng.random()
+        if operation < 0.5 and (key in expected or len(expected) < 500):
+            cache[key] = expected[key] = value(rng.randrange(10**6))
+        elif operation < 0.75:
+            assert cache.get(key) == expected.get(key)
+        elif key in expected:
+            del cache[key]
+            del expected[key]
+        assert len(cache) == len(expected)
+    assert dict(cache.items()) == expected
+
+
+def test_random_operations_with_eviction():
+    rng = random.Random(0)
+    cache = compactcache.IntCache(maxsize=100)
+    inserted = {}
+    for _ in range(10000):
+        key = rng.randrange(1000)
+        if rng.random() < 0.1:
+            if key in cache:
+                del cache[key]
+            assert key not in cache
+            continue
+        cache[key] = inserted[key] = rng.randrange(1000)
+        assert len(cache) <= 100
+        assert cache[key] == inserted[key]
+    assert len(set(cache)) == len(cache)
+    for key in cache:
+        assert cache[key] == inserted[key]
+
+
+def test_eviction_keeps_probe_runs_short():
+    # consecutive rev IDs, as they are inserted in practice
+    cache = compactcache.IntCache(maxsize=1500)
+    for key in range(2_000_000_000, 2_000_020_000):
+        cache[key] = 0
+    longest = run = 0
+    for key in cache._keys:
+        run = run + 1 if key != cache._EMPTY else 0
+        longest = max(longest, run)
+    assert longest < 50  # sweeping over the hash table slots instead of the ring gave runs of 586 slots here
+
+
+def test_maxbytes():
+    cache = compactcache.PageIdAndTitleCache(maxbytes=100_000)
+    assert cache.currbytes <= 100_000
+    for key in range(2_000):
+        cache[key] = (key, 'Q%d' % key)
+    assert cache.currbytes <= 100_000
+    full = len(cache)
+    # longer titles than estimated take up more of the budget
+    for key in range(2_000, 4_000):
+        cache[key] = (key, 'Lexeme:L%d-S1' % key + 'x' * 100)
+    assert cache.currbytes <= 100_000
+    assert len(cache) < full / 2
+    cache.clear()
+    assert cache.currbytes < 100_000 / 2
+
+
+def test_grows_on_demand():
+    cache = compactcache.PageIdAndTitleCache(maxbytes=64 * 1024 * 1024)
+    assert cache.currbytes < 10_000  # nothing allocated for the entries yet
+    for key in range(5000):
+        cache[key] = (key, f'Q{key}')
+    assert cache.currbytes < 1_000_000
+    assert all(cache[key] == (key, f'Q{key}') for key in range(5000))
+    assert list(cache) == list(range(5000))
+    small = compactcache.IntCache(maxsize=100)
+    for key in range(1000):
+        small[key] = key
+    assert len(small) == 100
+    assert len(small._ring) == 100  # grown up to maxsize, not beyond
+    cache.clear()
+    assert cache.currbytes < 10_000
+
+
+def test_maxsize_or_maxbytes():
+    with pytest.raises(TypeError):
+        compactcache.IntCache()
+    with pytest.raises(TypeError):
+        compactcache.IntCache(maxsize=10, maxbytes=1000)
+    with pytest.raises(ValueError):
+        compactcache.IntCache(maxbytes=10)
+
+
+def test_missing_value_hooks():
+    class NoValues(compactcache._ArrayCache):
+        def __getitem__(self, key):
+            return self._lookup(key)
+
+        def __setitem__(self, key, value):
+            self._slot_for_insert(key)
+
+    with pytest.raises(TypeError, match='_clear_values'):
+        NoValues(maxsize=10)
@@ -0,0 +1,274 @@
+import pytest
+import time
+
+import feed
+import ids
+
+
+class FakeWiki:
+    """Answers the API requests of the feed (through the fake_api fixture)."""
+
+    def __init__(self, api):
+        self.api = api
+        api.respond = self.respond
+        self.changes = []  # dicts like in list=recentchanges, plus timestamp and patrolled
+        self.patrol_log = []  # (timestamp, rev ID) tuples
+        self.now = 0
+
+    @property
+    def requests(self):
+        return [request.params for request in self.api.requests]
+
+    def session(self, user_agent='test_feed'):
+        return self.api.session(user_agent)
+
+    def timestamp(self):
+        return '2024-01-01T00:%02d:00Z' % self.now
+
+    def edit(self, rev_id, page_id):
+        self.now += 1
+        self.changes.append({'type': 'edit', 'revid': rev_id, 'pageid': page_id, 'title': f'Q{page_id}',
+                             'user': f'U{rev_id}', 'timestamp': self.timestamp(), 'patrolled': False})
+
+    def patrol(self, rev_id, log=True):
+        self.now += 1
+        for change in self.changes:
+            if change['revid'] == rev_id:
+                change['patrolled'] = True
+        if log:
+            self.patrol_log.append((self.timestamp(), rev_id))
+
+    def respond(self, request):
+        params = request.params
+        assert params['action'] == 'query'
+        if params['list'] == 'recentchanges':
+            assert params['rcshow'] == 'unpatrolled'
+            changes = [change for change in self.changes if not change['patrolled']]
+            if params.get('rcdir') == 'newer':
+                changes = [change for change in changes if change['timestamp'] >= params['rcstart']]
+            else:
+                changes = list(reversed(changes))
+            changes = [{key: value for key, value in change.items() if key in {'type', 'revid', 'pageid', 'title', 'user'}}
+                       for change in changes]
+            return {'curtimestamp': self.timestamp(), 'query': {'recentchanges': changes}}
+        if params['list'] == 'logevents':
+            assert params['letype'] == 'patrol'
+            assert params['ledir'] == 'newer'
+            events = [{'type': 'patrol', 'params': {'curid': rev_id, 'auto': False}}
+                      for timestamp, rev_id in self.patrol_log
+                      if timestamp >= params['lestart']]
+            return {'query': {'logevents': events}}
+        raise ValueError(params)
+
+
+@pytest.fixture
+def wiki(fake_api):
+    return FakeWiki(fake_api)
+
+
+def test_feed(wiki):
+    wiki.edit(11, 1)
+    wiki.edit(21, 2)
+    wiki.edit(31, 3)
+    wiki.patrol(21)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=3600)
+    session = wiki.session()
+    try:
+        assert not unpatrolled_feed.is_loaded()
+        unpatrolled_feed.poll(session)
+        assert unpatrolled_feed.is_loaded()
+        changes = unpatrolled_feed.changes()
+        assert list(changes) == [31, 11]
+        assert changes[31] == ids.RevisionMetadata(3, 'Q3', ids.user_fake_id('U31'))
+        assert ids.rev_id_to_page_id(31, session) == 3  # the ids caches are filled too
+        assert len(wiki.requests) == 1
+
+        wiki.edit(41, 4)
+        wiki.edit(51, 1)
+        wiki.patrol(11)
+        wiki.patrol(41)
+        unpatrolled_feed.poll(session)
+        assert list(unpatrolled_feed.changes()) == [51, 31]
+        recentchanges, logevents = wiki.requests[1:]
+        assert recentchanges['rcdir'] == 'newer'
+        # one minute before the last poll, see UnpatrolledFeed.overlap
+        assert recentchanges['rcstart'] == '2024-01-01T00:03:00Z'
+        assert logevents['lestart'] == '2024-01-01T00:03:00Z'
+
+        unpatrolled_feed.discard(51)
+        assert list(unpatrolled_feed.changes()) == [31]
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_changes_before(wiki):
+    for rev_id in range(10, 20):
+        wiki.edit(rev_id, rev_id)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=3600)
+    session = wiki.session()
+    try:
+        unpatrolled_feed.poll(session)
+        assert [rev_id for rev_id, metadata in unpatrolled_feed.changes_before(None)] == list(range(19, 9, -1))
+        assert [rev_id for rev_id, metadata in unpatrolled_feed.changes_before(15)] == [14, 13, 12, 11, 10]
+        assert next(unpatrolled_feed.changes_before(15)) == (14, ids.RevisionMetadata(14, 'Q14', ids.user_fake_id('U14')))
+        assert list(unpatrolled_feed.changes_before(10)) == []
+        assert [rev_id for rev_id, metadata in unpatrolled_feed.changes_before(100)] == list(range(19, 9, -1))
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_changes_before_sees_discards(wiki):
+    for rev_id in range(10, 20):
+        wiki.edit(rev_id, rev_id)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=3600)
+    session = wiki.session()
+    try:
+        unpatrolled_feed.poll(session)
+        changes = unpatrolled_feed.changes_before(None)
+        assert next(changes)[0] == 19
+        unpatrolled_feed.discard(18)
+        unpatrolled_feed.discard(15)
+        assert [rev_id for rev_id, metadata in changes] == [17, 16, 14, 13, 12, 11, 10]
+        assert list(unpatrolled_feed.changes()) == [19, 17, 16, 14, 13, 12, 11, 10]
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_full_refresh(wiki, monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(feed.time, 'monotonic', lambda: now)
+    wiki.edit(11, 1)
+    wiki.edit(21, 2)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=3600, full_refresh_interval=600)
+    session = wiki.session()
+    try:
+        unpatrolled_feed.poll(session)
+        assert list(unpatrolled_feed.changes()) == [21, 11]
+        wiki.patrol(11, log=False)
+        unpatrolled_feed.poll(session)
+        assert list(unpatrolled_feed.changes()) == [21, 11]
+        now = 600.0
+        unpatrolled_feed.poll(session)
+        assert list(unpatrolled_feed.changes()) == [21]
+        assert 'rcdir' not in wiki.requests[-1]
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_polls_overlap(wiki):
+    wiki.edit(11, 1)
+    wiki.edit(21, 2)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=3600)
+    unpatrolled_feed.overlap = 90
+    session = wiki.session()
+    unpatrolled_feed.poll(session)
+    # an edit and a patrol that reached the replica after the poll, with earlier timestamps
+    wiki.changes.insert(0, {'type': 'edit', 'revid': 5, 'pageid': 5, 'title': 'Q5', 'user': 'U5',
+                            'timestamp': '2024-01-01T00:01:30Z', 'patrolled': False})
+    wiki.changes[1]['patrolled'] = True
+    wiki.patrol_log.append(('2024-01-01T00:01:30Z', 11))
+    unpatrolled_feed.poll(session)
+    assert list(unpatrolled_feed.changes()) == [21, 5]
+
+
+def test_feed_stale(wiki, monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(feed.time, 'monotonic', lambda: now)
+    wiki.edit(11, 1)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=10)
+    session = wiki.session()
+    unpatrolled_feed.poll(session)
+    assert unpatrolled_feed.is_loaded()
+    now = 50.0
+    assert unpatrolled_feed.is_loaded()
+    # no successful poll for more than five poll intervals
+    now = 51.0
+    assert not unpatrolled_feed.is_loaded()
+    wiki.patrol(11, log=False)
+    unpatrolled_feed.poll(session)
+    assert unpatrolled_feed.is_loaded()
+    assert 'rcdir' not in wiki.requests[-1]  # listed from scratch
+    assert list(unpatrolled_feed.changes()) == []
+
+
+def test_feed_not_used_after_session_forgotten(wiki):
+    wiki.edit(11, 1)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=0.01, max_age=0.1)
+    try:
+        unpatrolled_feed.lend_session('key', wiki.session())
+        deadline = time.monotonic() + 10
+        while not unpatrolled_feed.is_loaded():
+            assert time.monotonic() < deadline, 'the feed was not loaded in the background'
+            time.sleep(0.01)
+        unpatrolled_feed.forget_session('key')
+        while unpatrolled_feed.is_loaded():
+            assert time.monotonic() < deadline, 'the feed was still used without polls'
+            time.sleep(0.01)
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_not_used_while_polls_fail(wiki):
+    wiki.edit(11, 1)
+    errors = []
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=0.01, max_age=0.1, on_error=errors.append)
+    try:
+        unpatrolled_feed.lend_session('key', wiki.session())
+        deadline = time.monotonic() + 10
+        while not unpatrolled_feed.is_loaded():
+            assert time.monotonic() < deadline, 'the feed was not loaded in the background'
+            time.sleep(0.01)
+        wiki.api.respond = lambda request: {'error': {'code': 'internal_api_error', 'info': 'Fake error.'}}
+        while unpatrolled_feed.is_loaded():
+            assert time.monotonic() < deadline, 'the feed was still used while polls failed'
+            time.sleep(0.01)
+        assert errors
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_polls_in_background(wiki):
+    wiki.edit(11, 1)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session(), poll_interval=0.01)
+    session = wiki.session()
+    try:
+        unpatrolled_feed.lend_session('key', session)
+        deadline = time.monotonic() + 10
+        while not unpatrolled_feed.is_loaded():
+            assert time.monotonic() < deadline, 'the feed was not loaded in the background'
+            time.sleep(0.01)
+        assert list(unpatrolled_feed.changes()) == [11]
+        wiki.edit(21, 2)
+        wiki.patrol(11)
+        while list(unpatrolled_feed.changes()) != [21]:
+            assert time.monotonic() < deadline, 'the feed was not updated in the background'
+            time.sleep(0.01)
+    finally:
+        unpatrolled_feed.stop()
+
+
+def test_feed_sessions(wiki):
+    wiki.edit(11, 1)
+    wiki.edit(21, 2)
+    unpatrolled_feed = feed.UnpatrolledFeed(wiki.session('anonymous'), poll_interval=0.01)
+    try:
+        unpatrolled_feed.lend_session('key', wiki.session('user'))
+        deadline = time.monotonic() + 10
+        while not unpatrolled_feed.is_loaded():
+            assert time.monotonic() < deadline, 'the feed was not loaded in the background'
+            time.sleep(0.01)
+        wiki.patrol(11)
+        while list(unpatrolled_feed.changes()) != [21]:
+            assert time.monotonic() < deadline, 'the feed was not updated in the background'
+            time.sleep(0.01)
+        # the patrol log is public, unpatrolled changes are only listed for users with the patrol right
+        user_agents = {request.params['list']: request.headers['User-Agent'] for request in wiki.api.requests}
+        assert user_agents == {'recentchanges': 'user', 'logevents': 'anonymous'}
+
+        unpatrolled_feed.forget_session('key')
+        time.sleep(0.05)  # let a running poll finish
+        requests = len(wiki.requests)
+        time.sleep(0.1)
+        assert len(wiki.requests) == requests
+    finally:
+        unpatrolled_feed.stop()
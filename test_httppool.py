@@ -0,0 +1,41 @@
+import pytest
+import requests.auth
+
+import httppool
+
+
+@pytest.fixture
+def api(fake_api, monkeypatch):
+    monkeypatch.setattr(httppool, 'adapter', httppool.adapter)  # restored after the test
+    httppool.configure(pool_maxsize=2)
+    fake_api.respond = lambda request: {'query': {}}
+    yield fake_api
+    httppool.adapter.close()
+
+
+class HeaderAuth(requests.auth.AuthBase):
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self, request):
+        request.headers['Authorization'] = self.value
+        return request
+
+
+def test_sessions_share_connections(api):
+    for _ in range(5):  # like one session per Flask request
+        session = httppool.mwapi_session(api.host, 'test_httppool')
+        session.get(action='query')
+    assert len(api.requests) == 5
+    assert len({request.client_address for request in api.requests}) == 1
+
+
+def test_sessions_keep_separate_auth(api):
+    alice = httppool.mwapi_session(api.host, 'test_httppool', auth=HeaderAuth('alice'))
+    bob = httppool.mwapi_session(api.host, 'test_httppool', auth=HeaderAuth('bob'))
+    anonymous = httppool.mwapi_session(api.host, 'test_httppool')
+    alice.get(action='query')
+    bob.get(action='query')
+    anonymous.get(action='query')
+    assert [request.headers.get('Authorization') for request in api.requests] == ['alice', 'bob', None]
+    assert len({request.client_address for request in api.requests}) == 1
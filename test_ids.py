@@ -0,0 +1,491 @@
+import pytest
+import string
+import subprocess
+import sys
+import threading
+
+import ids
+
+
+class FakeSession:
+    """A stand-in for mwapi.Session that answers requests with a function."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+
+    def get(self, continuation=False, **params):
+        self.requests.append(params)
+        if continuation:
+            return iter([self.respond(params)])
+        return self.respond(params)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    ids.rev_id_to_page_id_and_title_cache.clear()
+    ids.rev_id_to_user_fake_id_cache.clear()
+    ids.rev_id_to_primary_script_cache.clear()
+    ids.rev_id_to_primary_script_cache_stats.clear()
+    yield
+
+
+def revisions_response(params):
+    """Respond to a prop=revisions query as if revision N were made by user UN on page N // 10."""
+    pages = {}
+    for rev_id in params['revids']:
+        page_id = rev_id // 10
+        page = pages.setdefault(page_id, {'pageid': page_id, 'title': f'Q{page_id}', 'revisions': []})
+        page['revisions'].append({'revid': rev_id, 'parentid': rev_id - 1, 'user': f'U{rev_id}'})
+    return {'query': {'pages': list(pages.values())}}
+
+
+def compare_response(body):
+    return lambda params: {'compare': {'body': body}}
+
+
+@pytest.mark.parametrize('id_list', [
+    [],
+    [0],
+    [850000123, 850000100, 850000200, 849999000],
+    [2**32 - 1, 0, 2**32 - 1, 1],
+    [-5, 5, 2**70],
+])
+def test_encode_decode(id_list):
+    assert ids.decode(ids.encode(id_list)) == id_list
+
+
+def test_encode_is_compact():
+    # consecutive rev IDs take one byte each, plus base64 overhead
+    encoded = ids.encode(list(range(850000300, 850000000, -1)))
+    assert len(encoded) < 410
+    assert set(encoded) <= set(string.ascii_letters + string.digits + '-_')
+
+
+def test_append_limits():
+    session = {}
+    expected = []
+    for id in range(850000000, 850001000, 3):
+        ids.append(session, 'skipped_rev_ids', id)
+        expected = [id] + expected[:ids.id_limit('skipped_rev_ids')]
+    assert ids.get(session, 'skipped_rev_ids') == expected
+    assert isinstance(session['skipped_rev_ids'], str)
+
+
+def test_get_unencoded_list():
+    session = {'ignored_page_ids': [2, 1]}
+    assert ids.get(session, 'ignored_page_ids') == [2, 1]
+    ids.append(session, 'ignored_page_ids', 3)
+    assert ids.get(session, 'ignored_page_ids') == [3, 2, 1]
+
+
+def test_id_sets():
+    session = {}
+    id_sets = ids.IdSets(session)
+    assert id_sets['skipped_rev_ids'] == frozenset()
+    ids.append(session, 'skipped_rev_ids', 1)
+    ids.append(session, 'skipped_rev_ids', 2)
+    skipped_rev_ids = id_sets['skipped_rev_ids']
+    assert skipped_rev_ids == {1, 2}
+    assert id_sets['skipped_rev_ids'] is skipped_rev_ids  # cached
+    ids.append(session, 'skipped_rev_ids', 3)
+    assert id_sets['skipped_rev_ids'] == {1, 2, 3}
+
+
+def test_my_lru_cache():
+    cache = ids.MyLRUCache(maxsize=3)
+    cache[1] = 1
+    cache[2] = 2
+    cache[3] = 3
+    cache[1]
+    cache[2] = 2  # assignment is not use
+    cache[4] = 4
+    assert set(cache) == {1, 3, 4}
+    cache[5] = 5
+    assert set(cache) == {1, 4, 5}
+
+
+def test_my_lru_cache_with_getsizeof():
+    cache = ids.MyLRUCache(maxsize=10, getsizeof=lambda value: len(value))
+    cache[1] = 'aaaa'
+    cache[2] = 'bbbb'
+    cache[1]
+    cache[3] = 'cccc'  # evicts 2, the least recently used
+    assert set(cache) == {1, 3}
+    assert cache.currsize == 8
+    del cache[1]
+    cache.clear()
+    assert cache.currsize == 0
+    with pytest.raises(KeyError):
+        cache.popitem()
+
+
+def test_rev_id_to_primary_script():
+    html = '<tr><td class="diff-lineno">label / ru</td></tr><tr><td class="diff-addedline">рус</td></tr>'
+    session = FakeSession(compare_response(html))
+    assert ids.rev_id_to_primary_script(1, session) == 'Cyrillic'
+    assert ids.rev_id_to_primary_script(1, session) == 'Cyrillic'
+    assert len(session.requests) == 1
+    assert session.requests[0]['fromrev'] == 1
+    assert ids.rev_id_to_primary_script_cache_stats == {'hits': 1, 'misses': 1}
+
+
+def test_rev_id_to_primary_script_none():
+    session = FakeSession(compare_response(''))
+    assert ids.rev_id_to_primary_script(2, session) is None
+    assert ids.rev_id_to_primary_script(2, session) is None
+    assert len(session.requests) == 1
+
+
+def test_resolve_rev_ids():
+    session = FakeSession(revisions_response)
+    results = ids.resolve_rev_ids(range(100, 220), session)
+    assert [len(request['revids']) for request in session.requests] == [50, 50, 20]
+    assert results[123] == ids.RevisionMetadata(12, 'Q12', ids.user_fake_id('U123'))
+    assert len(results) == 120
+    # everything is cached now
+    assert ids.resolve_rev_ids(range(100, 220), session) == {}
+    assert len(session.requests) == 3
+    assert ids.rev_id_to_page_id_and_title(219, session) == (21, 'Q21')
+    assert ids.rev_id_to_user_fake_id(219, session) == ids.user_fake_id('U219')
+    assert len(session.requests) == 3
+
+
+def test_resolve_rev_ids_batch_size():
+    session = FakeSession(revisions_response)
+    ids.resolve_rev_ids(range(1000, 1600), session, batch_size=500)
+    assert [len(request['revids']) for request in session.requests] == [500, 100]
+
+
+def test_rev_id_to_page_id_and_user_fake_id_single_request():
+    session = FakeSession(revisions_response)
+    assert ids.rev_id_to_page_id(42, session) == 4
+    assert ids.rev_id_to_title(42, session) == 'Q4'
+    assert ids.rev_id_to_user_fake_id(42, session) == ids.user_fake_id('U42')
+    assert len(session.requests) == 1
+
+
+def test_rev_id_with_hidden_user():
+    def respond(params):
+        response = revisions_response(params)
+        for page in response['query']['pages']:
+            for revision in page['revisions']:
+                if revision['revid'] == 70:
+                    del revision['user']
+                    revision['userhidden'] = True
+        return response
+    session = FakeSession(respond)
+    assert ids.resolve_rev_ids([70, 71], session) == {71: ids.RevisionMetadata(7, 'Q7', ids.user_fake_id('U71'))}
+    assert ids.rev_id_to_page_id(70, session) == 7
+    assert ids.rev_id_to_title(70, session) == 'Q7'
+    assert len(session.requests) == 1
+    with pytest.raises(ids.UserHiddenError):
+        ids.rev_id_to_user_fake_id(70, session)
+
+
+def test_rev_id_to_page_id_and_title_missing_revision():
+    session = FakeSession(lambda params: {'query': {'badrevids': {'99': {'revid': 99, 'missing': True}}}})
+    with pytest.raises(KeyError):
+        ids.rev_id_to_page_id(99, session)
+    with pytest.raises(KeyError):
+        ids.rev_id_to_user_fake_id(99, session)
+
+
+def test_unpatrolled_changes_start():
+    def respond(params):
+        changes = [{'revid': 30, 'pageid': 3, 'title': 'Q3', 'user': 'U30', 'timestamp': '2024-01-01T00:00:03Z'},
+                   {'revid': 20, 'pageid': 2, 'title': 'Q2', 'user': 'U20', 'timestamp': '2024-01-01T00:00:02Z'},
+                   {'revid': 10, 'pageid': 1, 'title': 'Q1', 'user': 'U10', 'timestamp': '2024-01-01T00:00:01Z'}]
+        if 'rcstart' in params:
+            changes = [change for change in changes if change['timestamp'] <= params['rcstart']]
+        return {'query': {'recentchanges': changes}}
+    session = FakeSession(respond)
+    assert list(ids.unpatrolled_changes(session))[0] == (30, '2024-01-01T00:00:03Z')
+    assert [rev_id for rev_id, timestamp in ids.unpatrolled_changes(session, start='2024-01-01T00:00:02Z')] == [20, 10]
+    assert 'rcstart' not in session.requests[0]
+    assert session.requests[1]['rcstart'] == '2024-01-01T00:00:02Z'
+    assert ids.rev_id_to_page_id(20, session) == 2  # cached from the list
+    assert len(session.requests) == 2
+
+
+class FakeCreations:
+    """Fake recentchanges API responses for page creations."""
+
+    def __init__(self):
+        self.creations = []  # list of (page ID, timestamp, patrolled)
+
+    def create(self, page_id, patrolled=False):
+        self.creations.append([page_id, '2024-01-01T00:00:%02dZ' % len(self.creations), patrolled])
+
+    def patrol(self, page_id):
+        for creation in self.creations:
+            if creation[0] == page_id:
+                creation[2] = True
+
+    def __call__(self, params):
+        assert params['rctype'] == ['new']
+        creations = self.creations
+        if 'rcshow' in params:
+            assert params['rcshow'] == ['!patrolled']
+            creations = [creation for creation in creations if not creation[2]]
+        if 'rcstart' in params:
+            assert params['rcdir'] == 'newer'
+            creations = [creation for creation in creations if creation[1] >= params['rcstart']]
+        changes = [{'type': 'new', 'pageid': page_id, 'timestamp': timestamp}
+                   for page_id, timestamp, patrolled in reversed(creations)]
+        if params['rclimit'] == 1:
+            changes = changes[:1]
+        return {'query': {'recentchanges': changes}}
+
+
+def test_unpatrolled_creations(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(ids.time, 'monotonic', lambda: now)
+    creations = FakeCreations()
+    creations.create(1)
+    creations.create(2, patrolled=True)
+    creations.create(3)
+    session = FakeSession(creations)
+    index = ids.UnpatrolledCreations(refresh_interval=60, full_refresh_interval=600)
+    index.lend_session('key', session)
+    index.may_contain(1)
+    index.join()
+    assert index.may_contain(1)
+    assert not index.may_contain(2)
+    assert index.may_contain(3)
+    assert index.may_contain(4)  # unknown
+    assert len(session.requests) == 2  # no refresh yet
+
+    # patrolling is only noticed by the next full refresh,
+    # new creations are picked up by the next refresh
+    creations.patrol(1)
+    creations.create(4, patrolled=True)
+    creations.create(5)
+    now = 60.0
+    index.may_contain(1)
+    index.join()
+    assert index.may_contain(1)
+    assert not index.may_contain(4)
+    assert index.may_contain(5)
+    assert len(session.requests) == 4
+    assert session.requests[3]['rcdir'] == 'newer'
+
+    now = 600.0
+    index.may_contain(1)
+    index.join()
+    assert not index.may_contain(1)
+    assert index.may_contain(3)
+    assert len(session.requests) == 6
+    assert 'rcdir' not in session.requests[5]
+
+
+def test_unpatrolled_creations_refresh_in_background():
+    creations = FakeCreations()
+    creations.create(1)
+    creations.create(2, patrolled=True)
+    refreshing = threading.Event()
+    session = FakeSession(lambda params: refreshing.wait() and creations(params))
+    index = ids.UnpatrolledCreations()
+    index.lend_session('key', session)
+    # nothing is ruled out until the first refresh is done, and callers don't wait for it
+    assert index.may_contain(2)
+    assert index.may_contain(2)
+    refreshing.set()
+    index.join()
+    assert not index.may_contain(2)
+    assert len(session.requests) == 2  # one refresh
+
+
+def test_unpatrolled_creations_failed_refresh(monkeypatch):
+    now = 0.0
+    monkeypatch.setattr(ids.time, 'monotonic', lambda: now)
+    monkeypatch.setattr(threading, 'excepthook', lambda args: None)
+    creations = FakeCreations()
+    creations.create(1, patrolled=True)
+    failing = True
+
+    def respond(params):
+        if failing:
+            raise ConnectionError('API unavailable')
+        return creations(params)
+    session = FakeSession(respond)
+    index = ids.UnpatrolledCreations(refresh_interval=60)
+    index.lend_session('key', session)
+    index.may_contain(1)
+    index.join()
+    # the failed refresh is not retried immediately
+    assert index.may_contain(1)
+    index.join()
+    assert len(session.requests) == 1
+
+    failing = False
+    now = 60.0
+    index.may_contain(1)
+    index.join()
+    assert not index.may_contain(1)
+
+
+def test_unpatrolled_creations_forget_session():
+    creations = FakeCreations()
+    creations.create(1, patrolled=True)
+    session = FakeSession(creations)
+    index = ids.UnpatrolledCreations()
+    index.may_contain(1)  # no session lent yet
+    index.join()
+    assert session.requests == []
+    index.lend_session('key', session)
+    index.forget_session('other key')
+    index.forget_session('key')
+    index.may_contain(1)
+    index.join()
+    assert session.requests == []
+    index.lend_session('key', session)
+    index.may_contain(1)
+    index.join()
+    assert not index.may_contain(1)
+
+
+def test_rev_id_to_show_patrol_footer(monkeypatch):
+    creations = FakeCreations()
+    creations.create(1)
+    creations.create(2)
+    index = ids.UnpatrolledCreations()
+    index.lend_session('key', FakeSession(creations))
+    index.may_contain(0)
+    index.join()
+    monkeypatch.setattr(ids, 'unpatrolled_creations', index)
+    ids.title_to_show_patrol_footer_cache.clear()
+    ids.rev_id_to_page_id_and_title_cache[10] = (1, 'Q1')
+    ids.rev_id_to_page_id_and_title_cache[20] = (2, 'Q2')
+    ids.rev_id_to_page_id_and_title_cache[30] = (3, 'Q3')
+
+    def respond(params):
+        # page 2 was patrolled since the index was refreshed
+        return {'query': {'recentchanges': [{'type': 'new'}] if params['rctitle'] == 'Q1' else []}}
+
+    session = FakeSession(respond)
+    assert ids.rev_id_to_show_patrol_footer(10, session)
+    assert not ids.rev_id_to_show_patrol_footer(20, session)
+    assert [request['rctitle'] for request in session.requests] == ['Q1', 'Q2']
+    # page 3 is older than the latest creation and not in the index
+    ids.unpatrolled_creations._max_page_id = 3
+    assert not ids.rev_id_to_show_patrol_footer(30, session)
+    assert len(session.requests) == 2
+
+
+@pytest.fixture
+def restore_caches(monkeypatch):
+    for name in ['rev_id_to_page_id_and_title_cache', 'rev_id_to_user_fake_id_cache',
+                 'title_to_show_patrol_footer_cache', 'rev_id_to_primary_script_cache',
+                 'title_to_show_patrol_footer_ttl']:
+        monkeypatch.setattr(ids, name, getattr(ids, name))  # restored after the test
+
+
+def test_configure_caches(restore_caches):
+    ids.configure_caches({'page_id_and_title': 100_000, 'primary_script': 1500}, show_patrol_footer_ttl=60)
+    session = FakeSession(revisions_response)
+    ids.resolve_rev_ids(range(1000, 5000), session)
+    for rev_id in range(100):
+        ids.rev_id_to_primary_script_cache[rev_id] = 'Latin'
+    usage = ids.cache_usage()
+    assert usage['page_id_and_title'].bytes <= 100_000
+    assert 1000 < usage['page_id_and_title'].entries < 4000
+    assert usage['user_fake_id'].entries == 4000
+    assert usage['primary_script'] == ids.CacheUsage(10, 1500)
+    assert usage['show_patrol_footer'] == ids.CacheUsage(0, 0)
+    assert ids.title_to_show_patrol_footer_cache.ttl == 60
+
+
+def test_configure_caches_unknown_name(restore_caches):
+    with pytest.raises(ValueError, match='page_ids'):
+        ids.configure_caches({'page_ids': 100_000})
+
+
+def test_shared_caches(tmp_path, restore_caches):
+    path = str(tmp_path / 'cache.sqlite')
+    ids.use_shared_caches(path)
+    html = '<tr><td class="diff-lineno">label / ru</td></tr><tr><td class="diff-addedline">рус</td></tr>'
+    ids.resolve_rev_ids([123], FakeSession(revisions_response))
+    ids.rev_id_to_primary_script(123, FakeSession(compare_response(html)))
+
+    # another worker process gets cache hits without any API requests
+    worker = subprocess.run([sys.executable, '-c', f'''
+import ids
+
+class NoSession:
+    def get(self, **params):
+        raise AssertionError('unexpected API request')
+
+ids.use_shared_caches({path!r})
+print(ids.rev_id_to_page_id_and_title(123, NoSession()))
+print(ids.rev_id_to_user_fake_id(123, NoSession()))
+print(ids.rev_id_to_primary_script(123, NoSession()))
+print(dict(ids.rev_id_to_primary_script_cache_stats))
+'''], check=True, capture_output=True, text=True)
+    assert worker.stdout.splitlines() == [
+        "(12, 'Q12')",
+        str(ids.user_fake_id('U123')),
+        'Cyrillic',
+        "{'hits': 1}",
+    ]
+
+
+def test_configure_id_limits(monkeypatch):
+    monkeypatch.setattr(ids, 'id_limits', ids.id_limits)  # restored after the test
+    ids.configure_id_limits({'page_ids': 3}, defaults=ids.server_side_id_limits)
+    assert ids.id_limit('ignored_page_ids') == 3
+    assert ids.id_limit('skipped_rev_ids') == ids.server_side_id_limits['rev_ids']
+    session = {}
+    for page_id in range(10):
+        ids.append(session, 'ignored_page_ids', page_id)
+    assert ids.get(session, 'ignored_page_ids') == [9, 8, 7, 6]
+
+
+def test_configure_id_limits_unknown_type(monkeypatch):
+    monkeypatch.setattr(ids, 'id_limits', ids.id_limits)
+    with pytest.raises(ValueError, match='rev_id'):
+        ids.configure_id_limits({'rev_id': 3})
+
+
+def test_newest_of_groups():
+    changes = [(50, 1, 100), (40, 2, 100), (30, 1, 100), (20, 1, 200), (10, 2, 100)]
+    assert list(ids.newest_of_groups(changes)) == [(50, 1, 100), (40, 2, 100), (20, 1, 200)]
+
+
+def page_history_response(history):
+    """Respond to list=recentchanges for one page with the given (rev ID, user, patrolled) tuples, oldest first."""
+    def respond(params):
+        assert params['list'] == 'recentchanges'
+        assert params['rctitle'] == 'Q42'
+        changes = []
+        old_rev_id = 0
+        for rev_id, user, patrolled in history:
+            change = {'type': 'edit', 'revid': rev_id, 'old_revid': old_rev_id, 'patrolled': patrolled}
+            if user is not None:
+                change['user'] = user
+            changes.append(change)
+            old_rev_id = rev_id
+        return {'query': {'recentchanges': list(reversed(changes))}}
+    return respond
+
+
+history = [(1, 'A', True), (2, 'B', False), (3, 'B', True), (4, 'B', False), (5, 'C', False), (6, 'C', False)]
+
+
+@pytest.mark.parametrize('rev_id, limit, expected', [
+    (4, 50, ids.RevisionGroup([4, 3, 2], [4, 2], 1)),
+    (4, 2, ids.RevisionGroup([4, 3], [4], 2)),
+    (6, 50, ids.RevisionGroup([6, 5], [6, 5], 4)),
+    (5, 50, ids.RevisionGroup([5], [5], 4)),
+    (1, 50, ids.RevisionGroup([1], [], 0)),
+    (7, 50, ids.RevisionGroup([7], [7], 0)),  # not in the recent changes
+])
+def test_rev_id_to_group(rev_id, limit, expected):
+    ids.rev_id_to_page_id_and_title_cache[rev_id] = (42, 'Q42')
+    assert ids.rev_id_to_group(rev_id, FakeSession(page_history_response(history)), limit) == expected
+
+
+def test_rev_id_to_group_user_hidden():
+    ids.rev_id_to_page_id_and_title_cache[3] = (42, 'Q42')
+    session = FakeSession(page_history_response([(1, 'A', True), (2, None, False), (3, None, False)]))
+    assert ids.rev_id_to_group(3, session) == ids.RevisionGroup([3], [3], 0)
@@ -0,0 +1,99 @@
+import pytest
+import threading
+
+import patrolqueue
+
+
+class FakePatrolApi:
+    """Answers action=patrol requests (through the fake_api fixture).
+
+    errors maps rev IDs to the error codes of the next patrol requests for them."""
+
+    def __init__(self, api):
+        self.api = api
+        api.respond = self.respond
+        self.patrolled = []
+        self.errors = {}
+        self.release = threading.Event()  # patrol requests wait for this
+        self.release.set()
+
+    def respond(self, request):
+        assert request.params['action'] == 'patrol'
+        self.release.wait()
+        rev_id = int(request.params['revid'])
+        errors = self.errors.get(rev_id, [])
+        if errors:
+            return {'error': {'code': errors.pop(0), 'info': 'Fake error.'}}
+        self.patrolled.append(rev_id)
+        return {'patrol': {'rcid': rev_id}}
+
+    def session(self):
+        return self.api.session('test_patrolqueue')
+
+    def close(self):
+        self.api.close()
+
+
+@pytest.fixture
+def api(fake_api):
+    return FakePatrolApi(fake_api)
+
+
+def patrol(session, rev_id):
+    return lambda: session.post(action='patrol', revid=rev_id, token='+\\')
+
+
+def test_patrol_queue(api):
+    queue = patrolqueue.PatrolQueue(max_workers=2, retry_delay=0)
+    session = api.session()
+    succeeded = []
+    api.release.clear()
+    for rev_id in [1, 2, 3]:
+        queue.submit('alice', rev_id, patrol(session, rev_id), lambda rev_id=rev_id: succeeded.append(rev_id))
+    assert queue.pending() == {1, 2, 3}
+    api.release.set()
+    queue.join()
+    assert sorted(api.patrolled) == [1, 2, 3]
+    assert sorted(succeeded) == [1, 2, 3]
+    assert queue.pending() == frozenset()
+    assert queue.pop_failures('alice') == []
+
+
+def test_patrol_queue_retries_temporary_errors(api):
+    queue = patrolqueue.PatrolQueue(retries=2, retry_delay=0)
+    api.errors[1] = ['ratelimited', 'readonly']
+    queue.submit('alice', 1, patrol(api.session(), 1))
+    queue.join()
+    assert api.patrolled == [1]
+    assert queue.pop_failures('alice') == []
+
+
+def test_patrol_queue_records_failures(api):
+    queue = patrolqueue.PatrolQueue(retries=2, retry_delay=0)
+    succeeded = []
+    api.errors[1] = ['ratelimited', 'ratelimited', 'ratelimited']
+    api.errors[2] = ['permissiondenied', 'permissiondenied']
+    session = api.session()
+    queue.submit('alice', 1, patrol(session, 1), lambda: succeeded.append(1))
+    queue.submit('alice', 2, patrol(session, 2), lambda: succeeded.append(2))
+    queue.submit('bob', 3, patrol(session, 3), lambda: succeeded.append(3))
+    queue.join()
+    assert api.patrolled == [3]
+    assert succeeded == [3]
+    assert api.errors[2] == ['permissiondenied']  # not retried
+    failures = queue.pop_failures('alice')
+    assert sorted(failure.rev_id for failure in failures) == [1, 2]
+    assert all('Fake error.' in failure.error for failure in failures)
+    assert queue.pop_failures('alice') == []
+    assert queue.pop_failures('bob') == []
+    assert queue.pending() == frozenset()
+
+
+def test_patrol_queue_connection_error(api):
+    queue = patrolqueue.PatrolQueue(retries=1, retry_delay=0)
+    session = api.session()
+    api.close()
+    queue.submit('alice', 1, patrol(session, 1))
+    queue.join()
+    [failure] = queue.pop_failures('alice')
+    assert failure.rev_id == 1
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import pytest
+import threading
+
+import prefetch
+
+
+@pytest.mark.parametrize('ahead', [0, 1, 2, 5, 100])
+def test_prefetch_matches_sequential(ahead):
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(prefetch.prefetch(lambda x: x * x, range(20), executor, ahead))
+    assert results == [(x, x * x) for x in range(20)]
+
+
+def test_prefetch_without_executor():
+    results = list(prefetch.prefetch(lambda x: -x, [1, 2, 3], None, 4))
+    assert results == [(1, -1), (2, -2), (3, -3)]
+
+
+def test_prefetch_exception():
+    def func(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = prefetch.prefetch(func, range(10), executor, 4)
+        assert [next(results) for _ in range(3)] == [(0, 0), (1, 1), (2, 2)]
+        with pytest.raises(ValueError):
+            next(results)
+
+
+def test_prefetch_cancels_outstanding_calls():
+    started = []
+    release = threading.Event()
+
+    def func(x):
+        started.append(x)
+        if x == 0:
+            release.wait()
+        return x
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with contextlib.closing(prefetch.prefetch(func, range(10), executor, 5)) as results:
+            release.set()
+            assert next(results) == (0, 0)
+        # the executor only has one worker, so at most one more call can have started
+    assert len(started) <= 2
@@ -1,3 +1,4 @@
+import bs4
 import pytest
 
 import scripts
@@ -19,7 +20,22 @@ def test_scripts_of_text(text, expected_scripts):
     assert expected_scripts == actual_scripts
 
 
-@pytest.mark.parametrize('html, expected_script', [
+@pytest.mark.parametrize('texts, expected_scripts', [
+    (['lorem ipsum', 'dolor sit amet'], ['Latin']),
+    ([], []),
+    (['', '.,-0123456789'], []),
+    (['αβγ', 'АБВГ'], ['Cyrillic', 'Greek']),
+    (['ab', 'αβ'], ['Latin', 'Greek']),  # ties ordered by first appearance
+    (['αβ', 'ab'], ['Greek', 'Latin']),
+    (['abc', 'ᚁᚂᚃᚄ'], ['Ogham', 'Latin']),
+    ((text for text in ['ᚠᚡ', '𓀀']), ['Runic', 'Egyptian_Hieroglyphs']),  # generator
+])
+def test_scripts_of_texts(texts, expected_scripts):
+    actual_scripts = scripts.scripts_of_texts(texts)
+    assert expected_scripts == actual_scripts
+
+
+diffs = [
     # label
     ('<tr><td colspan="2" class="diff-lineno">label / ru</td><td colspan="2" class="diff-lineno">label / ru</td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline">рус</ins></div></td></tr>', 'Cyrillic'),
     # description
@@ -36,7 +52,84 @@ def test_scripts_of_text(text, expected_scripts):
     ('<tr><td colspan="2" class="diff-lineno"></td><td colspan="2" class="diff-lineno">Property / <a title="Property:P2949" href="/wiki/Property:P2949">WikiTree person ID</a></td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline"><span><a class="wb-external-id" href="https://www.wikitree.com/wiki/Fignol%C3%A9-1">Fignolé-1</a></span></ins></div></td></tr><tr><td colspan="2" class="diff-lineno"></td><td colspan="2" class="diff-lineno">Property / <a title="Property:P2949" href="/wiki/Property:P2949">WikiTree person ID</a>: <a class="wb-external-id" href="https://www.wikitree.com/wiki/Fignol%C3%A9-1">Fignolé-1</a> / rank</td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline"><span>Normal rank</span></ins></div></td></tr>', None),
     # item
     ('<tr><td colspan="2" class="diff-lineno"></td><td colspan="2" class="diff-lineno">Property / <a title="Property:P31" href="/wiki/Property:P31">instance of</a></td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline"><span><a title="Q5" href="/wiki/Q5">human</a></span></ins></div></td></tr><tr><td colspan="2" class="diff-lineno"></td><td colspan="2" class="diff-lineno">Property / <a title="Property:P31" href="/wiki/Property:P31">instance of</a>: <a title="Q5" href="/wiki/Q5">human</a> / rank</td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline"><span>Preferred rank</span></ins></div></td></tr>', None),
-])
+]
+
+
+@pytest.mark.parametrize('html, expected_script', diffs)
 def test_primary_script_of_diff(html, expected_script):
     actual_script = scripts.primary_script_of_diff(html)
     assert expected_script == actual_script
+
+
+def label_diff(language_code, label):
+    return f'<tr><td colspan="2" class="diff-lineno">label / {language_code}</td><td colspan="2" class="diff-lineno">label / {language_code}</td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline">{label}</ins></div></td></tr>'
+
+
+@pytest.mark.parametrize('html, expected_script', [
+    # decided early
+    (''.join([label_diff('ru', 'Дуглас Адамс')] * 50 + [label_diff('en', 'Douglas Adams')] * 10), 'Cyrillic'),
+    # not decided until the end
+    (''.join([label_diff('en', 'Douglas Adams')] * 50 + [label_diff('ru', 'Дуглас Адамс')] * 60), 'Cyrillic'),
+    # tie, first script wins
+    (''.join([label_diff('en', 'Adams')] * 30 + [label_diff('ru', 'Адамс')] * 30), 'Latin'),
+], ids=['decided early', 'decided at the end', 'tie'])
+def test_primary_script_of_diff_long(html, expected_script):
+    actual_script = scripts.primary_script_of_diff(html)
+    assert expected_script == actual_script
+
+
+@pytest.mark.parametrize('html, expected', [
+    (label_diff('en', 'Douglas Adams'), True),
+    ('<tr><td colspan="2" class="diff-lineno"></td><td colspan="2" class="diff-lineno">Property / <a title="Property:P31" href="/wiki/Property:P31">instance of</a></td></tr><tr><td colspan="2">&nbsp;</td><td class="diff-marker">+</td><td class="diff-addedline"><div><ins class="diffchange diffchange-inline"><span><a title="Q5" href="/wiki/Q5">human</a></span></ins></div></td></tr>', False),
+    ('', False),
+])
+def test_diff_has_script_sections(html, expected):
+    assert expected == scripts.diff_has_script_sections(html)
+
+
+def test_primary_script_detector():
+    detector = scripts.PrimaryScriptDetector()
+    assert detector.primary_script() is None
+    assert not detector.decided(remaining=1)
+    assert detector.decided(remaining=0)
+    detector.feed('abc, ')
+    assert detector.primary_script() == 'Latin'
+    assert detector.decided(remaining=2)
+    assert not detector.decided(remaining=3)
+    detector.feed_texts(['αβγ', 'δ'])
+    assert detector.primary_script() == 'Greek'
+    assert not detector.decided(remaining=1)
+    detector.feed('ε')
+    assert detector.decided(remaining=1)
+
+
+def bs4_texts_of_diff(html):
+    """The previous, BeautifulSoup-based implementation of scripts.texts_of_diff()."""
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+    elements = [content for content in soup.contents if type(content) is bs4.Tag]
+    texts = []
+    for i in range(0, len(elements), 2):
+        lineno = elements[i].get_text()
+        if (lineno.startswith('label / ') or
+                lineno.startswith('description /') or
+                lineno.startswith('aliases /') or
+                lineno.startswith('links /')):
+            texts += (element.get_text() for element in elements[i + 1].select('.diff-addedline, .diff-deletedline'))
+        elif lineno.startswith('Property /'):
+            texts += (element.get_text() for element in elements[i + 1].select('.wb-monolingualtext-value'))
+            texts += (element.get_text() for element in elements[i + 1].select('a.extiw[href^="//commons.wikimedia.org/"]'))
+    return texts
+
+
+@pytest.mark.parametrize('html', [html for html, expected_script in diffs] + [
+    # entities, void elements and line breaks
+    '<tr><td class="diff-lineno">label / en</td></tr>\n<tr><td class="diff-addedline"><div>Tom &amp; Jerry<br>&#x1F600;<img src="x"> &lt;3</div></td></tr>\n',
+    # multiple classes, nested matches, unclosed elements
+    '<tr><td class="diff-lineno">description / de</td></tr><tr><td class="diff-deletedline diff-side-deleted"><div class="diff-addedline">a<span>b</div>c</td><td class="diff-addedline">d</tr>',
+    # monolingual text and Commons links in context lines, in document order
+    '<tr><td class="diff-lineno">Property / x</td></tr><tr><td class="diff-context"><a class="extiw" href="//commons.wikimedia.org/wiki/File:A.jpg">A.jpg</a><span class="wb-monolingualtext-value">Ä</span><a class="extiw" href="//en.wikipedia.org/wiki/B">B</a></td></tr>',
+    # ignored sections and stray text and end tags at the top level
+    'text</td><tr><td class="diff-lineno">other</td></tr><tr><td class="diff-addedline">x</td></tr><tr><td class="diff-lineno">links / enwiki / name</td></tr><tr><td class="diff-addedline">y</td></tr>',
+])
+def test_texts_of_diff(html):
+    assert bs4_texts_of_diff(html) == scripts.texts_of_diff(html)
@@ -0,0 +1,138 @@
+import datetime
+import flask
+import pytest
+import sqlite3
+
+import sessionstore
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = flask.Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = sessionstore.SQLiteSessionInterface(str(tmp_path / 'sessions.sqlite'))
+
+    @app.route('/get/<key>')
+    def get(key):
+        return repr(flask.session.get(key))
+
+    @app.route('/set/<key>/<value>')
+    def set(key, value):
+        flask.session[key] = value
+        return ''
+
+    @app.route('/clear')
+    def clear():
+        flask.session.clear()
+        return ''
+
+    @app.route('/login-ish')
+    def login_ish():
+        flask.session.regenerate()
+        flask.session['user'] = 'victim'
+        return ''
+
+    @app.route('/static-ish')
+    def static_ish():
+        return ''
+
+    return app
+
+
+def stored_sessions(app):
+    connection = sqlite3.connect(app.session_interface.path)
+    return connection.execute('SELECT sid, data, expires FROM sessions').fetchall()
+
+
+def test_session_round_trip(app):
+    with app.test_client() as client:
+        client.get('/set/a/1')
+        client.get('/set/b/2')
+        assert client.get('/get/a').text == "'1'"
+        assert client.get('/get/b').text == "'2'"
+        sid = client.get_cookie('session').value
+        assert len(sid) == 43  # only the session ID, not the data
+        [(stored_sid, data, expires)] = stored_sessions(app)
+        assert stored_sid == sid
+
+
+def test_session_not_shared(app):
+    with app.test_client() as client:
+        client.get('/set/a/1')
+    with app.test_client() as client:
+        assert client.get('/get/a').text == 'None'
+
+
+def test_session_with_tuples(app):
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session['diff_cursor'] = (123, 4.5)
+        with client.session_transaction() as session:
+            assert session['diff_cursor'] == (123, 4.5)
+
+
+def test_empty_session_not_stored(app):
+    with app.test_client() as client:
+        client.get('/get/a')
+        client.get('/static-ish')
+        assert client.get_cookie('session') is None
+        assert stored_sessions(app) == []
+
+
+def test_cleared_session_deleted(app):
+    with app.test_client() as client:
+        client.get('/set/a/1')
+        client.get('/clear')
+        assert client.get_cookie('session') is None
+        assert stored_sessions(app) == []
+
+
+def test_unmodified_session_not_saved(app):
+    with app.test_client() as client:
+        client.get('/set/a/1')
+        [before] = stored_sessions(app)
+        response = client.get('/get/a')
+        assert 'Set-Cookie' not in response.headers
+        assert stored_sessions(app) == [before]
+
+
+def test_unknown_session_id_not_reused(app):
+    with app.test_client() as client:
+        client.set_cookie('session', 'chosen-by-the-client')
+        client.get('/set/a/1')
+        assert client.get_cookie('session').value != 'chosen-by-the-client'
+        [(sid, data, expires)] = stored_sessions(app)
+        assert sid == client.get_cookie('session').value
+
+
+def test_expired_session(app):
+    app.permanent_session_lifetime = datetime.timedelta(seconds=-1)
+    with app.test_client() as client:
+        client.get('/set/a/1')
+        assert client.get('/get/a').text == 'None'
+
+
+def test_expired_sessions_pruned(app):
+    app.session_interface.prune_every = 3
+    app.permanent_session_lifetime = datetime.timedelta(seconds=-1)
+    for i in range(2):
+        app.test_client().get('/set/a/1')
+    assert len(stored_sessions(app)) == 2
+    app.permanent_session_lifetime = datetime.timedelta(days=1)
+    app.test_client().get('/set/a/1')
+    assert len(stored_sessions(app)) == 1
+
+
+def test_session_id_regenerated(app):
+    attacker = app.test_client()
+    attacker.get('/set/a/1')
+    planted_sid = attacker.get_cookie('session').value
+    with app.test_client() as victim:
+        victim.set_cookie('session', planted_sid)
+        victim.get('/login-ish')
+        sid = victim.get_cookie('session').value
+        assert sid != planted_sid
+        assert victim.get('/get/a').text == "'1'"  # the data is kept
+        assert victim.get('/get/user').text == "'victim'"
+        assert [stored_sid for stored_sid, data, expires in stored_sessions(app)] == [sid]
+    assert attacker.get('/get/user').text == 'None'
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+import sharedcache
+
+
+def test_sqlite_cache(tmp_path):
+    cache = sharedcache.SQLiteCache(str(tmp_path / 'cache.sqlite'), 'test', maxsize=10)
+    cache[1] = (2, 'Q2')
+    cache[3] = None
+    cache['title'] = True
+    assert cache[1] == (2, 'Q2')
+    assert cache[3] is None
+    assert cache['title'] is True
+    assert 4 not in cache
+    assert len(cache) == 3
+    del cache[3]
+    assert set(cache) == {1, 'title'}
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_maxsize(tmp_path):
+    cache = sharedcache.SQLiteCache(str(tmp_path / 'cache.sqlite'), 'test', maxsize=10)
+    cache.prune_every = 5
+    for i in range(20):
+        cache[i] = i
+    assert len(cache) == 10
+    assert set(cache) == set(range(10, 20))
+
+
+def test_sqlite_cache_ttl(tmp_path, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(sharedcache.time, 'time', lambda: now)
+    cache = sharedcache.SQLiteCache(str(tmp_path / 'cache.sqlite'), 'test', maxsize=10, ttl=60)
+    cache['title'] = False
+    now = 1059.0
+    assert cache['title'] is False
+    now = 1060.0
+    assert 'title' not in cache
+
+
+def test_sqlite_cache_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = sharedcache.SQLiteCache(path, 'test', maxsize=10)
+    cache[1] = 'from parent'
+    subprocess.run([sys.executable, '-c', f'''
+import sharedcache
+cache = sharedcache.SQLiteCache({path!r}, 'test', maxsize=10)
+assert cache[1] == 'from parent'
+cache[2] = 'from child'
+'''], check=True)
+    assert cache[2] == 'from child'
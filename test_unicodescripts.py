@@ -0,0 +1,109 @@
+import pytest
+import subprocess
+import sys
+
+import unicodescripts
+
+
+def test_bmp_matches_ranges():
+    data = unicodescripts._load()
+    for code_point in range(0x110000):
+        expected = data.script_indices[unicodescripts.bisect_right(data.starts, code_point) - 1]
+        assert expected == unicodescripts.script_index(chr(code_point)), hex(code_point)
+
+
+@pytest.mark.parametrize('chr, expected_script', [
+    ('\0', 'Common'),
+    ('a', 'Latin'),
+    ('Ω', 'Greek'),
+    ('\u0301', 'Inherited'),
+    ('汉', 'Han'),
+    ('\u0378', 'Unknown'),  # unassigned
+    ('𐐔', 'Deseret'),
+    ('\U0010FFFF', 'Unknown'),
+])
+def test_script(chr, expected_script):
+    assert expected_script == unicodescripts.script(chr)
+
+
+def test_script_name():
+    for chr in 'aΩ汉𐐔':
+        index = unicodescripts.script_index(chr)
+        assert unicodescripts.script(chr) == unicodescripts.script_name(index)
+        assert index == unicodescripts.index_of_script(unicodescripts.script_name(index))
+
+
+def test_fixed_script_indices():
+    assert unicodescripts.UNKNOWN == unicodescripts.index_of_script('Unknown')
+    assert unicodescripts.COMMON == unicodescripts.index_of_script('Common')
+    assert unicodescripts.INHERITED == unicodescripts.index_of_script('Inherited')
+
+
+def test_unicode_version():
+    assert unicodescripts.unicode_version() == '12.0.0'
+
+
+@pytest.mark.parametrize('offset', [
+    0,  # magic
+    unicodescripts._HEADER.size,  # script names
+    unicodescripts._HEADER.size + 1000,  # BMP table
+    -1,  # range script indices
+])
+def test_open_corrupted(tmp_path, offset):
+    with open(unicodescripts._path, 'rb') as f:
+        data = bytearray(f.read())
+    data[offset] ^= 0xff
+    path = tmp_path / 'unicodescripts.dat'
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        unicodescripts._open(str(path))
+
+
+def test_open_truncated(tmp_path):
+    with open(unicodescripts._path, 'rb') as f:
+        data = f.read()
+    path = tmp_path / 'unicodescripts.dat'
+    path.write_bytes(data[:-10])
+    with pytest.raises(ValueError):
+        unicodescripts._open(str(path))
+
+
+def test_all_scripts():
+    all_scripts = unicodescripts.all_scripts()
+    assert 'Latin' in all_scripts
+    assert 'Common' in all_scripts
+    assert 'Unknown' not in all_scripts
+
+
+def test_import_is_lazy():
+    subprocess.run([sys.executable, '-c', 'import app, unicodescripts; assert unicodescripts._data is None'],
+                   check=True)
+
+
+def test_import_time():
+    """Guard against regressions in the import time of the tool.
+
+    The script data of unicodescripts and the caches of ids used to be
+    built at import time, which took a noticeable part of the startup
+    of every gunicorn worker. The cumulative import time (including
+    the modules they import) of app, ids and unicodescripts is measured,
+    taking the best of three runs to reduce noise."""
+    budgets = {  # microseconds
+        'app': 1500000,  # mostly flask, mwapi and their dependencies
+        'ids': 100000,
+        'unicodescripts': 10000,
+    }
+    best: dict[str, int] = {}
+    for _ in range(3):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                                check=True, capture_output=True, text=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            self_time, cumulative_time, name = line.removeprefix('import time:').split('|')
+            name = name.strip()
+            if name in budgets and cumulative_time.strip().isdigit():
+                best[name] = min(best.get(name, int(cumulative_time)), int(cumulative_time))
+    assert best.keys() == budgets.keys()
+    for name, budget in budgets.items():
+        assert best[name] <= budget, name
@@ -1,900 +1,112 @@
-#!/usr/bin/python3
-
-import intervaltree  # type: ignore
-from typing import Iterable, cast
-
-
-_tree = intervaltree.IntervalTree()
-
-_tree[0:65] = 'Common'
-_tree[91:97] = 'Common'
-_tree[123:170] = 'Common'
-_tree[171:186] = 'Common'
-_tree[187:192] = 'Common'
-_tree[215:216] = 'Common'
-_tree[247:248] = 'Common'
-_tree[697:736] = 'Common'
-_tree[741:746] = 'Common'
-_tree[748:768] = 'Common'
-_tree[884:885] = 'Common'
-_tree[894:895] = 'Common'
-_tree[901:902] = 'Common'
-_tree[903:904] = 'Common'
-_tree[1417:1418] = 'Common'
-_tree[1541:1542] = 'Common'
-_tree[1548:1549] = 'Common'
-_tree[1563:1564] = 'Common'
-_tree[1567:1568] = 'Common'
-_tree[1600:1601] = 'Common'
-_tree[1757:1758] = 'Common'
-_tree[2274:2275] = 'Common'
-_tree[2404:2406] = 'Common'
-_tree[3647:3648] = 'Common'
-_tree[4053:4057] = 'Common'
-_tree[4347:4348] = 'Common'
-_tree[5867:5870] = 'Common'
-_tree[5941:5943] = 'Common'
-_tree[6146:6148] = 'Common'
-_tree[6149:6150] = 'Common'
-_tree[7379:7380] = 'Common'
-_tree[7393:7394] = 'Common'
-_tree[7401:7405] = 'Common'
-_tree[7406:7412] = 'Common'
-_tree[7413:7416] = 'Common'
-_tree[7418:7419] = 'Common'
-_tree[8192:8204] = 'Common'
-_tree[8206:8293] = 'Common'
-_tree[8294:8305] = 'Common'
-_tree[8308:8319] = 'Common'
-_tree[8320:8335] = 'Common'
-_tree[8352:8384] = 'Common'
-_tree[8448:8486] = 'Common'
-_tree[8487:8490] = 'Common'
-_tree[8492:8498] = 'Common'
-_tree[8499:8526] = 'Common'
-_tree[8527:8544] = 'Common'
-_tree[8585:8588] = 'Common'
-_tree[8592:9255] = 'Common'
-_tree[9280:9291] = 'Common'
-_tree[9312:10240] = 'Common'
-_tree[10496:11124] = 'Common'
-_tree[11126:11158] = 'Common'
-_tree[11160:11264] = 'Common'
-_tree[11776:11856] = 'Common'
-_tree[12272:12284] = 'Common'
-_tree[12288:12293] = 'Common'
-_tree[12294:12295] = 'Common'
-_tree[12296:12321] = 'Common'
-_tree[12336:12344] = 'Common'
-_tree[12348:12352] = 'Common'
-_tree[12443:12445] = 'Common'
-_tree[12448:12449] = 'Common'
-_tree[12539:12541] = 'Common'
-_tree[12688:12704] = 'Common'
-_tree[12736:12772] = 'Common'
-_tree[12832:12896] = 'Common'
-_tree[12927:13008] = 'Common'
-_tree[13144:13312] = 'Common'
-_tree[19904:19968] = 'Common'
-_tree[42752:42786] = 'Common'
-_tree[42888:42891] = 'Common'
-_tree[43056:43066] = 'Common'
-_tree[43310:43311] = 'Common'
-_tree[43471:43472] = 'Common'
-_tree[43867:43868] = 'Common'
-_tree[64830:64832] = 'Common'
-_tree[65040:65050] = 'Common'
-_tree[65072:65107] = 'Common'
-_tree[65108:65127] = 'Common'
-_tree[65128:65132] = 'Common'
-_tree[65279:65280] = 'Common'
-_tree[65281:65313] = 'Common'
-_tree[65339:65345] = 'Common'
-_tree[65371:65382] = 'Common'
-_tree[65392:65393] = 'Common'
-_tree[65438:65440] = 'Common'
-_tree[65504:65511] = 'Common'
-_tree[65512:65519] = 'Common'
-_tree[65529:65534] = 'Common'
-_tree[65792:65795] = 'Common'
-_tree[65799:65844] = 'Common'
-_tree[65847:65856] = 'Common'
-_tree[65936:65948] = 'Common'
-_tree[66000:66045] = 'Common'
-_tree[66273:66300] = 'Common'
-_tree[94178:94180] = 'Common'
-_tree[113824:113828] = 'Common'
-_tree[118784:119030] = 'Common'
-_tree[119040:119079] = 'Common'
-_tree[119081:119143] = 'Common'
-_tree[119146:119163] = 'Common'
-_tree[119171:119173] = 'Common'
-_tree[119180:119210] = 'Common'
-_tree[119214:119273] = 'Common'
-_tree[119520:119540] = 'Common'
-_tree[119552:119639] = 'Common'
-_tree[119648:119673] = 'Common'
-_tree[119808:119893] = 'Common'
-_tree[119894:119965] = 'Common'
-_tree[119966:119968] = 'Common'
-_tree[119970:119971] = 'Common'
-_tree[119973:119975] = 'Common'
-_tree[119977:119981] = 'Common'
-_tree[119982:119994] = 'Common'
-_tree[119995:119996] = 'Common'
-_tree[119997:120004] = 'Common'
-_tree[120005:120070] = 'Common'
-_tree[120071:120075] = 'Common'
-_tree[120077:120085] = 'Common'
-_tree[120086:120093] = 'Common'
-_tree[120094:120122] = 'Common'
-_tree[120123:120127] = 'Common'
-_tree[120128:120133] = 'Common'
-_tree[120134:120135] = 'Common'
-_tree[120138:120145] = 'Common'
-_tree[120146:120486] = 'Common'
-_tree[120488:120780] = 'Common'
-_tree[120782:120832] = 'Common'
-_tree[126065:126133] = 'Common'
-_tree[126209:126270] = 'Common'
-_tree[126976:127020] = 'Common'
-_tree[127024:127124] = 'Common'
-_tree[127136:127151] = 'Common'
-_tree[127153:127168] = 'Common'
-_tree[127169:127184] = 'Common'
-_tree[127185:127222] = 'Common'
-_tree[127232:127245] = 'Common'
-_tree[127248:127341] = 'Common'
-_tree[127344:127405] = 'Common'
-_tree[127462:127488] = 'Common'
-_tree[127489:127491] = 'Common'
-_tree[127504:127548] = 'Common'
-_tree[127552:127561] = 'Common'
-_tree[127568:127570] = 'Common'
-_tree[127584:127590] = 'Common'
-_tree[127744:128726] = 'Common'
-_tree[128736:128749] = 'Common'
-_tree[128752:128763] = 'Common'
-_tree[128768:128884] = 'Common'
-_tree[128896:128985] = 'Common'
-_tree[128992:129004] = 'Common'
-_tree[129024:129036] = 'Common'
-_tree[129040:129096] = 'Common'
-_tree[129104:129114] = 'Common'
-_tree[129120:129160] = 'Common'
-_tree[129168:129198] = 'Common'
-_tree[129280:129292] = 'Common'
-_tree[129293:129394] = 'Common'
-_tree[129395:129399] = 'Common'
-_tree[129402:129443] = 'Common'
-_tree[129445:129451] = 'Common'
-_tree[129454:129483] = 'Common'
-_tree[129485:129620] = 'Common'
-_tree[129632:129646] = 'Common'
-_tree[129648:129652] = 'Common'
-_tree[129656:129659] = 'Common'
-_tree[129664:129667] = 'Common'
-_tree[129680:129686] = 'Common'
-_tree[917505:917506] = 'Common'
-_tree[917536:917632] = 'Common'
-_tree[65:91] = 'Latin'
-_tree[97:123] = 'Latin'
-_tree[170:171] = 'Latin'
-_tree[186:187] = 'Latin'
-_tree[192:215] = 'Latin'
-_tree[216:247] = 'Latin'
-_tree[248:697] = 'Latin'
-_tree[736:741] = 'Latin'
-_tree[7424:7462] = 'Latin'
-_tree[7468:7517] = 'Latin'
-_tree[7522:7526] = 'Latin'
-_tree[7531:7544] = 'Latin'
-_tree[7545:7615] = 'Latin'
-_tree[7680:7936] = 'Latin'
-_tree[8305:8306] = 'Latin'
-_tree[8319:8320] = 'Latin'
-_tree[8336:8349] = 'Latin'
-_tree[8490:8492] = 'Latin'
-_tree[8498:8499] = 'Latin'
-_tree[8526:8527] = 'Latin'
-_tree[8544:8585] = 'Latin'
-_tree[11360:11392] = 'Latin'
-_tree[42786:42888] = 'Latin'
-_tree[42891:42944] = 'Latin'
-_tree[42946:42951] = 'Latin'
-_tree[42999:43008] = 'Latin'
-_tree[43824:43867] = 'Latin'
-_tree[43868:43877] = 'Latin'
-_tree[43878:43880] = 'Latin'
-_tree[64256:64263] = 'Latin'
-_tree[65313:65339] = 'Latin'
-_tree[65345:65371] = 'Latin'
-_tree[880:884] = 'Greek'
-_tree[885:888] = 'Greek'
-_tree[890:894] = 'Greek'
-_tree[895:896] = 'Greek'
-_tree[900:901] = 'Greek'
-_tree[902:903] = 'Greek'
-_tree[904:907] = 'Greek'
-_tree[908:909] = 'Greek'
-_tree[910:930] = 'Greek'
-_tree[931:994] = 'Greek'
-_tree[1008:1024] = 'Greek'
-_tree[7462:7467] = 'Greek'
-_tree[7517:7522] = 'Greek'
-_tree[7526:7531] = 'Greek'
-_tree[7615:7616] = 'Greek'
-_tree[7936:7958] = 'Greek'
-_tree[7960:7966] = 'Greek'
-_tree[7968:8006] = 'Greek'
-_tree[8008:8014] = 'Greek'
-_tree[8016:8024] = 'Greek'
-_tree[8025:8026] = 'Greek'
-_tree[8027:8028] = 'Greek'
-_tree[8029:8030] = 'Greek'
-_tree[8031:8062] = 'Greek'
-_tree[8064:8117] = 'Greek'
-_tree[8118:8133] = 'Greek'
-_tree[8134:8148] = 'Greek'
-_tree[8150:8156] = 'Greek'
-_tree[8157:8176] = 'Greek'
-_tree[8178:8181] = 'Greek'
-_tree[8182:8191] = 'Greek'
-_tree[8486:8487] = 'Greek'
-_tree[43877:43878] = 'Greek'
-_tree[65856:65935] = 'Greek'
-_tree[65952:65953] = 'Greek'
-_tree[119296:119366] = 'Greek'
-_tree[1024:1157] = 'Cyrillic'
-_tree[1159:1328] = 'Cyrillic'
-_tree[7296:7305] = 'Cyrillic'
-_tree[7467:7468] = 'Cyrillic'
-_tree[7544:7545] = 'Cyrillic'
-_tree[11744:11776] = 'Cyrillic'
-_tree[42560:42656] = 'Cyrillic'
-_tree[65070:65072] = 'Cyrillic'
-_tree[1329:1367] = 'Armenian'
-_tree[1369:1417] = 'Armenian'
-_tree[1418:1419] = 'Armenian'
-_tree[1421:1424] = 'Armenian'
-_tree[64275:64280] = 'Armenian'
-_tree[1425:1480] = 'Hebrew'
-_tree[1488:1515] = 'Hebrew'
-_tree[1519:1525] = 'Hebrew'
-_tree[64285:64311] = 'Hebrew'
-_tree[64312:64317] = 'Hebrew'
-_tree[64318:64319] = 'Hebrew'
-_tree[64320:64322] = 'Hebrew'
-_tree[64323:64325] = 'Hebrew'
-_tree[64326:64336] = 'Hebrew'
-_tree[1536:1541] = 'Arabic'
-_tree[1542:1548] = 'Arabic'
-_tree[1549:1563] = 'Arabic'
-_tree[1564:1565] = 'Arabic'
-_tree[1566:1567] = 'Arabic'
-_tree[1568:1600] = 'Arabic'
-_tree[1601:1611] = 'Arabic'
-_tree[1622:1648] = 'Arabic'
-_tree[1649:1757] = 'Arabic'
-_tree[1758:1792] = 'Arabic'
-_tree[1872:1920] = 'Arabic'
-_tree[2208:2229] = 'Arabic'
-_tree[2230:2238] = 'Arabic'
-_tree[2259:2274] = 'Arabic'
-_tree[2275:2304] = 'Arabic'
-_tree[64336:64450] = 'Arabic'
-_tree[64467:64830] = 'Arabic'
-_tree[64848:64912] = 'Arabic'
-_tree[64914:64968] = 'Arabic'
-_tree[65008:65022] = 'Arabic'
-_tree[65136:65141] = 'Arabic'
-_tree[65142:65277] = 'Arabic'
-_tree[69216:69247] = 'Arabic'
-_tree[126464:126468] = 'Arabic'
-_tree[126469:126496] = 'Arabic'
-_tree[126497:126499] = 'Arabic'
-_tree[126500:126501] = 'Arabic'
-_tree[126503:126504] = 'Arabic'
-_tree[126505:126515] = 'Arabic'
-_tree[126516:126520] = 'Arabic'
-_tree[126521:126522] = 'Arabic'
-_tree[126523:126524] = 'Arabic'
-_tree[126530:126531] = 'Arabic'
-_tree[126535:126536] = 'Arabic'
-_tree[126537:126538] = 'Arabic'
-_tree[126539:126540] = 'Arabic'
-_tree[126541:126544] = 'Arabic'
-_tree[126545:126547] = 'Arabic'
-_tree[126548:126549] = 'Arabic'
-_tree[126551:126552] = 'Arabic'
-_tree[126553:126554] = 'Arabic'
-_tree[126555:126556] = 'Arabic'
-_tree[126557:126558] = 'Arabic'
-_tree[126559:126560] = 'Arabic'
-_tree[126561:126563] = 'Arabic'
-_tree[126564:126565] = 'Arabic'
-_tree[126567:126571] = 'Arabic'
-_tree[126572:126579] = 'Arabic'
-_tree[126580:126584] = 'Arabic'
-_tree[126585:126589] = 'Arabic'
-_tree[126590:126591] = 'Arabic'
-_tree[126592:126602] = 'Arabic'
-_tree[126603:126620] = 'Arabic'
-_tree[126625:126628] = 'Arabic'
-_tree[126629:126634] = 'Arabic'
-_tree[126635:126652] = 'Arabic'
-_tree[126704:126706] = 'Arabic'
-_tree[1792:1806] = 'Syriac'
-_tree[1807:1867] = 'Syriac'
-_tree[1869:1872] = 'Syriac'
-_tree[2144:2155] = 'Syriac'
-_tree[1920:1970] = 'Thaana'
-_tree[2304:2385] = 'Devanagari'
-_tree[2389:2404] = 'Devanagari'
-_tree[2406:2432] = 'Devanagari'
-_tree[43232:43264] = 'Devanagari'
-_tree[2432:2436] = 'Bengali'
-_tree[2437:2445] = 'Bengali'
-_tree[2447:2449] = 'Bengali'
-_tree[2451:2473] = 'Bengali'
-_tree[2474:2481] = 'Bengali'
-_tree[2482:2483] = 'Bengali'
-_tree[2486:2490] = 'Bengali'
-_tree[2492:2501] = 'Bengali'
-_tree[2503:2505] = 'Bengali'
-_tree[2507:2511] = 'Bengali'
-_tree[2519:2520] = 'Bengali'
-_tree[2524:2526] = 'Bengali'
-_tree[2527:2532] = 'Bengali'
-_tree[2534:2559] = 'Bengali'
-_tree[2561:2564] = 'Gurmukhi'
-_tree[2565:2571] = 'Gurmukhi'
-_tree[2575:2577] = 'Gurmukhi'
-_tree[2579:2601] = 'Gurmukhi'
-_tree[2602:2609] = 'Gurmukhi'
-_tree[2610:2612] = 'Gurmukhi'
-_tree[2613:2615] = 'Gurmukhi'
-_tree[2616:2618] = 'Gurmukhi'
-_tree[2620:2621] = 'Gurmukhi'
-_tree[2622:2627] = 'Gurmukhi'
-_tree[2631:2633] = 'Gurmukhi'
-_tree[2635:2638] = 'Gurmukhi'
-_tree[2641:2642] = 'Gurmukhi'
-_tree[2649:2653] = 'Gurmukhi'
-_tree[2654:2655] = 'Gurmukhi'
-_tree[2662:2679] = 'Gurmukhi'
-_tree[2689:2692] = 'Gujarati'
-_tree[2693:2702] = 'Gujarati'
-_tree[2703:2706] = 'Gujarati'
-_tree[2707:2729] = 'Gujarati'
-_tree[2730:2737] = 'Gujarati'
-_tree[2738:2740] = 'Gujarati'
-_tree[2741:2746] = 'Gujarati'
-_tree[2748:2758] = 'Gujarati'
-_tree[2759:2762] = 'Gujarati'
-_tree[2763:2766] = 'Gujarati'
-_tree[2768:2769] = 'Gujarati'
-_tree[2784:2788] = 'Gujarati'
-_tree[2790:2802] = 'Gujarati'
-_tree[2809:2816] = 'Gujarati'
-_tree[2817:2820] = 'Oriya'
-_tree[2821:2829] = 'Oriya'
-_tree[2831:2833] = 'Oriya'
-_tree[2835:2857] = 'Oriya'
-_tree[2858:2865] = 'Oriya'
-_tree[2866:2868] = 'Oriya'
-_tree[2869:2874] = 'Oriya'
-_tree[2876:2885] = 'Oriya'
-_tree[2887:2889] = 'Oriya'
-_tree[2891:2894] = 'Oriya'
-_tree[2902:2904] = 'Oriya'
-_tree[2908:2910] = 'Oriya'
-_tree[2911:2916] = 'Oriya'
-_tree[2918:2936] = 'Oriya'
-_tree[2946:2948] = 'Tamil'
-_tree[2949:2955] = 'Tamil'
-_tree[2958:2961] = 'Tamil'
-_tree[2962:2966] = 'Tamil'
-_tree[2969:2971] = 'Tamil'
-_tree[2972:2973] = 'Tamil'
-_tree[2974:2976] = 'Tamil'
-_tree[2979:2981] = 'Tamil'
-_tree[2984:2987] = 'Tamil'
-_tree[2990:3002] = 'Tamil'
-_tree[3006:3011] = 'Tamil'
-_tree[3014:3017] = 'Tamil'
-_tree[3018:3022] = 'Tamil'
-_tree[3024:3025] = 'Tamil'
-_tree[3031:3032] = 'Tamil'
-_tree[3046:3067] = 'Tamil'
-_tree[73664:73714] = 'Tamil'
-_tree[73727:73728] = 'Tamil'
-_tree[3072:3085] = 'Telugu'
-_tree[3086:3089] = 'Telugu'
-_tree[3090:3113] = 'Telugu'
-_tree[3114:3130] = 'Telugu'
-_tree[3133:3141] = 'Telugu'
-_tree[3142:3145] = 'Telugu'
-_tree[3146:3150] = 'Telugu'
-_tree[3157:3159] = 'Telugu'
-_tree[3160:3163] = 'Telugu'
-_tree[3168:3172] = 'Telugu'
-_tree[3174:3184] = 'Telugu'
-_tree[3191:3213] = 'Telugu'
-_tree[3214:3217] = 'Kannada'
-_tree[3218:3241] = 'Kannada'
-_tree[3242:3252] = 'Kannada'
-_tree[3253:3258] = 'Kannada'
-_tree[3260:3269] = 'Kannada'
-_tree[3270:3273] = 'Kannada'
-_tree[3274:3278] = 'Kannada'
-_tree[3285:3287] = 'Kannada'
-_tree[3294:3295] = 'Kannada'
-_tree[3296:3300] = 'Kannada'
-_tree[3302:3312] = 'Kannada'
-_tree[3313:3315] = 'Kannada'
-_tree[3328:3332] = 'Malayalam'
-_tree[3333:3341] = 'Malayalam'
-_tree[3342:3345] = 'Malayalam'
-_tree[3346:3397] = 'Malayalam'
-_tree[3398:3401] = 'Malayalam'
-_tree[3402:3408] = 'Malayalam'
-_tree[3412:3428] = 'Malayalam'
-_tree[3430:3456] = 'Malayalam'
-_tree[3458:3460] = 'Sinhala'
-_tree[3461:3479] = 'Sinhala'
-_tree[3482:3506] = 'Sinhala'
-_tree[3507:3516] = 'Sinhala'
-_tree[3517:3518] = 'Sinhala'
-_tree[3520:3527] = 'Sinhala'
-_tree[3530:3531] = 'Sinhala'
-_tree[3535:3541] = 'Sinhala'
-_tree[3542:3543] = 'Sinhala'
-_tree[3544:3552] = 'Sinhala'
-_tree[3558:3568] = 'Sinhala'
-_tree[3570:3573] = 'Sinhala'
-_tree[70113:70133] = 'Sinhala'
-_tree[3585:3643] = 'Thai'
-_tree[3648:3676] = 'Thai'
-_tree[3713:3715] = 'Lao'
-_tree[3716:3717] = 'Lao'
-_tree[3718:3723] = 'Lao'
-_tree[3724:3748] = 'Lao'
-_tree[3749:3750] = 'Lao'
-_tree[3751:3774] = 'Lao'
-_tree[3776:3781] = 'Lao'
-_tree[3782:3783] = 'Lao'
-_tree[3784:3790] = 'Lao'
-_tree[3792:3802] = 'Lao'
-_tree[3804:3808] = 'Lao'
-_tree[3840:3912] = 'Tibetan'
-_tree[3913:3949] = 'Tibetan'
-_tree[3953:3992] = 'Tibetan'
-_tree[3993:4029] = 'Tibetan'
-_tree[4030:4045] = 'Tibetan'
-_tree[4046:4053] = 'Tibetan'
-_tree[4057:4059] = 'Tibetan'
-_tree[4096:4256] = 'Myanmar'
-_tree[43488:43519] = 'Myanmar'
-_tree[43616:43648] = 'Myanmar'
-_tree[4256:4294] = 'Georgian'
-_tree[4295:4296] = 'Georgian'
-_tree[4301:4302] = 'Georgian'
-_tree[4304:4347] = 'Georgian'
-_tree[4348:4352] = 'Georgian'
-_tree[7312:7355] = 'Georgian'
-_tree[7357:7360] = 'Georgian'
-_tree[11520:11558] = 'Georgian'
-_tree[11559:11560] = 'Georgian'
-_tree[11565:11566] = 'Georgian'
-_tree[4352:4608] = 'Hangul'
-_tree[12334:12336] = 'Hangul'
-_tree[12593:12687] = 'Hangul'
-_tree[12800:12831] = 'Hangul'
-_tree[12896:12927] = 'Hangul'
-_tree[43360:43389] = 'Hangul'
-_tree[44032:55204] = 'Hangul'
-_tree[55216:55239] = 'Hangul'
-_tree[55243:55292] = 'Hangul'
-_tree[65440:65471] = 'Hangul'
-_tree[65474:65480] = 'Hangul'
-_tree[65482:65488] = 'Hangul'
-_tree[65490:65496] = 'Hangul'
-_tree[65498:65501] = 'Hangul'
-_tree[4608:4681] = 'Ethiopic'
-_tree[4682:4686] = 'Ethiopic'
-_tree[4688:4695] = 'Ethiopic'
-_tree[4696:4697] = 'Ethiopic'
-_tree[4698:4702] = 'Ethiopic'
-_tree[4704:4745] = 'Ethiopic'
-_tree[4746:4750] = 'Ethiopic'
-_tree[4752:4785] = 'Ethiopic'
-_tree[4786:4790] = 'Ethiopic'
-_tree[4792:4799] = 'Ethiopic'
-_tree[4800:4801] = 'Ethiopic'
-_tree[4802:4806] = 'Ethiopic'
-_tree[4808:4823] = 'Ethiopic'
-_tree[4824:4881] = 'Ethiopic'
-_tree[4882:4886] = 'Ethiopic'
-_tree[4888:4955] = 'Ethiopic'
-_tree[4957:4989] = 'Ethiopic'
-_tree[4992:5018] = 'Ethiopic'
-_tree[11648:11671] = 'Ethiopic'
-_tree[11680:11687] = 'Ethiopic'
-_tree[11688:11695] = 'Ethiopic'
-_tree[11696:11703] = 'Ethiopic'
-_tree[11704:11711] = 'Ethiopic'
-_tree[11712:11719] = 'Ethiopic'
-_tree[11720:11727] = 'Ethiopic'
-_tree[11728:11735] = 'Ethiopic'
-_tree[11736:11743] = 'Ethiopic'
-_tree[43777:43783] = 'Ethiopic'
-_tree[43785:43791] = 'Ethiopic'
-_tree[43793:43799] = 'Ethiopic'
-_tree[43808:43815] = 'Ethiopic'
-_tree[43816:43823] = 'Ethiopic'
-_tree[5024:5110] = 'Cherokee'
-_tree[5112:5118] = 'Cherokee'
-_tree[43888:43968] = 'Cherokee'
-_tree[5120:5760] = 'Canadian_Aboriginal'
-_tree[6320:6390] = 'Canadian_Aboriginal'
-_tree[5760:5789] = 'Ogham'
-_tree[5792:5867] = 'Runic'
-_tree[5870:5881] = 'Runic'
-_tree[6016:6110] = 'Khmer'
-_tree[6112:6122] = 'Khmer'
-_tree[6128:6138] = 'Khmer'
-_tree[6624:6656] = 'Khmer'
-_tree[6144:6146] = 'Mongolian'
-_tree[6148:6149] = 'Mongolian'
-_tree[6150:6159] = 'Mongolian'
-_tree[6160:6170] = 'Mongolian'
-_tree[6176:6265] = 'Mongolian'
-_tree[6272:6315] = 'Mongolian'
-_tree[71264:71277] = 'Mongolian'
-_tree[12353:12439] = 'Hiragana'
-_tree[12445:12448] = 'Hiragana'
-_tree[110593:110879] = 'Hiragana'
-_tree[110928:110931] = 'Hiragana'
-_tree[127488:127489] = 'Hiragana'
-_tree[12449:12539] = 'Katakana'
-_tree[12541:12544] = 'Katakana'
-_tree[12784:12800] = 'Katakana'
-_tree[13008:13055] = 'Katakana'
-_tree[13056:13144] = 'Katakana'
-_tree[65382:65392] = 'Katakana'
-_tree[65393:65438] = 'Katakana'
-_tree[110592:110593] = 'Katakana'
-_tree[110948:110952] = 'Katakana'
-_tree[746:748] = 'Bopomofo'
-_tree[12549:12592] = 'Bopomofo'
-_tree[12704:12731] = 'Bopomofo'
-_tree[11904:11930] = 'Han'
-_tree[11931:12020] = 'Han'
-_tree[12032:12246] = 'Han'
-_tree[12293:12294] = 'Han'
-_tree[12295:12296] = 'Han'
-_tree[12321:12330] = 'Han'
-_tree[12344:12348] = 'Han'
-_tree[13312:19894] = 'Han'
-_tree[19968:40944] = 'Han'
-_tree[63744:64110] = 'Han'
-_tree[64112:64218] = 'Han'
-_tree[131072:173783] = 'Han'
-_tree[173824:177973] = 'Han'
-_tree[177984:178206] = 'Han'
-_tree[178208:183970] = 'Han'
-_tree[183984:191457] = 'Han'
-_tree[194560:195102] = 'Han'
-_tree[40960:42125] = 'Yi'
-_tree[42128:42183] = 'Yi'
-_tree[66304:66340] = 'Old_Italic'
-_tree[66349:66379] = 'Old_Italic'
-_tree[66560:66640] = 'Deseret'
-_tree[768:880] = 'Inherited'
-_tree[1157:1159] = 'Inherited'
-_tree[1611:1622] = 'Inherited'
-_tree[1648:1649] = 'Inherited'
-_tree[2385:2389] = 'Inherited'
-_tree[6832:6847] = 'Inherited'
-_tree[7376:7379] = 'Inherited'
-_tree[7380:7393] = 'Inherited'
-_tree[7394:7401] = 'Inherited'
-_tree[7405:7406] = 'Inherited'
-_tree[7412:7413] = 'Inherited'
-_tree[7416:7418] = 'Inherited'
-_tree[7616:7674] = 'Inherited'
-_tree[7675:7680] = 'Inherited'
-_tree[8204:8206] = 'Inherited'
-_tree[8400:8433] = 'Inherited'
-_tree[12330:12334] = 'Inherited'
-_tree[12441:12443] = 'Inherited'
-_tree[65024:65040] = 'Inherited'
-_tree[65056:65070] = 'Inherited'
-_tree[66045:66046] = 'Inherited'
-_tree[66272:66273] = 'Inherited'
-_tree[70459:70460] = 'Inherited'
-_tree[119143:119146] = 'Inherited'
-_tree[119163:119171] = 'Inherited'
-_tree[119173:119180] = 'Inherited'
-_tree[119210:119214] = 'Inherited'
-_tree[917760:918000] = 'Inherited'
-_tree[5888:5901] = 'Tagalog'
-_tree[5902:5909] = 'Tagalog'
-_tree[5920:5941] = 'Hanunoo'
-_tree[5952:5972] = 'Buhid'
-_tree[5984:5997] = 'Tagbanwa'
-_tree[5998:6001] = 'Tagbanwa'
-_tree[6002:6004] = 'Tagbanwa'
-_tree[6400:6431] = 'Limbu'
-_tree[6432:6444] = 'Limbu'
-_tree[6448:6460] = 'Limbu'
-_tree[6464:6465] = 'Limbu'
-_tree[6468:6510] = 'Limbu'
-_tree[6512:6517] = 'Tai_Le'
-_tree[65536:65548] = 'Linear_B'
-_tree[65549:65575] = 'Linear_B'
-_tree[65576:65595] = 'Linear_B'
-_tree[65596:65598] = 'Linear_B'
-_tree[65599:65614] = 'Linear_B'
-_tree[65616:65630] = 'Linear_B'
-_tree[65664:65787] = 'Linear_B'
-_tree[66432:66462] = 'Ugaritic'
-_tree[66463:66464] = 'Ugaritic'
-_tree[66640:66718] = 'Shavian'
-_tree[66720:66730] = 'Osmanya'
-_tree[67584:67590] = 'Cypriot'
-_tree[67592:67593] = 'Cypriot'
-_tree[67594:67638] = 'Cypriot'
-_tree[67639:67641] = 'Cypriot'
-_tree[67644:67645] = 'Cypriot'
-_tree[67647:67648] = 'Cypriot'
-_tree[10240:10496] = 'Braille'
-_tree[6656:6684] = 'Buginese'
-_tree[6686:6688] = 'Buginese'
-_tree[994:1008] = 'Coptic'
-_tree[11392:11508] = 'Coptic'
-_tree[11513:11520] = 'Coptic'
-_tree[6528:6572] = 'New_Tai_Lue'
-_tree[6576:6602] = 'New_Tai_Lue'
-_tree[6608:6619] = 'New_Tai_Lue'
-_tree[6622:6624] = 'New_Tai_Lue'
-_tree[11264:11311] = 'Glagolitic'
-_tree[11312:11359] = 'Glagolitic'
-_tree[122880:122887] = 'Glagolitic'
-_tree[122888:122905] = 'Glagolitic'
-_tree[122907:122914] = 'Glagolitic'
-_tree[122915:122917] = 'Glagolitic'
-_tree[122918:122923] = 'Glagolitic'
-_tree[11568:11624] = 'Tifinagh'
-_tree[11631:11633] = 'Tifinagh'
-_tree[11647:11648] = 'Tifinagh'
-_tree[43008:43052] = 'Syloti_Nagri'
-_tree[66464:66500] = 'Old_Persian'
-_tree[66504:66518] = 'Old_Persian'
-_tree[68096:68100] = 'Kharoshthi'
-_tree[68101:68103] = 'Kharoshthi'
-_tree[68108:68116] = 'Kharoshthi'
-_tree[68117:68120] = 'Kharoshthi'
-_tree[68121:68150] = 'Kharoshthi'
-_tree[68152:68155] = 'Kharoshthi'
-_tree[68159:68169] = 'Kharoshthi'
-_tree[68176:68185] = 'Kharoshthi'
-_tree[6912:6988] = 'Balinese'
-_tree[6992:7037] = 'Balinese'
-_tree[73728:74650] = 'Cuneiform'
-_tree[74752:74863] = 'Cuneiform'
-_tree[74864:74869] = 'Cuneiform'
-_tree[74880:75076] = 'Cuneiform'
-_tree[67840:67868] = 'Phoenician'
-_tree[67871:67872] = 'Phoenician'
-_tree[43072:43128] = 'Phags_Pa'
-_tree[1984:2043] = 'Nko'
-_tree[2045:2048] = 'Nko'
-_tree[7040:7104] = 'Sundanese'
-_tree[7360:7368] = 'Sundanese'
-_tree[7168:7224] = 'Lepcha'
-_tree[7227:7242] = 'Lepcha'
-_tree[7245:7296] = 'Lepcha'
-_tree[42240:42540] = 'Vai'
-_tree[43136:43206] = 'Saurashtra'
-_tree[43214:43226] = 'Saurashtra'
-_tree[43264:43310] = 'Kayah_Li'
-_tree[43311:43348] = 'Kayah_Li'
-_tree[43359:43360] = 'Rejang'
-_tree[66176:66205] = 'Lycian'
-_tree[66208:66257] = 'Carian'
-_tree[67872:67898] = 'Lydian'
-_tree[67903:67904] = 'Lydian'
-_tree[43520:43575] = 'Cham'
-_tree[43584:43598] = 'Cham'
-_tree[43600:43610] = 'Cham'
-_tree[43612:43616] = 'Cham'
-_tree[6688:6751] = 'Tai_Tham'
-_tree[6752:6781] = 'Tai_Tham'
-_tree[6783:6794] = 'Tai_Tham'
-_tree[6800:6810] = 'Tai_Tham'
-_tree[6816:6830] = 'Tai_Tham'
-_tree[43648:43715] = 'Tai_Viet'
-_tree[43739:43744] = 'Tai_Viet'
-_tree[68352:68406] = 'Avestan'
-_tree[68409:68416] = 'Avestan'
-_tree[77824:78895] = 'Egyptian_Hieroglyphs'
-_tree[78896:78905] = 'Egyptian_Hieroglyphs'
-_tree[2048:2094] = 'Samaritan'
-_tree[2096:2111] = 'Samaritan'
-_tree[42192:42240] = 'Lisu'
-_tree[42656:42744] = 'Bamum'
-_tree[92160:92729] = 'Bamum'
-_tree[43392:43470] = 'Javanese'
-_tree[43472:43482] = 'Javanese'
-_tree[43486:43488] = 'Javanese'
-_tree[43744:43767] = 'Meetei_Mayek'
-_tree[43968:44014] = 'Meetei_Mayek'
-_tree[44016:44026] = 'Meetei_Mayek'
-_tree[67648:67670] = 'Imperial_Aramaic'
-_tree[67671:67680] = 'Imperial_Aramaic'
-_tree[68192:68224] = 'Old_South_Arabian'
-_tree[68416:68438] = 'Inscriptional_Parthian'
-_tree[68440:68467] = 'Inscriptional_Parthian'
-_tree[68472:68480] = 'Inscriptional_Pahlavi'
-_tree[68608:68681] = 'Old_Turkic'
-_tree[69760:69826] = 'Kaithi'
-_tree[69837:69838] = 'Kaithi'
-_tree[7104:7156] = 'Batak'
-_tree[7164:7168] = 'Batak'
-_tree[69632:69710] = 'Brahmi'
-_tree[69714:69744] = 'Brahmi'
-_tree[69759:69760] = 'Brahmi'
-_tree[2112:2140] = 'Mandaic'
-_tree[2142:2143] = 'Mandaic'
-_tree[69888:69941] = 'Chakma'
-_tree[69942:69959] = 'Chakma'
-_tree[68000:68024] = 'Meroitic_Cursive'
-_tree[68028:68048] = 'Meroitic_Cursive'
-_tree[68050:68096] = 'Meroitic_Cursive'
-_tree[67968:68000] = 'Meroitic_Hieroglyphs'
-_tree[93952:94027] = 'Miao'
-_tree[94031:94088] = 'Miao'
-_tree[94095:94112] = 'Miao'
-_tree[70016:70094] = 'Sharada'
-_tree[70096:70112] = 'Sharada'
-_tree[69840:69865] = 'Sora_Sompeng'
-_tree[69872:69882] = 'Sora_Sompeng'
-_tree[71296:71353] = 'Takri'
-_tree[71360:71370] = 'Takri'
-_tree[66864:66916] = 'Caucasian_Albanian'
-_tree[66927:66928] = 'Caucasian_Albanian'
-_tree[92880:92910] = 'Bassa_Vah'
-_tree[92912:92918] = 'Bassa_Vah'
-_tree[113664:113771] = 'Duployan'
-_tree[113776:113789] = 'Duployan'
-_tree[113792:113801] = 'Duployan'
-_tree[113808:113818] = 'Duployan'
-_tree[113820:113824] = 'Duployan'
-_tree[66816:66856] = 'Elbasan'
-_tree[70400:70404] = 'Grantha'
-_tree[70405:70413] = 'Grantha'
-_tree[70415:70417] = 'Grantha'
-_tree[70419:70441] = 'Grantha'
-_tree[70442:70449] = 'Grantha'
-_tree[70450:70452] = 'Grantha'
-_tree[70453:70458] = 'Grantha'
-_tree[70460:70469] = 'Grantha'
-_tree[70471:70473] = 'Grantha'
-_tree[70475:70478] = 'Grantha'
-_tree[70480:70481] = 'Grantha'
-_tree[70487:70488] = 'Grantha'
-_tree[70493:70500] = 'Grantha'
-_tree[70502:70509] = 'Grantha'
-_tree[70512:70517] = 'Grantha'
-_tree[92928:92998] = 'Pahawh_Hmong'
-_tree[93008:93018] = 'Pahawh_Hmong'
-_tree[93019:93026] = 'Pahawh_Hmong'
-_tree[93027:93048] = 'Pahawh_Hmong'
-_tree[93053:93072] = 'Pahawh_Hmong'
-_tree[70144:70162] = 'Khojki'
-_tree[70163:70207] = 'Khojki'
-_tree[67072:67383] = 'Linear_A'
-_tree[67392:67414] = 'Linear_A'
-_tree[67424:67432] = 'Linear_A'
-_tree[69968:70007] = 'Mahajani'
-_tree[68288:68327] = 'Manichaean'
-_tree[68331:68343] = 'Manichaean'
-_tree[124928:125125] = 'Mende_Kikakui'
-_tree[125127:125143] = 'Mende_Kikakui'
-_tree[71168:71237] = 'Modi'
-_tree[71248:71258] = 'Modi'
-_tree[92736:92767] = 'Mro'
-_tree[92768:92778] = 'Mro'
-_tree[92782:92784] = 'Mro'
-_tree[68224:68256] = 'Old_North_Arabian'
-_tree[67712:67743] = 'Nabataean'
-_tree[67751:67760] = 'Nabataean'
-_tree[67680:67712] = 'Palmyrene'
-_tree[72384:72441] = 'Pau_Cin_Hau'
-_tree[66384:66427] = 'Old_Permic'
-_tree[68480:68498] = 'Psalter_Pahlavi'
-_tree[68505:68509] = 'Psalter_Pahlavi'
-_tree[68521:68528] = 'Psalter_Pahlavi'
-_tree[71040:71094] = 'Siddham'
-_tree[71096:71134] = 'Siddham'
-_tree[70320:70379] = 'Khudawadi'
-_tree[70384:70394] = 'Khudawadi'
-_tree[70784:70856] = 'Tirhuta'
-_tree[70864:70874] = 'Tirhuta'
-_tree[71840:71923] = 'Warang_Citi'
-_tree[71935:71936] = 'Warang_Citi'
-_tree[71424:71451] = 'Ahom'
-_tree[71453:71468] = 'Ahom'
-_tree[71472:71488] = 'Ahom'
-_tree[82944:83527] = 'Anatolian_Hieroglyphs'
-_tree[67808:67827] = 'Hatran'
-_tree[67828:67830] = 'Hatran'
-_tree[67835:67840] = 'Hatran'
-_tree[70272:70279] = 'Multani'
-_tree[70280:70281] = 'Multani'
-_tree[70282:70286] = 'Multani'
-_tree[70287:70302] = 'Multani'
-_tree[70303:70314] = 'Multani'
-_tree[68736:68787] = 'Old_Hungarian'
-_tree[68800:68851] = 'Old_Hungarian'
-_tree[68858:68864] = 'Old_Hungarian'
-_tree[120832:121484] = 'SignWriting'
-_tree[121499:121504] = 'SignWriting'
-_tree[121505:121520] = 'SignWriting'
-_tree[125184:125260] = 'Adlam'
-_tree[125264:125274] = 'Adlam'
-_tree[125278:125280] = 'Adlam'
-_tree[72704:72713] = 'Bhaiksuki'
-_tree[72714:72759] = 'Bhaiksuki'
-_tree[72760:72774] = 'Bhaiksuki'
-_tree[72784:72813] = 'Bhaiksuki'
-_tree[72816:72848] = 'Marchen'
-_tree[72850:72872] = 'Marchen'
-_tree[72873:72887] = 'Marchen'
-_tree[70656:70746] = 'Newa'
-_tree[70747:70748] = 'Newa'
-_tree[70749:70752] = 'Newa'
-_tree[66736:66772] = 'Osage'
-_tree[66776:66812] = 'Osage'
-_tree[94176:94177] = 'Tangut'
-_tree[94208:100344] = 'Tangut'
-_tree[100352:101107] = 'Tangut'
-_tree[72960:72967] = 'Masaram_Gondi'
-_tree[72968:72970] = 'Masaram_Gondi'
-_tree[72971:73015] = 'Masaram_Gondi'
-_tree[73018:73019] = 'Masaram_Gondi'
-_tree[73020:73022] = 'Masaram_Gondi'
-_tree[73023:73032] = 'Masaram_Gondi'
-_tree[73040:73050] = 'Masaram_Gondi'
-_tree[94177:94178] = 'Nushu'
-_tree[110960:111356] = 'Nushu'
-_tree[72272:72355] = 'Soyombo'
-_tree[72192:72264] = 'Zanabazar_Square'
-_tree[71680:71740] = 'Dogra'
-_tree[73056:73062] = 'Gunjala_Gondi'
-_tree[73063:73065] = 'Gunjala_Gondi'
-_tree[73066:73103] = 'Gunjala_Gondi'
-_tree[73104:73106] = 'Gunjala_Gondi'
-_tree[73107:73113] = 'Gunjala_Gondi'
-_tree[73120:73130] = 'Gunjala_Gondi'
-_tree[73440:73465] = 'Makasar'
-_tree[93760:93851] = 'Medefaidrin'
-_tree[68864:68904] = 'Hanifi_Rohingya'
-_tree[68912:68922] = 'Hanifi_Rohingya'
-_tree[69424:69466] = 'Sogdian'
-_tree[69376:69416] = 'Old_Sogdian'
-_tree[69600:69623] = 'Elymaic'
-_tree[72096:72104] = 'Nandinagari'
-_tree[72106:72152] = 'Nandinagari'
-_tree[72154:72165] = 'Nandinagari'
-_tree[123136:123181] = 'Nyiakeng_Puachue_Hmong'
-_tree[123184:123198] = 'Nyiakeng_Puachue_Hmong'
-_tree[123200:123210] = 'Nyiakeng_Puachue_Hmong'
-_tree[123214:123216] = 'Nyiakeng_Puachue_Hmong'
-_tree[123584:123642] = 'Wancho'
-_tree[123647:123648] = 'Wancho'
+"""Look up the Unicode script of characters.
+
+The script data is read from unicodescripts.dat, which is generated
+by make-unicodescripts.py. The file is memory-mapped on first use,
+so that all processes on a machine share its pages in the page cache.
+
+The file starts with a header (see _HEADER) containing a magic number,
+the format version, the Unicode version of the data, the number of
+scripts, the length of the script names block, the number of script
+ranges, and the SHA-256 hash of the rest of the file. Then come:
+
+- the script names, separated by NUL bytes and padded to 4 bytes;
+  the script index of a name is its position in this list, and the
+  first three scripts are always 'Unknown', 'Common' and 'Inherited'
+- a direct lookup table from code point to script index (uint8)
+  for the Basic Multilingual Plane (U+0000 to U+FFFF)
+- the start code points of all script ranges (little-endian uint32);
+  the code points from one range start up to (excluding) the next one
+  have the same script
+- the script index of each range (uint8)
+"""
+
+from array import array
+from bisect import bisect_right
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from typing import Iterable, NamedTuple, Optional
+
+
+UNKNOWN = 0
+COMMON = 1
+INHERITED = 2
+
+_MAGIC = b'USCR'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHBBBxHII32s')
+
+_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'unicodescripts.dat')
+
+
+class _Data(NamedTuple):
+    unicode_version: str
+    scripts: tuple[str, ...]
+    bmp: memoryview
+    starts: memoryview
+    script_indices: memoryview
+
+
+# materialized from the data file on first use
+_data: Optional[_Data] = None
+
+
+def _open(path: str) -> _Data:
+    with open(path, 'rb') as f:
+        buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if len(buffer) < _HEADER.size:
+        raise ValueError(f'{path} is too short')
+    magic, format_version, major, minor, update, script_count, names_length, range_count, sha256 = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+        raise ValueError(f'{path} is not a unicodescripts data file')
+    if format_version != _FORMAT_VERSION:
+        raise ValueError(f'{path} has format version {format_version}, expected {_FORMAT_VERSION}')
+    payload = buffer[_HEADER.size:]
+    if len(payload) != names_length + 0x10000 + 5 * range_count:
+        raise ValueError(f'{path} has the wrong length')
+    if hashlib.sha256(payload).digest() != sha256:
+        raise ValueError(f'{path} is corrupted (hash mismatch)')
+
+    scripts = tuple(bytes(payload[:names_length]).rstrip(b'\0').decode('ascii').split('\0'))
+    if len(scripts) != script_count or scripts[:3] != ('Unknown', 'Common', 'Inherited'):
+        raise ValueError(f'{path} has invalid script names')
+    bmp = payload[names_length:names_length + 0x10000]
+    starts = payload[names_length + 0x10000:names_length + 0x10000 + 4 * range_count].cast('I')
+    if sys.byteorder == 'big':
+        swapped_starts = array('I', starts)
+        swapped_starts.byteswap()
+        starts = memoryview(swapped_starts)
+    script_indices = payload[names_length + 0x10000 + 4 * range_count:]
+    return _Data(f'{major}.{minor}.{update}', scripts, bmp, starts, script_indices)
+
+
+def _load() -> _Data:
+    global _data
+    _data = _open(_path)
+    return _data
+
+
+def script_index(chr: str) -> int:
+    """Return the index of the script of the given character.
+
+    Use script_name() to turn the index into a script name."""
+    data = _data or _load()
+    code_point = ord(chr)
+    if code_point < 0x10000:
+        return data.bmp[code_point]
+    return data.script_indices[bisect_right(data.starts, code_point) - 1]
+
+
+def script_name(index: int) -> str:
+    """Return the name of the script with the given index."""
+    return (_data or _load()).scripts[index]
+
+
+def index_of_script(name: str) -> int:
+    """Return the index of the script with the given name."""
+    return (_data or _load()).scripts.index(name)
 
 
 def script(chr: str) -> str:
@@ -902,18 +114,16 @@ def script(chr: str) -> str:
 
     If the script for the character is not known,
     'Unknown' is returned."""
-    intervals = _tree[ord(chr)]
-    if len(intervals) == 1:
-        return cast(str, intervals.pop().data)
-    elif not intervals:
-        return 'Unknown'
-    else:
-        # this should never happen
-        raise ValueError('more than one script for character ' + chr)
+    return script_name(script_index(chr))
 
 
 def all_scripts() -> Iterable[str]:
     """Return a set of all scripts known to this module.
 
     This does not include the 'Unknown' default script."""
-    return set(i.data for i in _tree)
+    return set((_data or _load()).scripts[1:])
+
+
+def unicode_version() -> str:
+    """Return the version of the Unicode data used by this module."""
+    return (_data or _load()).unicode_version